@@ -1,2 +1 @@
-from dotenv import load_dotenv
-load_dotenv()
\ No newline at end of file
+from .tools.settings import settings  # loads .env once for the whole package
\ No newline at end of file
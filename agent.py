@@ -1,21 +1,91 @@
 from google.adk.agents import LlmAgent
 from google.adk.tools.agent_tool import AgentTool
-from .tools.big_qwery_tools import execute_queries
-from .tools.slack_tools import send_to_slack_visual
+from .tools.report_renderer import render_summary_report
 from .agents.visual_agent import visual_agent
 from .agents.format_agent import format_agent
-from google.adk.tools.mcp_tool import StdioConnectionParams
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
-from mcp import StdioServerParameters
-import os
-from dotenv import load_dotenv
+from .tools.settings import settings
+from .tools.telemetry import agent_callbacks
 
-load_dotenv()
-SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
-CHANNEL_ID = os.getenv("CHANNEL_ID")
-SLACK_TEAM_ID = os.getenv("SLACK_TEAM_ID")
+SLACK_BOT_TOKEN = settings.slack_bot_token
+CHANNEL_ID = settings.channel_id
+SLACK_TEAM_ID = settings.slack_team_id
 
 GEMINI_MODEL = 'gemini-2.5-flash'
+# "local": format the summary with the deterministic renderer; "agent": use the format_agent LLM.
+FORMAT_MODE = settings.format_mode
+# "local": render the charts with create_report_visuals; "agent": let visual_agent call the chart tools.
+VISUAL_MODE = settings.visual_mode
+# "native": post text with the in-process slack_post_message tool; "mcp": use the npx Slack MCP server.
+SLACK_MODE = settings.slack_mode
+# "async": I/O-bound tools run as coroutines with bounded concurrency per backend (see async_tools.py),
+# so one process can serve many sessions; "sync": the blocking tools.
+TOOL_MODE = settings.tool_mode
+
+if TOOL_MODE == "async":
+    from .tools.async_tools import (
+        execute_queries_async as execute_queries,
+        send_to_slack_visual_async as send_to_slack_visual,
+        slack_post_message_async as slack_post_message,
+        create_report_visuals_async as create_report_visuals,
+    )
+else:
+    from .tools.big_qwery_tools import execute_queries
+    from .tools.slack_tools import send_to_slack_visual, slack_post_message
+    from .tools.visual_tools import create_report_visuals
+
+if FORMAT_MODE == "agent":
+    FORMAT_STEP = """1. -Get the summary_table from `result["data"]`.
+       -Get the input_requirements.
+       Then call `format_agent` ' with these arguments
+        → store result in `result_data`"""
+else:
+    FORMAT_STEP = """1. -Get the summary_table from `result["data"]`.
+       -Get the input_requirements.
+       Then call `render_summary_report(summary_table, input_requirements)`
+        → store its returned string, unchanged, in `result_data`
+       If `render_summary_report` fails, call `format_agent` with the same arguments instead."""
+
+if VISUAL_MODE == "agent":
+    VISUAL_STEP = """2. -Get both summary_table and pairwise_overlap tables from `result["data"]`(result from step 1).
+       Then call `visual_agent` with these arguments
+        → store in `summary_result_visual`"""
+else:
+    VISUAL_STEP = """2. -Get both summary_table and pairwise_overlap tables from `result["data"]`(result from step 1).
+       Then call `create_report_visuals(summary_table, pairwise_overlap)`
+        → store its returned list, unchanged, in `summary_result_visual`
+       If `create_report_visuals` fails, call `visual_agent` with the same arguments instead."""
+
+if SLACK_MODE == "mcp":
+    from google.adk.tools.mcp_tool import StdioConnectionParams
+    from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+    from mcp import StdioServerParameters
+
+    slack_tools = MCPToolset(
+        connection_params=StdioConnectionParams(
+            server_params=StdioServerParameters(
+                command='npx',
+                args=['-y', '@modelcontextprotocol/server-slack'],
+
+                env={
+                    "SLACK_BOT_TOKEN": SLACK_BOT_TOKEN,
+                    "CHANNEL_ID": CHANNEL_ID,
+                    "SLACK_TEAM_ID": SLACK_TEAM_ID,
+                    "MCP_REQUEST_TIMEOUT": "30"
+                },
+                tool_filter=["slack_post_message"],
+
+            )
+        )
+    )
+else:
+    slack_tools = slack_post_message
+
+# The deterministic renderers are only offered to the model in the modes whose instructions use them.
+local_tools = []
+if FORMAT_MODE != "agent":
+    local_tools.append(render_summary_report)
+if VISUAL_MODE != "agent":
+    local_tools.append(create_report_visuals)
 
 root_agent = LlmAgent(
     name="agent",
@@ -33,18 +103,18 @@ root_agent = LlmAgent(
      - If a tool or agent tool call fails, attempt to retry the call gracefully.
          - No data →
          Call slack_post_message( {{
-          "CHANNEL_ID": {CHANNEL_ID},
+          "channel_id": "{CHANNEL_ID}",
           "text": "No relevant data found..."
         }})
          - Runtime error →  
           Call slack_post_message( {{
-          "CHANNEL_ID": {CHANNEL_ID},
+          "channel_id": "{CHANNEL_ID}",
           "text": "An error occurred while executing query..."
         }})
          - Default error→give a nice response explaining what happened.
          -If visual agent returned "" null str:
           Call slack_post_message( {{
-          "CHANNEL_ID": {CHANNEL_ID},
+          "channel_id": "{CHANNEL_ID}",
           "text": "visual agent didn't return graph's"
         }})
     
@@ -65,33 +135,36 @@ root_agent = LlmAgent(
     ===========================
     📌 STEP 2: Format response
     ===========================
-    You must use two agents to complete this step: visual_agent and format_agent.
-    Each agent has a specific responsibility, and both must be invoked as part of the workflow.
+    You must produce both the formatted summary and the visuals.
     
-    1. -Get the summary_table from `result["data"]`.
-       -Get the input_requirements.
-       Then call `format_agent` ' with these arguments
-        → store result in `result_data`
+    {FORMAT_STEP}
     
-    2. -Get both summary_table and pairwise_overlap tables from `result["data"]`(result from step 1).
-       Then call `visual_agent` with these arguments
-        → store in `summary_result_visual`
+    {VISUAL_STEP}
     ==========================
     📌 STEP 3: Slack Response
     ==========================
-    You must send both parts to Slack using the `send_to_slack_str` tool and `send_to_slack_visual` tool.
+    You must send both parts to Slack using the `slack_post_message` tool and `send_to_slack_visual` tool.
     
-    1. Send the formatted summary string `result_data` Slack MCP tools.
+    1. Send the formatted summary string `result_data` to Slack.
      → 
     Use the `slack_post_message` tool to send the text output to Slack.
     
     Call it with:
     {{
-      "CHANNEL_ID": {CHANNEL_ID},
+      "channel_id": "{CHANNEL_ID}",
       "text": `summary_result_data`
     }}
     2. Send the formatted visual output `summary_result_visual`.
      → send_to_slack_visual(summary_result_visual)
+     Check the `status` it returns:
+       - "success" → nothing more to do.
+       - "partial" or "error" → call it once more with only the entries whose "files" status is "error".
+         If that call does not return "success" either, report the failure instead of retrying again:
+          Call slack_post_message( {{
+          "channel_id": "{CHANNEL_ID}",
+          "text": "Some charts could not be uploaded: <the `name` of each failed entry>. Reason: <`error_message`>"
+        }})
+         and mention the same failure in the final response.
 
     ==============================
     📌 STEP 4: Final Return
@@ -99,24 +172,9 @@ root_agent = LlmAgent(
     **Always** return `result_data` exactly as sent to Slack.""",
 
     tools=[
-        MCPToolset(
-            connection_params=StdioConnectionParams(
-                server_params=StdioServerParameters(
-                    command='npx',
-                    args=['-y', '@modelcontextprotocol/server-slack'],
-
-                    env={
-                        "SLACK_BOT_TOKEN": SLACK_BOT_TOKEN,
-                        "CHANNEL_ID": CHANNEL_ID,
-                        "SLACK_TEAM_ID": SLACK_TEAM_ID,
-                        "MCP_REQUEST_TIMEOUT": "30"
-                    },
-                    tool_filter=["slack_post_message"],
-
-                )
-            )
-        ),
-        execute_queries,send_to_slack_visual, AgentTool(visual_agent), AgentTool(format_agent)
+        slack_tools,
+        execute_queries,send_to_slack_visual, *local_tools,
+        AgentTool(visual_agent), AgentTool(format_agent)
     ],
+    **agent_callbacks(LlmAgent),
 )
-
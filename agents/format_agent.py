@@ -1,6 +1,5 @@
 from google.adk.agents import LlmAgent
-from dotenv import load_dotenv
-load_dotenv()
+from ..tools.telemetry import agent_callbacks
 
 GEMINI_MODEL = 'gemini-2.5-flash'
 
@@ -83,5 +82,6 @@ Here's how each source performed based on reach, engagement, and incremental:
 =============
 **Return the final string as `result_data` (type: str).** 
 
-"""
+""",
+    **agent_callbacks(LlmAgent),
 )
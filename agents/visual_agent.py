@@ -1,10 +1,17 @@
 # visual_agent.py
 from google.adk.agents import LlmAgent
-from ..tools.visual_tools import plot_incrementality_bar_chart,create_pairwise_overlap_metrix,plot_pairwise_overlap_heatmap
+from ..tools.settings import settings
+from ..tools.telemetry import agent_callbacks
+
+if settings.tool_mode == "async":
+    from ..tools.async_tools import (
+        plot_incrementality_bar_chart_async as plot_incrementality_bar_chart,
+        create_pairwise_overlap_metrix_async as create_pairwise_overlap_metrix,
+        plot_pairwise_overlap_heatmap_async as plot_pairwise_overlap_heatmap,
+    )
+else:
+    from ..tools.visual_tools import plot_incrementality_bar_chart,create_pairwise_overlap_metrix,plot_pairwise_overlap_heatmap
 
-from dotenv import load_dotenv
-
-load_dotenv()
 GEMINI_MODEL = 'gemini-2.5-flash'
 
 visual_agent = LlmAgent(
@@ -46,7 +53,7 @@ Your task is to generate multiple visualizations from the input data.
 - **Bar Chart**  
   Required fields:  
   • `media_source`  
-  • `incrementality_score`
+  • `incremental_score` (from summary_table; pass it to the tool as `incrementality_score`)
 
 - **Heatmap**  
   Required fields:  
@@ -95,5 +102,6 @@ After generating each chart,response with confirmation message.
         plot_incrementality_bar_chart,
         plot_pairwise_overlap_heatmap,
         create_pairwise_overlap_metrix
-    ]
+    ],
+    **agent_callbacks(LlmAgent),
 )
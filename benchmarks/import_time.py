@@ -0,0 +1,148 @@
+"""
+Import-time benchmark for the agent package.
+
+Every module is imported in a fresh interpreter, several times, and the median wall time is
+compared with the stored baseline together with the heavy dependencies the import pulled in.
+
+Usage:
+    python benchmarks/import_time.py             # measure and compare with the baseline
+    python benchmarks/import_time.py --update    # store the current numbers as the new baseline
+    python benchmarks/import_time.py --profile   # also print the slowest imports (-X importtime)
+
+Exits with status 1 on a regression.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(ROOT)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_baseline.json")
+
+MODULES = ["tools.report_renderer", "tools.big_qwery_tools", "tools.visual_tools", "tools.slack_tools", "tools.async_tools",
+           "agent"]
+# Dependencies that should only be imported on first use.
+HEAVY_MODULES = ["pandas", "matplotlib", "seaborn", "numpy", "pyarrow",
+                 "google.cloud.bigquery", "google.cloud.storage", "slack_sdk"]
+# A module regresses when it is this much slower than its baseline (relative, plus absolute slack).
+TOLERANCE = 0.25
+SLACK_SECONDS = 0.05
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    """
+    Imports `module` of the package in `runs` fresh interpreters.
+
+    Args:
+        module (str): Module path inside the package, e.g. "tools.visual_tools".
+        runs (int): Number of cold imports.
+
+    Returns:
+        dict: {"seconds": median, "heavy": heavy modules imported}, or {"error": message}.
+    """
+    samples, heavy = [], []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", _PROBE, f"{PACKAGE}.{module}", *HEAVY_MODULES],
+                              cwd=os.path.dirname(ROOT), capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"}
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        heavy = result["heavy"]
+    return {"seconds": round(statistics.median(samples), 4), "heavy": heavy}
+
+
+def profile(module: str, top: int = 15) -> list:
+    """
+    Returns the slowest imports of `module` by cumulative time, from `python -X importtime`.
+
+    Args:
+        module (str): Module path inside the package.
+        top (int): Number of entries.
+
+    Returns:
+        list: (cumulative seconds, imported module) pairs, slowest first.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {PACKAGE}.{module}"],
+                          cwd=os.path.dirname(ROOT), capture_output=True, text=True)
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """
+    Lists the regressions of `results` against `baseline`.
+
+    Args:
+        results (dict): module -> measurement, as returned by `measure`.
+        baseline (dict): The stored measurements.
+
+    Returns:
+        list[str]: One message per regression.
+    """
+    regressions = []
+    for module, result in results.items():
+        before = baseline.get(module)
+        if not before or "error" in result:
+            continue
+        limit = before["seconds"] * (1 + TOLERANCE) + SLACK_SECONDS
+        if result["seconds"] > limit:
+            regressions.append(f"{module}: {result['seconds']:.3f}s, baseline {before['seconds']:.3f}s")
+        new_heavy = sorted(set(result["heavy"]) - set(before["heavy"]))
+        if new_heavy:
+            regressions.append(f"{module}: now imports {', '.join(new_heavy)} at import time")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="cold imports per module")
+    parser.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--profile", action="store_true", help="print the slowest imports of each module")
+    args = parser.parse_args()
+
+    results = {module: measure(module, args.runs) for module in MODULES}
+    for module, result in results.items():
+        if "error" in result:
+            print(f"{module:28} skipped: {result['error']}")
+        else:
+            print(f"{module:28} {result['seconds']:.3f}s  heavy: {', '.join(result['heavy']) or '-'}")
+        if args.profile and "error" not in result:
+            for seconds, name in profile(module):
+                print(f"    {seconds:.3f}s  {name}")
+
+    if args.update:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({m: r for m, r in results.items() if "error" not in r}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline yet; run with --update to create one.")
+        return 0
+    with open(BASELINE_PATH) as f:
+        regressions = compare(results, json.load(f))
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,502 @@
+"""
+End-to-end benchmark of the report pipeline on synthetic data.
+
+A synthetic event table is generated per scenario and loaded into the local query engine (see
+tools/local_engine.py); GCS and Slack are replaced by in-process fakes with a fixed simulated
+latency. Each iteration then runs the stages of a report the way the agent does:
+
+    query          execute_queries (DuckDB over the synthetic extract, result cache disabled)
+    visuals        visual_tools.create_report_visuals (VISUAL_MODE="local", the default: the three
+                   charts rendered in parallel worker processes)
+    slack_text     slack_tools.send_to_slack_str
+    slack_visual   slack_tools.send_to_slack_visual (local images, as returned by create_report_visuals)
+
+With --visual-mode agent the visuals stage is replaced by the single-chart tools visual_agent calls,
+one after the other; slack_visual then fetches the images from the fake GCS:
+
+    bar_chart      visual_tools.plot_incrementality_bar_chart
+    heatmap        visual_tools.plot_pairwise_overlap_heatmap
+    matrix         visual_tools.create_pairwise_overlap_metrix
+
+Latency percentiles are reported per stage and for the whole report, together with the peak
+Python memory of each stage (tracemalloc, one extra iteration) and the peak RSS of the process.
+Chart caches are emptied before every iteration unless --warm-charts is given.
+
+Usage:
+    python benchmarks/report_pipeline.py                      # every scenario, compared with the baseline
+    python benchmarks/report_pipeline.py --scenario wide      # one scenario
+    python benchmarks/report_pipeline.py --update             # store the results as the new baseline
+    python benchmarks/report_pipeline.py --users 200000 --sources 30 --overlap 4 --popularity zipf
+    python benchmarks/report_pipeline.py --visual-mode agent  # the visual_agent chart tools
+
+Exits with status 1 on a regression. Runs with custom data parameters or --visual-mode agent are
+never compared or stored.
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(ROOT)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline_baseline.json")
+
+# users: distinct advertising IDs; sources: media sources; overlap: mean sources reached per user;
+# popularity: how users spread over sources ("uniform" or "zipf"); events: mean events per user and source.
+SCENARIOS = {
+    "small": {"users": 5_000, "sources": 3, "campaigns": 2, "days": 7, "overlap": 1.5,
+              "popularity": "uniform", "events": 2},
+    "medium": {"users": 50_000, "sources": 10, "campaigns": 5, "days": 14, "overlap": 2.0,
+               "popularity": "zipf", "events": 3},
+    "wide": {"users": 50_000, "sources": 50, "campaigns": 5, "days": 14, "overlap": 3.0,
+             "popularity": "zipf", "events": 2},
+}
+# Chart stages per VISUAL_MODE; the baseline holds "local" runs.
+VISUAL_STAGES = {"local": ["visuals"], "agent": ["bar_chart", "heatmap", "matrix"]}
+PERCENTILES = (50, 90, 99)
+FIRST_DAY = date(2024, 1, 1)
+AD_NAME = "benchmark_ad"
+CLICK_RATE = 0.2
+
+# A stage regresses when its p50 is this much slower than its baseline (relative, plus absolute slack),
+# or when its peak Python memory grows by more than TOLERANCE plus MEMORY_SLACK_MB.
+TOLERANCE = 0.25
+SLACK_SECONDS = 0.05
+MEMORY_SLACK_MB = 8
+
+
+def generate_events(users: int, sources: int, campaigns: int, days: int, overlap: float, popularity: str,
+                    events: float, seed: int = 0) -> dict:
+    """
+    Generates a synthetic event table, one Arrow table per day.
+
+    Every user reaches 1 + Poisson(overlap - 1) media sources (at most `sources`), drawn without
+    replacement with uniform or Zipf-distributed source popularity, and has 1 + Poisson(events - 1)
+    events with each of them, spread uniformly over the days and campaigns.
+
+    Args:
+        users (int): Number of distinct advertising IDs.
+        sources (int): Number of media sources.
+        campaigns (int): Number of campaigns.
+        days (int): Number of days, starting at FIRST_DAY.
+        overlap (float): Mean number of sources per user (>= 1).
+        popularity (str): "uniform" or "zipf".
+        events (float): Mean number of events per user and source (>= 1).
+        seed (int): Random seed.
+
+    Returns:
+        dict: day (YYYY-MM-DD) -> pa.Table with the local extract columns.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, sources + 1) if popularity == "zipf" else np.ones(sources)
+    weights /= weights.sum()
+
+    # Sources per user; Gumbel top-k samples each user's sources without replacement by weight.
+    reach = np.minimum(1 + rng.poisson(max(overlap - 1, 0), users), sources)
+    keys = np.log(weights) - np.log(-np.log(rng.random((users, sources))))
+    ranked = np.argsort(-keys, axis=1)
+    pair_user = np.repeat(np.arange(users), reach)
+    pair_source = ranked[np.arange(users).repeat(reach), np.concatenate([np.arange(k) for k in reach])]
+
+    # Events per (user, source) pair.
+    counts = 1 + rng.poisson(max(events - 1, 0), len(pair_user))
+    user = np.repeat(pair_user, counts)
+    source = np.repeat(pair_source, counts)
+    n = len(user)
+    day = rng.integers(0, days, n)
+    seconds = rng.integers(0, 24 * 3600, n)
+    epoch = datetime(FIRST_DAY.year, FIRST_DAY.month, FIRST_DAY.day, tzinfo=timezone.utc).timestamp()
+
+    table = pa.table({
+        "event_time": pa.array(((epoch + day * 86400 + seconds) * 1_000_000).astype("int64"),
+                               pa.timestamp("us", tz="UTC")),
+        "advertising_id_value": pa.array([f"user-{u}" for u in user]),
+        "media_source": pa.array(np.array([f"source_{i:02d}" for i in range(sources)])[source]),
+        "engagement_type": pa.array(np.where(rng.random(n) < CLICK_RATE, "click", "view")),
+        "ad_name": pa.array(np.full(n, AD_NAME)),
+        "campaign_name": pa.array(np.array([f"campaign_{i}" for i in range(campaigns)])[rng.integers(0, campaigns, n)]),
+    })
+    day_column = pa.array(day)
+    return {str(FIRST_DAY + timedelta(days=int(d))): table.filter(pc.equal(day_column, int(d))) for d in range(days)}
+
+
+class FakeBlob:
+    """In-memory stand-in for storage.Blob."""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.time_created = None
+
+    def upload_from_string(self, data, content_type=None):
+        time.sleep(self.bucket.latency)
+        self.bucket.objects[self.name] = bytes(data)
+        self.time_created = datetime.now(timezone.utc)
+        self.bucket.blobs[self.name] = self
+
+    def upload_from_file(self, stream, content_type=None):
+        self.upload_from_string(stream.read(), content_type)
+
+    def download_to_file(self, stream):
+        time.sleep(self.bucket.latency)
+        stream.write(self.bucket.objects[self.name])
+
+    def delete(self):
+        self.bucket.objects.pop(self.name, None)
+        self.bucket.blobs.pop(self.name, None)
+
+
+class FakeBucket:
+    """In-memory stand-in for storage.Bucket; every request costs `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.objects = {}
+        self.blobs = {}
+
+    def blob(self, name):
+        return self.blobs.get(name) or FakeBlob(self, name)
+
+    def get_blob(self, name):
+        time.sleep(self.latency)
+        return self.blobs.get(name)
+
+    def list_blobs(self, prefix=""):
+        return [blob for name, blob in list(self.blobs.items()) if name.startswith(prefix)]
+
+
+class FakeStorageClient:
+    """In-memory stand-in for storage.Client holding a single shared bucket."""
+
+    def __init__(self, latency):
+        self._bucket = FakeBucket(latency)
+
+    def bucket(self, name):
+        return self._bucket
+
+
+class FakeSlackClient:
+    """In-memory stand-in for slack_sdk.WebClient; every call costs `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.messages = []
+        self.files = []
+        self._lock = threading.Lock()
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.messages.append((channel, text))
+        return {"ok": True, "channel": channel, "ts": f"{time.time():.6f}"}
+
+    def files_upload_v2(self, channel, file, filename, **kwargs):
+        data = file.read()
+        time.sleep(self.latency)
+        with self._lock:
+            self.files.append((channel, filename, len(data)))
+        return {"ok": True}
+
+
+def configure_environment(workdir: str) -> None:
+    """Points the package at the benchmark's scratch directory; must run before the package is imported."""
+    os.environ.update({
+        "QUERY_BACKEND": "local",
+        "RESULT_CACHE_BACKEND": "none",
+        "LOCAL_EXTRACT_DIR": os.path.join(workdir, "extract"),
+        "CHART_CACHE_ENABLED": "1",
+        "CHART_CACHE_DIR": os.path.join(workdir, "charts"),
+        "BUCKET_NAME": "benchmark-bucket",
+        "CHANNEL_ID": "C-BENCHMARK",
+        "CHANNEL_NAME": "benchmark",
+        "SLACK_BOT_TOKEN": "xoxb-benchmark",
+        "GOOGLE_CLOUD_PROJECT": "benchmark",
+        "DATASET_ID": "benchmark",
+        "TABLE_ID": "events",
+    })
+
+
+def load_package(gcs_latency: float, slack_latency: float) -> dict:
+    """
+    Imports the pipeline modules and swaps their GCS and Slack clients for fakes.
+
+    Args:
+        gcs_latency (float): Simulated seconds per GCS request.
+        slack_latency (float): Simulated seconds per Slack call.
+
+    Returns:
+        dict: {"local_engine", "big_qwery_tools", "visual_tools", "slack_tools", "chart_cache",
+            "storage", "slack"} modules and fakes.
+    """
+    sys.path.insert(0, os.path.dirname(ROOT))
+    modules = {name: importlib.import_module(f"{PACKAGE}.tools.{name}")
+               for name in ("local_engine", "big_qwery_tools", "visual_tools", "slack_tools", "chart_cache")}
+    storage = FakeStorageClient(gcs_latency)
+    slack = FakeSlackClient(slack_latency)
+    modules["visual_tools"].get_storage_client = lambda: storage
+    modules["slack_tools"].get_storage_client = lambda: storage
+    modules["slack_tools"].get_slack_client = lambda: slack
+    return {**modules, "storage": storage, "slack": slack}
+
+
+def load_scenario(pipeline: dict, params: dict) -> dict:
+    """
+    Generates a scenario's events into a fresh local extract.
+
+    Returns:
+        dict: The execute_queries arguments covering the whole scenario.
+    """
+    local_engine = pipeline["local_engine"]
+    shutil.rmtree(local_engine.LOCAL_EXTRACT_DIR, ignore_errors=True)
+    tables = generate_events(**params)
+    for day, table in tables.items():
+        local_engine.store_extract_day(day, table)
+    # The report's end bound is midnight after the last day; an empty extract lets the engine cover it.
+    end_date = str(FIRST_DAY + timedelta(days=params["days"]))
+    local_engine.store_extract_day(end_date, next(iter(tables.values())).slice(0, 0))
+    return {
+        "start_date": str(FIRST_DAY),
+        "end_date": end_date,
+        "ad_name": AD_NAME,
+        "media_sources": [f"source_{i:02d}" for i in range(params["sources"])],
+        "campaign_names": [],
+        "rows": sum(table.num_rows for table in tables.values()),
+    }
+
+
+def reset_charts(pipeline: dict) -> None:
+    """Empties the local chart cache and the fake bucket so every chart is rendered and uploaded."""
+    shutil.rmtree(pipeline["chart_cache"].CHART_CACHE_DIR, ignore_errors=True)
+    bucket = pipeline["storage"].bucket(None)
+    bucket.objects.clear()
+    bucket.blobs.clear()
+
+
+def stage_names(visual_mode: str) -> list:
+    """Returns the stages of a report in `visual_mode`, in order."""
+    return ["query"] + VISUAL_STAGES[visual_mode] + ["slack_text", "slack_visual"]
+
+
+def run_report(pipeline: dict, report: dict, visual_mode: str = "local", track_memory: bool = False) -> dict:
+    """
+    Runs every stage of one report.
+
+    Args:
+        pipeline (dict): As returned by `load_package`.
+        report (dict): As returned by `load_scenario`.
+        visual_mode (str): "local" (create_report_visuals) or "agent" (the single-chart tools).
+        track_memory (bool): Also record each stage's peak Python memory (tracemalloc must be running).
+
+    Returns:
+        dict: stage -> {"seconds"[, "peak_mb"]}, plus "total".
+
+    Raises:
+        RuntimeError: If a stage fails.
+    """
+    visual_tools, slack_tools = pipeline["visual_tools"], pipeline["slack_tools"]
+    stages = {}
+    outputs = {}
+
+    def stage(name, fn, *args):
+        if track_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        result = fn(*args)
+        stages[name] = {"seconds": time.perf_counter() - started}
+        if track_memory:
+            stages[name]["peak_mb"] = (tracemalloc.get_traced_memory()[1] - before) / 2 ** 20
+        if isinstance(result, dict) and result.get("status") not in ("success", None):
+            raise RuntimeError(f"{name} failed: {result}")
+        outputs[name] = result
+        return result
+
+    query = stage("query", pipeline["big_qwery_tools"].execute_queries, report["start_date"], report["end_date"],
+                  report["ad_name"], report["media_sources"], report["campaign_names"])
+    data = query["data"]
+    if visual_mode == "local":
+        images = stage("visuals", visual_tools.create_report_visuals, data["summary_table"], data["pairwise_overlap"])
+    else:
+        bars = [{"media_source": r["media_source"], "incrementality_score": r["incremental_score"]}
+                for r in data["summary_table"]]
+        charts = {
+            "Bar Chart": stage("bar_chart", visual_tools.plot_incrementality_bar_chart, bars),
+            "Heatmap": stage("heatmap", visual_tools.plot_pairwise_overlap_heatmap, data["pairwise_overlap"]),
+            "Metrix": stage("matrix", visual_tools.create_pairwise_overlap_metrix, data["pairwise_overlap"]),
+        }
+        images = [{"name": name, "gcs_path": chart["full_image_path"]} for name, chart in charts.items()]
+    stage("slack_text", slack_tools.send_to_slack_str, json.dumps(data))
+    stage("slack_visual", slack_tools.send_to_slack_visual, images)
+
+    stages["total"] = {"seconds": sum(s["seconds"] for s in stages.values())}
+    return stages
+
+
+def percentile(samples: list, p: float) -> float:
+    """Returns the nearest-rank percentile of `samples`."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def run_scenario(pipeline: dict, params: dict, iterations: int, warmup: int, warm_charts: bool,
+                 visual_mode: str = "local") -> dict:
+    """
+    Benchmarks one scenario.
+
+    Args:
+        pipeline (dict): As returned by `load_package`.
+        params (dict): Data parameters, as in SCENARIOS.
+        iterations (int): Measured reports.
+        warmup (int): Unmeasured reports run first (worker pool start-up, file system caches).
+        warm_charts (bool): Keep chart caches between iterations.
+        visual_mode (str): See `run_report`.
+
+    Returns:
+        dict: {"rows", stage -> {"p50", "p90", "p99", "mean", "peak_mb"}, "peak_rss_mb"}
+    """
+    report = load_scenario(pipeline, params)
+    runs = []
+    for i in range(warmup + iterations):
+        if not warm_charts:
+            reset_charts(pipeline)
+        stages = run_report(pipeline, report, visual_mode)
+        if i >= warmup:
+            runs.append(stages)
+
+    if not warm_charts:
+        reset_charts(pipeline)
+    tracemalloc.start()
+    try:
+        memory = run_report(pipeline, report, visual_mode, track_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    result = {"rows": report["rows"]}
+    for name in stage_names(visual_mode) + ["total"]:
+        samples = [run[name]["seconds"] for run in runs]
+        result[name] = {f"p{p}": round(percentile(samples, p), 4) for p in PERCENTILES}
+        result[name]["mean"] = round(statistics.mean(samples), 4)
+        if name in memory and "peak_mb" in memory[name]:
+            result[name]["peak_mb"] = round(memory[name]["peak_mb"], 1)
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """
+    Lists the regressions of `results` against `baseline`.
+
+    Args:
+        results (dict): scenario -> result, as returned by `run_scenario`.
+        baseline (dict): The stored results.
+
+    Returns:
+        list[str]: One message per regression.
+    """
+    regressions = []
+    for scenario, result in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        for name in stage_names("local") + ["total"]:
+            now, then = result[name], before.get(name)
+            if not then:
+                continue
+            limit = then["p50"] * (1 + TOLERANCE) + SLACK_SECONDS
+            if now["p50"] > limit:
+                regressions.append(f"{scenario}/{name}: p50 {now['p50']:.3f}s, baseline {then['p50']:.3f}s")
+            if "peak_mb" in now and "peak_mb" in then:
+                if now["peak_mb"] > then["peak_mb"] * (1 + TOLERANCE) + MEMORY_SLACK_MB:
+                    regressions.append(f"{scenario}/{name}: peak {now['peak_mb']:.1f} MB, "
+                                       f"baseline {then['peak_mb']:.1f} MB")
+    return regressions
+
+
+def print_result(scenario: str, params: dict, result: dict, visual_mode: str = "local") -> None:
+    """Prints one scenario's table."""
+    print(f"\n{scenario}: {params['users']} users, {params['sources']} sources, {params['campaigns']} campaigns, "
+          f"{params['days']} days, overlap {params['overlap']} ({params['popularity']}), {result['rows']} events")
+    print(f"  {'stage':14} {'p50':>8} {'p90':>8} {'p99':>8} {'mean':>8} {'peak MB':>8}")
+    for name in stage_names(visual_mode) + ["total"]:
+        row = result[name]
+        peak = f"{row['peak_mb']:8.1f}" if "peak_mb" in row else f"{'-':>8}"
+        print(f"  {name:14} {row['p50']:8.3f} {row['p90']:8.3f} {row['p99']:8.3f} {row['mean']:8.3f} {peak}")
+    print(f"  peak RSS {result['peak_rss_mb']:.1f} MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--iterations", type=int, default=5, help="measured reports per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured reports per scenario")
+    parser.add_argument("--warm-charts", action="store_true", help="keep chart caches between iterations")
+    parser.add_argument("--gcs-latency", type=float, default=0.02, help="simulated seconds per GCS request")
+    parser.add_argument("--slack-latency", type=float, default=0.05, help="simulated seconds per Slack call")
+    parser.add_argument("--visual-mode", choices=sorted(VISUAL_STAGES), default="local",
+                        help="how charts are produced: create_report_visuals or the visual_agent tools")
+    parser.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    for name, kind in (("users", int), ("sources", int), ("campaigns", int), ("days", int), ("overlap", float),
+                       ("events", float)):
+        parser.add_argument(f"--{name}", type=kind, help=f"custom scenario: {name}")
+    parser.add_argument("--popularity", choices=["uniform", "zipf"], help="custom scenario: source popularity")
+    args = parser.parse_args()
+
+    overrides = {name: getattr(args, name) for name in SCENARIOS["small"] if getattr(args, name) is not None}
+    if overrides:
+        scenarios = {"custom": {**SCENARIOS["medium"], **overrides}}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in (args.scenario or SCENARIOS)}
+
+    workdir = tempfile.mkdtemp(prefix="report-benchmark-")
+    configure_environment(workdir)
+    try:
+        pipeline = load_package(args.gcs_latency, args.slack_latency)
+        results = {}
+        for scenario, params in scenarios.items():
+            results[scenario] = run_scenario(pipeline, params, args.iterations, args.warmup, args.warm_charts,
+                                             args.visual_mode)
+            print_result(scenario, params, results[scenario], args.visual_mode)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if overrides or args.visual_mode != "local":
+        return 0
+    if args.update:
+        baseline = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("\nNo baseline yet; run with --update to create one.")
+        return 0
+    with open(BASELINE_PATH) as f:
+        regressions = compare(results, json.load(f))
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
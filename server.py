@@ -0,0 +1,272 @@
+import asyncio
+import json
+import time
+import uuid
+from datetime import date
+from typing import Awaitable, Callable, Optional
+from .tools.query_cache import make_cache_key
+from .tools.settings import settings
+from .tools.telemetry import increment, span, start_metrics_server
+
+# Reports executing at once across all tenants; beyond it requests wait in the admission queue.
+REPORT_MAX_CONCURRENT = settings.report_max_concurrent
+# Requests allowed to wait for a free slot once their tenant has capacity; more are rejected at once.
+REPORT_MAX_QUEUED = settings.report_max_queued
+# Reports of a single tenant executing at once.
+REPORT_TENANT_CONCURRENCY = settings.report_tenant_concurrency
+# Requests of a single tenant allowed to wait for one of its own slots; more are rejected at once.
+REPORT_TENANT_MAX_QUEUED = settings.report_tenant_max_queued
+# Seconds a request may wait for a slot before it is rejected, and seconds a report may run.
+REPORT_QUEUE_TIMEOUT = settings.report_queue_timeout
+REPORT_TIMEOUT = settings.report_timeout
+
+APP_NAME = "ai_agents"
+_runner = None
+# Retry hint returned with rejections.
+RETRY_AFTER_SECONDS = 60
+
+
+def normalize_request(request: dict) -> dict:
+    """
+    Normalizes a report request so that equivalent requests compare equal.
+
+    Args:
+        request (dict): The agent's input requirements:
+            - "ad_name" (str)
+            - "date_range" (tuple[str, str]): (start_date, end_date)
+            - "media_sources" (list[str])
+            - "campaign_name" or "campaign_names" (list[str], optional)
+
+    Returns:
+        dict: {"ad_name", "date_range": [start, end] as YYYY-MM-DD, "media_sources": sorted and
+            de-duplicated, "campaign_name": sorted and de-duplicated}
+
+    Raises:
+        ValueError: If a required parameter is missing or malformed.
+    """
+    try:
+        ad_name = str(request["ad_name"]).strip()
+        start_date, end_date = (date.fromisoformat(str(d).strip()[:10]).isoformat() for d in request["date_range"])
+        media_sources = sorted({str(s).strip() for s in request["media_sources"]})
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid report request {request!r}: {e}") from e
+    campaigns = request.get("campaign_names", request.get("campaign_name")) or []
+    if isinstance(campaigns, str):
+        campaigns = [campaigns]
+    return {
+        "ad_name": ad_name,
+        "date_range": [start_date, end_date],
+        "media_sources": media_sources,
+        "campaign_name": sorted({str(c).strip() for c in campaigns}),
+    }
+
+
+def request_key(normalized: dict) -> str:
+    """Returns the single-flight key of a normalized request."""
+    start_date, end_date = normalized["date_range"]
+    return make_cache_key(start_date, end_date, normalized["ad_name"], normalized["media_sources"],
+                          normalized["campaign_name"], namespace="request")
+
+
+async def run_root_agent(tenant: str, request: dict) -> str:
+    """
+    Runs one report through root_agent in a fresh ADK session.
+
+    Args:
+        tenant (str): Used as the ADK user id.
+        request (dict): A normalized request.
+
+    Returns:
+        str: The agent's final response text.
+    """
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+    from .agent import root_agent
+
+    global _runner
+    if _runner is None:
+        _runner = InMemoryRunner(agent=root_agent, app_name=APP_NAME)
+    session = await _runner.session_service.create_session(app_name=APP_NAME, user_id=tenant)
+    message = types.Content(role="user", parts=[types.Part(text=f"Run the report for: {json.dumps(request)}")])
+
+    response = ""
+    async for event in _runner.run_async(user_id=tenant, session_id=session.id, new_message=message):
+        if event.is_final_response() and event.content and event.content.parts:
+            response = "".join(part.text or "" for part in event.content.parts)
+    return response
+
+
+class _Flight:
+    """One execution of a report shared by every identical request that arrives while it runs."""
+
+    def __init__(self, key: str, tenant: str, request: dict):
+        self.key = key
+        self.tenant = tenant
+        self.request = request
+        self.waiters = 1
+        self.task: Optional[asyncio.Task] = None
+
+
+class ReportServer:
+    """
+    Serving layer around root_agent for many tenants in one process.
+
+    - Single flight: concurrent requests with identical normalized parameters share one execution,
+      whose result is returned to every waiter (the report is posted to Slack once).
+    - Admission control: at most REPORT_MAX_CONCURRENT reports execute at once and at most
+      REPORT_MAX_QUEUED wait for a slot; further requests, and requests still waiting after
+      REPORT_QUEUE_TIMEOUT seconds, are rejected with a retry hint instead of piling up on the
+      BigQuery slot and Slack rate limits. A request that starts at once is never counted as queued.
+    - Per-tenant limits: a tenant executes at most REPORT_TENANT_CONCURRENCY reports at once and at
+      most REPORT_TENANT_MAX_QUEUED of its requests wait for one of those slots. Such waits count
+      against the tenant's own queue only, so one tenant's burst can neither take every slot nor
+      fill the shared queue. Requests joining another flight use no slot.
+
+    Constructing the server also starts the Prometheus endpoint on METRICS_PORT (if set), so the
+    process hosting it exposes its metrics; importing the agent alone never binds a port.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, execute: Callable[[str, dict], Awaitable] = run_root_agent,
+                 max_concurrent: int = None, max_queued: int = None, tenant_concurrency: int = None,
+                 tenant_max_queued: int = None, queue_timeout: float = None, timeout: float = None):
+        """
+        Args:
+            execute: Coroutine function (tenant, normalized request) -> result; runs root_agent by default.
+            max_concurrent (int, optional): Defaults to REPORT_MAX_CONCURRENT.
+            max_queued (int, optional): Defaults to REPORT_MAX_QUEUED.
+            tenant_concurrency (int, optional): Defaults to REPORT_TENANT_CONCURRENCY.
+            tenant_max_queued (int, optional): Defaults to REPORT_TENANT_MAX_QUEUED.
+            queue_timeout (float, optional): Defaults to REPORT_QUEUE_TIMEOUT.
+            timeout (float, optional): Defaults to REPORT_TIMEOUT.
+        """
+        self.execute = execute
+        self.max_concurrent = max_concurrent or REPORT_MAX_CONCURRENT
+        self.max_queued = REPORT_MAX_QUEUED if max_queued is None else max_queued
+        self.tenant_concurrency = tenant_concurrency or REPORT_TENANT_CONCURRENCY
+        self.tenant_max_queued = REPORT_TENANT_MAX_QUEUED if tenant_max_queued is None else tenant_max_queued
+        self.queue_timeout = REPORT_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.timeout = timeout or REPORT_TIMEOUT
+        self._flights = {}
+        self._slots = None
+        self._tenant_slots = {}
+        self._tenant_flights = {}
+        self._running = 0
+        start_metrics_server()
+
+    async def submit(self, tenant: str, request: dict) -> dict:
+        """
+        Serves a report request, joining an identical one that is already in flight.
+
+        Cancelling the caller stops its wait only; the shared execution continues for the others.
+
+        Args:
+            tenant (str): The requesting tenant.
+            request (dict): The report parameters, as taken by `normalize_request`.
+
+        Returns:
+            dict: Contains either:
+                - "status": "success", with "result" (the agent's response), "coalesced" (whether this
+                  request joined another one's execution) and "waiters" (requests served by it)
+                - "status": "rejected", with "error_message" and "retry_after" (seconds)
+                - "status": "error", with "error_message"
+        """
+        try:
+            normalized = normalize_request(request)
+        except ValueError as e:
+            increment("report_requests_total", tenant=tenant, outcome="invalid")
+            return {"status": "error", "error_message": str(e)}
+
+        key = request_key(normalized)
+        flight = self._flights.get(key)
+        coalesced = flight is not None
+        if coalesced:
+            flight.waiters += 1
+        else:
+            tenant_queued, queued = self._queue_lengths(tenant)
+            if tenant_queued >= self.tenant_max_queued:
+                increment("report_requests_total", tenant=tenant, outcome="rejected")
+                return self._rejection(f"Report queue of tenant {tenant!r} is full")
+            if tenant_queued < 0 and queued >= self.max_queued:
+                increment("report_requests_total", tenant=tenant, outcome="rejected")
+                return self._rejection("Report queue is full")
+            flight = _Flight(key, tenant, normalized)
+            self._flights[key] = flight
+            self._tenant_flights[tenant] = self._tenant_flights.get(tenant, 0) + 1
+            flight.task = asyncio.ensure_future(self._run(flight))
+        increment("report_requests_total", tenant=tenant, outcome="coalesced" if coalesced else "new")
+
+        outcome = await asyncio.shield(flight.task)
+        if outcome["status"] == "success":
+            return {**outcome, "coalesced": coalesced, "waiters": flight.waiters}
+        return outcome
+
+    def stats(self) -> dict:
+        """Returns the current load: reports running / queued (shared and per tenant) and flights with their waiter counts."""
+        return {
+            "running": self._running,
+            "queued": max(self._queue_lengths()[1], 0),
+            "tenant_queued": {tenant: n - self.tenant_concurrency for tenant, n in self._tenant_flights.items()
+                              if n > self.tenant_concurrency},
+            "flights": {key: {"tenant": f.tenant, "waiters": f.waiters} for key, f in self._flights.items()},
+        }
+
+    def _queue_lengths(self, tenant: str = None) -> tuple:
+        """
+        Returns (requests of `tenant` beyond its slots, requests holding a tenant slot beyond the shared ones).
+
+        Flights take their tenant's slots first come first served, so a tenant with n flights holds
+        min(n, tenant_concurrency) of them and the rest wait in its own queue; flights holding a
+        tenant slot wait for a shared one while more than max_concurrent do. A value is negative
+        while slots are free, i.e. a new request would not wait at that stage.
+        """
+        holding = sum(min(n, self.tenant_concurrency) for n in self._tenant_flights.values())
+        return self._tenant_flights.get(tenant, 0) - self.tenant_concurrency, holding - self.max_concurrent
+
+    def _rejection(self, reason: str) -> dict:
+        return {"status": "rejected", "error_message": f"{reason}; retry later.", "retry_after": RETRY_AFTER_SECONDS}
+
+    async def _run(self, flight: _Flight) -> dict:
+        """Admits and executes a flight (counted by `submit` in its tenant's flights), then retires it."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        tenant_slots = self._tenant_slots.setdefault(flight.tenant, asyncio.Semaphore(self.tenant_concurrency))
+        queued_at = time.monotonic()
+        acquired = []
+        try:
+            try:
+                for slots in (tenant_slots, self._slots):
+                    if slots.locked():
+                        remaining = self.queue_timeout - (time.monotonic() - queued_at)
+                        await asyncio.wait_for(slots.acquire(), timeout=max(remaining, 0))
+                    else:
+                        # A free slot is taken at once; the queue timeout only bounds actual waits.
+                        await slots.acquire()
+                    acquired.append(slots)
+            except asyncio.TimeoutError:
+                increment("report_requests_total", tenant=flight.tenant, outcome="timed_out")
+                return self._rejection(f"No capacity within {self.queue_timeout}s")
+
+            self._running += 1
+            try:
+                with span("report.execute", tenant=flight.tenant, queue_seconds=round(time.monotonic() - queued_at, 3),
+                          report_id=uuid.uuid4().hex[:12]) as report_span:
+                    try:
+                        result = await asyncio.wait_for(self.execute(flight.tenant, flight.request), self.timeout)
+                    except Exception as e:
+                        report_span.fail(e)
+                        return {"status": "error", "error_message": str(e) or type(e).__name__}
+                    finally:
+                        report_span.set(waiters=flight.waiters)
+                return {"status": "success", "result": result}
+            finally:
+                self._running -= 1
+        finally:
+            for slots in acquired:
+                slots.release()
+            self._flights.pop(flight.key, None)
+            self._tenant_flights[flight.tenant] -= 1
+            if not self._tenant_flights[flight.tenant]:
+                del self._tenant_flights[flight.tenant]
+                del self._tenant_slots[flight.tenant]
@@ -0,0 +1,44 @@
+import asyncio
+from ..tools import async_tools, query_backend
+from ..tools.query_backend import QueryBackend
+from ..tools.query_cache import MemoryCacheBackend, set_result_cache
+
+
+class FakeBackend(QueryBackend):
+    name = "local"
+
+    def __init__(self, covered=True):
+        self.covered = covered
+        self.reports = []
+
+    def cache_namespace(self) -> str:
+        return "fake"
+
+    def covers(self, start_date, end_date):
+        from datetime import date
+        date.fromisoformat(start_date), date.fromisoformat(end_date)
+        return self.covered
+
+    def run_report(self, start_date, end_date, ad_name, media_sources, campaign_names):
+        self.reports.append((start_date, end_date, ad_name, media_sources, campaign_names))
+        return {"summary_table": [], "pairwise_overlap": []}, {}, {}
+
+
+def test_malformed_dates_return_an_error(monkeypatch):
+    monkeypatch.setattr(query_backend, "QUERY_BACKEND", "auto")
+    monkeypatch.setitem(query_backend._backends, "local", FakeBackend())
+    result = asyncio.run(async_tools.execute_queries_async("2024-1-5", "2024-01-07", "app", ["fb", "g"], []))
+    assert result["status"] == "error"
+
+
+def test_reports_run_with_normalized_inputs():
+    backend = FakeBackend()
+    query_backend.set_query_backend(backend)
+    set_result_cache(MemoryCacheBackend())
+    try:
+        result = asyncio.run(async_tools.execute_queries_async("2024-01-01", "2024-01-07", " app ", ["g", "fb "], None))
+    finally:
+        query_backend.set_query_backend(None)
+        set_result_cache(None)
+    assert result["status"] == "success" and result["backend"] == "local"
+    assert backend.reports == [("2024-01-01", "2024-01-07", "app", ["fb", "g"], [])]
@@ -0,0 +1,76 @@
+import pytest
+from ..tools import batch_reports
+from ..tools.batch_reports import batch_execute_queries, normalize_report_spec
+from ..tools.query_cache import MemoryCacheBackend, make_cache_key, set_result_cache
+
+
+@pytest.fixture
+def cache():
+    backend = MemoryCacheBackend()
+    set_result_cache(backend)
+    yield backend
+    set_result_cache(None)
+
+
+def test_normalize_report_spec_matches_execute_queries_inputs():
+    spec = normalize_report_spec({"ad_name": " app ", "date_range": ["2024-01-01T12:00:00", "2024-01-07"],
+                                  "media_sources": ["fb ", "fb", "g"]}, 0)
+    assert spec == {"spec_id": "0", "ad_name": "app", "start_date": "2024-01-01", "end_date": "2024-01-07",
+                    "media_sources": ["fb", "g"], "campaign_names": []}
+
+
+def test_normalize_report_spec_accepts_single_campaign_name():
+    spec = normalize_report_spec({"ad_name": "app", "start_date": "2024-01-01", "end_date": "2024-01-07",
+                                  "media_sources": ["g", "fb"], "campaign_name": " spring ", "spec_id": 7}, 3)
+    assert spec["spec_id"] == "7"
+    assert spec["campaign_names"] == ["spring"]
+
+
+@pytest.mark.parametrize("spec", [
+    None,
+    "app",
+    {"ad_name": "app", "media_sources": ["fb", "g"]},
+    {"ad_name": "app", "date_range": ["2024-01-01", "2024-01-07"], "media_sources": "fb"},
+    {"ad_name": "app", "date_range": ["2024-1-1", "2024-01-07"], "media_sources": ["fb", "g"]},
+    {"ad_name": 3, "date_range": ["2024-01-01", "2024-01-07"], "media_sources": ["fb", "g"]},
+    {"ad_name": "app", "date_range": ["2024-01-01"], "media_sources": ["fb", "g"]},
+])
+def test_normalize_report_spec_rejects_malformed_specs(spec):
+    with pytest.raises(ValueError):
+        normalize_report_spec(spec, 0)
+
+
+def test_batch_uses_the_execute_queries_cache_key(cache, monkeypatch):
+    data = {"summary_table": [{"media_source": "fb"}], "pairwise_overlap": []}
+    cache.set(make_cache_key("2024-01-01", "2024-01-07", "app", ["fb", "g"], [], namespace="exact"), data, 60)
+    monkeypatch.setattr(batch_reports, "connect_db", lambda: pytest.fail("cached specs must not query"))
+
+    results = batch_execute_queries([
+        {"ad_name": " app ", "date_range": ["2024-01-01T12:00:00", "2024-01-07"], "media_sources": ["fb ", "fb", "g"]},
+        None,
+        {"ad_name": "app"},
+    ])
+
+    assert results[0] == {"status": "success", "data": data, "cache_hit": True}
+    assert results[1]["status"] == "error" and "must be a dict" in results[1]["data"]["error_message"]
+    assert results[2]["status"] == "error"
+
+
+def test_batch_binds_the_normalized_spec(cache, monkeypatch):
+    captured = {}
+
+    def fail_after_binding(group, time_type):
+        captured["group"] = group
+        raise RuntimeError("stop")
+
+    monkeypatch.setattr(batch_reports, "connect_db", lambda: (None, "p", "d", "t"))
+    monkeypatch.setattr(batch_reports, "get_table_metadata", lambda: {})
+    monkeypatch.setattr(batch_reports, "event_time_type", lambda metadata: "TIMESTAMP")
+    monkeypatch.setattr(batch_reports, "build_batch_parameters", fail_after_binding)
+
+    results = batch_execute_queries([{"ad_name": " app ", "date_range": ["2024-01-01T12:00:00", "2024-01-07"],
+                                      "media_sources": ["fb ", "fb", "g"]}])
+
+    assert results[0]["status"] == "error"
+    (spec,) = captured["group"]
+    assert (spec["ad_name"], spec["start_date"], spec["media_sources"]) == ("app", "2024-01-01", ["fb", "g"])
@@ -0,0 +1,24 @@
+import pytest
+from ..tools import local_engine
+from ..tools.local_engine import LocalBackend
+
+
+@pytest.fixture
+def manifest(monkeypatch):
+    state = {"table": local_engine._table_name(), "event_time_type": "STRING",
+             "days": ["2024-01-01", "2024-01-02", "2024-01-03"], "complete_through": "2024-01-03"}
+    monkeypatch.setattr(local_engine, "read_manifest", lambda: state)
+    return state
+
+
+def test_covers_requires_every_day(manifest):
+    backend = LocalBackend()
+    assert backend.covers("2024-01-01", "2024-01-03")
+    assert not backend.covers("2023-12-31", "2024-01-03")
+    assert not backend.covers("2024-01-01", "2024-01-04")
+
+
+def test_run_report_refuses_a_partly_extracted_range(manifest, monkeypatch):
+    monkeypatch.setattr(local_engine, "run_local_report", lambda *args: pytest.fail("must not run"))
+    with pytest.raises(RuntimeError, match="does not cover"):
+        LocalBackend().run_report("2024-01-01", "2024-01-07", "app", ["fb", "g"], [])
@@ -0,0 +1,45 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from ..tools.local_engine import EXTRACT_COLUMNS, run_local_report
+from ..tools.overlap_engine import compute_pairwise_overlap, round_half_away
+
+
+@pytest.mark.parametrize("value, expected", [(3.125, 3.13), (15.625, 15.63), (9.375, 9.38), (1.0, 1.0),
+                                             (33.333333, 33.33), (66.666666, 66.67), (0.0, 0.0)])
+def test_round_half_away(value, expected):
+    assert round_half_away(value) == expected
+
+
+def _write_events(path, user_ids_by_source):
+    rows = [(source, user) for source, users in user_ids_by_source.items() for user in users]
+    table = pa.table({
+        "event_time": ["2024-01-02 10:00:00"] * len(rows),
+        "advertising_id_value": [user for _, user in rows],
+        "media_source": [source for source, _ in rows],
+        "engagement_type": ["view"] * len(rows),
+        "ad_name": ["app"] * len(rows),
+        "campaign_name": ["spring"] * len(rows),
+    }).select(EXTRACT_COLUMNS)
+    pq.write_table(table, path)
+    return str(path)
+
+
+def test_overlap_matches_the_sql_path_on_ties(tmp_path):
+    # 1/32, 5/32 and 3/32 of a source's users are exact .xx5 ties at two decimals.
+    fb = [f"u{i}" for i in range(32)]
+    user_ids_by_source = {
+        "fb": fb,
+        "g": fb[:1] + [f"g{i}" for i in range(99)],
+        "tt": fb[:5] + [f"t{i}" for i in range(27)],
+        "x": fb[5:8] + [f"x{i}" for i in range(5)],
+    }
+    path = _write_events(tmp_path / "events.parquet", user_ids_by_source)
+
+    sql = run_local_report([path], "2024-01-01", "2024-01-08", "app", sorted(user_ids_by_source), [],
+                           event_time_type="STRING")["overlap"]
+    local = compute_pairwise_overlap(user_ids_by_source)
+
+    key = lambda r: (r["source_1"], r["source_2"])
+    assert sorted(local, key=key) == sorted(sql, key=key)
+    assert {key(r): r["overlap_percent"] for r in local}[("fb", "g")] == 3.13
@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from ..server import ReportServer, normalize_request, request_key
+
+
+def _request(source="fb", ad_name="app"):
+    return {"ad_name": ad_name, "date_range": ("2024-01-01", "2024-01-07"), "media_sources": [source, "zz"]}
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class Execute:
+    """Fake report execution that records calls and holds each one for `delay` seconds."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, tenant, request):
+        self.calls.append((tenant, request))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if request["ad_name"] == "boom":
+                raise RuntimeError("query failed")
+            return f"report for {tenant}"
+        finally:
+            self.running -= 1
+
+
+def test_normalize_request_makes_equivalent_requests_share_a_key():
+    a = normalize_request({"ad_name": " app", "date_range": ["2024-01-01T00:00:00", "2024-01-07"],
+                           "media_sources": ["g", "fb", "fb "], "campaign_name": "spring"})
+    b = normalize_request({"ad_name": "app", "date_range": ("2024-01-01", "2024-01-07"),
+                           "media_sources": ["fb", "g"], "campaign_names": ["spring"]})
+    assert a == b and request_key(a) == request_key(b)
+    with pytest.raises(ValueError):
+        normalize_request({"ad_name": "app"})
+
+
+def test_identical_requests_share_one_execution():
+    execute = Execute()
+
+    async def main():
+        server = ReportServer(execute, max_concurrent=2, max_queued=2, tenant_concurrency=1)
+        requests = [_request(), {**_request(), "media_sources": ["zz", "fb", " fb"]}, _request()]
+        return await asyncio.gather(*(server.submit(f"t{i}", r) for i, r in enumerate(requests)))
+
+    results = _run(main())
+    assert len(execute.calls) == 1
+    assert [r["coalesced"] for r in results] == [False, True, True]
+    assert {r["result"] for r in results} == {"report for t0"} and results[0]["waiters"] == 3
+
+
+def test_only_waiting_requests_count_against_the_shared_queue():
+    execute = Execute()
+
+    async def main():
+        server = ReportServer(execute, max_concurrent=2, max_queued=3, tenant_concurrency=1)
+        tasks = [asyncio.ensure_future(server.submit(f"t{i}", _request(f"s{i}"))) for i in range(7)]
+        await asyncio.sleep(0.01)
+        stats = server.stats()
+        return stats, await asyncio.gather(*tasks)
+
+    stats, results = _run(main())
+    assert stats["running"] == 2 and stats["queued"] == 3
+    assert [r["status"] for r in results] == ["success"] * 5 + ["rejected"] * 2
+    assert execute.peak == 2
+
+
+def test_a_tenant_backlog_does_not_fill_the_shared_queue():
+    execute = Execute()
+
+    async def main():
+        server = ReportServer(execute, max_concurrent=2, max_queued=1, tenant_concurrency=1, tenant_max_queued=2)
+        tasks = [asyncio.ensure_future(server.submit("big", _request(f"s{i}"))) for i in range(5)]
+        tasks.append(asyncio.ensure_future(server.submit("small", _request("other"))))
+        await asyncio.sleep(0.01)
+        stats = server.stats()
+        return stats, await asyncio.gather(*tasks)
+
+    stats, results = _run(main())
+    assert stats["tenant_queued"] == {"big": 2} and stats["queued"] == 0
+    assert [r["status"] for r in results] == ["success"] * 3 + ["rejected"] * 2 + ["success"]
+    assert "'big'" in results[3]["error_message"]
+
+
+def test_idle_server_admits_with_zero_queue_timeout():
+    async def main():
+        server = ReportServer(Execute(0), max_concurrent=1, tenant_concurrency=1, queue_timeout=0)
+        return await server.submit("t", _request())
+
+    assert _run(main())["status"] == "success"
+
+
+def test_queue_timeout_rejects_requests_still_waiting():
+    async def main():
+        server = ReportServer(Execute(0.2), max_concurrent=1, tenant_concurrency=1, queue_timeout=0.05)
+        return await asyncio.gather(server.submit("a", _request("a")), server.submit("b", _request("b")))
+
+    first, second = _run(main())
+    assert first["status"] == "success"
+    assert second["status"] == "rejected" and second["retry_after"] > 0
+
+
+def test_errors_and_invalid_requests_are_reported():
+    async def main():
+        server = ReportServer(Execute(0))
+        failed = await server.submit("t", _request(ad_name="boom"))
+        invalid = await server.submit("t", {"ad_name": "app"})
+        return failed, invalid, server.stats()
+
+    failed, invalid, stats = _run(main())
+    assert failed == {"status": "error", "error_message": "query failed"}
+    assert invalid["status"] == "error"
+    assert stats["flights"] == {} and stats["running"] == 0
+
+
+def test_cancelling_one_waiter_keeps_the_shared_execution():
+    execute = Execute(0.1)
+
+    async def main():
+        server = ReportServer(execute)
+        first = asyncio.ensure_future(server.submit("a", _request()))
+        second = asyncio.ensure_future(server.submit("b", _request()))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert _run(main())["status"] == "success"
+    assert len(execute.calls) == 1
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+import pytest
+from ..tools import telemetry
+from ..tools.telemetry import (
+    after_tool_callback, agent_callbacks, before_tool_callback, current_span, on_tool_error_callback,
+    recent_spans, reset_telemetry, span,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    reset_telemetry()
+    yield
+    reset_telemetry()
+
+
+def _call(call_id):
+    return SimpleNamespace(name="execute_queries"), SimpleNamespace(invocation_id="inv", function_call_id=call_id,
+                                                                    agent_name="agent")
+
+
+def test_tool_span_is_current_while_the_tool_runs():
+    tool, context = _call("c1")
+    before_tool_callback(tool, {}, context)
+    with span("execute_queries"):
+        pass
+    after_tool_callback(tool, {}, context, {"status": "success"})
+
+    (call,) = recent_spans("tool.call")
+    (child,) = recent_spans("execute_queries")
+    assert child["parent_id"] == call["span_id"]
+    assert current_span() is None
+    assert not telemetry._open_spans
+
+
+def test_tool_error_closes_the_span():
+    tool, context = _call("c2")
+    before_tool_callback(tool, {}, context)
+    on_tool_error_callback(tool, {}, context, RuntimeError("boom"))
+
+    (call,) = recent_spans("tool.call")
+    assert call["status"] == "error" and call["error"] == "boom"
+    assert not telemetry._open_spans
+
+
+def test_open_spans_are_bounded(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_MAX_OPEN_SPANS", 2)
+    for i in range(3):
+        telemetry._open_span(("llm", i), telemetry.start_span("llm.turn"))
+    assert list(telemetry._open_spans) == [("llm", 1), ("llm", 2)]
+    (abandoned,) = recent_spans("llm.turn")
+    assert abandoned["status"] == "error"
+
+
+def test_agent_callbacks_skip_error_hooks_the_agent_lacks():
+    old = SimpleNamespace(model_fields={"before_tool_callback": None})
+    new = SimpleNamespace(model_fields={"on_tool_error_callback": None, "on_model_error_callback": None})
+    assert "on_tool_error_callback" not in agent_callbacks(old)
+    assert "on_tool_error_callback" in agent_callbacks(new)
@@ -0,0 +1,57 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from ..tools import chart_cache, visual_tools
+from ..tools.visual_tools import publish_charts
+
+
+@pytest.fixture
+def charts(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_cache, "CHART_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(visual_tools, "render_charts", lambda jobs: {name: b"jpeg:" + name.encode() for name in jobs})
+    monkeypatch.setattr(visual_tools, "get_storage_client", lambda: pytest.fail("GCS must not be used"))
+    monkeypatch.setattr(visual_tools, "upload_to_gcs", lambda *args, **kwargs: pytest.fail("must not upload"))
+    return tmp_path
+
+
+def test_skip_is_respected_with_the_cache_disabled(charts, monkeypatch):
+    monkeypatch.setattr(visual_tools, "CHART_CACHE_ENABLED", False)
+    result = publish_charts({"Bar Chart": (None, []), "Heatmap": (None, [])}, archive_mode="skip")
+
+    assert [chart["gcs_path"] for chart in result.values()] == [None, None]
+    for chart in result.values():
+        assert chart_cache.is_local_chart(chart["image_path"])
+    with open(result["Heatmap"]["image_path"], "rb") as f:
+        assert f.read() == b"jpeg:Heatmap"
+
+
+class FailingBlob:
+    def upload_from_string(self, image, content_type=None):
+        raise OSError("bucket unavailable")
+
+
+class FailingBucket:
+    def get_blob(self, name):
+        return None
+
+    def blob(self, name):
+        return FailingBlob()
+
+    def list_blobs(self, prefix=None):
+        return []
+
+
+def test_failed_async_archive_is_logged_and_dropped(charts, monkeypatch, caplog):
+    bucket = FailingBucket()
+    archive_pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(visual_tools, "_get_archive_pool", lambda: archive_pool)
+    monkeypatch.setattr(visual_tools, "CHART_CACHE_ENABLED", True)
+    monkeypatch.setattr(visual_tools, "get_storage_client", lambda: type("Client", (), {"bucket": lambda self, name: bucket})())
+
+    with caplog.at_level(logging.WARNING, logger="ai_agents.charts"):
+        result = publish_charts({"Bar Chart": (None, [{"media_source": "fb"}])}, archive_mode="async")
+        archive_pool.shutdown(wait=True)
+
+    assert "bucket unavailable" in caplog.text
+    assert not os.path.exists(result["Bar Chart"]["image_path"])
@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from .big_qwery_tools import execute_queries
+from .query_backend import get_query_backend
+from .query_cache import normalize_report_inputs
+from .settings import settings
+from .slack_tools import send_to_slack_visual, slack_post_message
+from .visual_tools import (
+    create_pairwise_overlap_metrix, create_report_visuals, plot_incrementality_bar_chart,
+    plot_pairwise_overlap_heatmap,
+)
+
+# Tool calls allowed to run at once per backend, across every session of the process. Callers
+# beyond the limit wait on the event loop, not in a thread.
+BACKEND_CONCURRENCY = {
+    "bigquery": settings.bigquery_concurrency,
+    "local": settings.local_query_concurrency,
+    "charts": settings.chart_concurrency,
+    "slack": settings.slack_concurrency,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+# Semaphores are bound to an event loop, so they are kept per loop.
+_limits = weakref.WeakKeyDictionary()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool blocking tools run on, sized for every backend at its limit."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=sum(BACKEND_CONCURRENCY.values()),
+                                           thread_name_prefix="async-tool")
+        return _executor
+
+
+def backend_limit(backend: str) -> asyncio.Semaphore:
+    """
+    Returns the semaphore bounding concurrent calls to a backend on the running event loop.
+
+    Args:
+        backend (str): A BACKEND_CONCURRENCY key; other backends get a limit of 1.
+
+    Returns:
+        asyncio.Semaphore: Shared by every coroutine of the loop.
+    """
+    limits = _limits.setdefault(asyncio.get_running_loop(), {})
+    if backend not in limits:
+        limits[backend] = asyncio.Semaphore(BACKEND_CONCURRENCY.get(backend, 1))
+    return limits[backend]
+
+
+async def run_blocking(backend: str, fn, *args, **kwargs):
+    """
+    Runs a blocking call in the tool thread pool once the backend has a free slot.
+
+    The caller's context (e.g. the current telemetry span) is carried into the thread. Cancelling
+    the coroutine stops waiting but cannot interrupt a call that has already started.
+
+    Args:
+        backend (str): The BACKEND_CONCURRENCY key the call counts against.
+        fn: The blocking callable.
+        *args: Positional arguments of `fn`.
+        **kwargs: Keyword arguments of `fn`.
+
+    Returns:
+        The return value of `fn`.
+    """
+    async with backend_limit(backend):
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+
+def _async_tool(fn, backend: str):
+    """
+    Wraps a blocking tool as a coroutine function limited by `backend`.
+
+    The wrapper keeps the tool's name, signature and docstring, so the ADK declares it to the
+    model exactly like the synchronous tool.
+    """
+    @functools.wraps(fn)
+    async def tool(*args, **kwargs):
+        return await run_blocking(backend, fn, *args, **kwargs)
+
+    return tool
+
+
+@functools.wraps(execute_queries)
+async def execute_queries_async(start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                                campaign_names: List[str]):
+    # Limited per query engine: BigQuery reports wait on the network, local ones use every core. The
+    # engine is picked in the pool, as "auto" reads the extract manifest from disk.
+    try:
+        start_date, end_date, ad_name, media_sources, campaign_names = normalize_report_inputs(
+            start_date, end_date, ad_name, media_sources, campaign_names)
+        backend = await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), get_query_backend, start_date, end_date)
+    except Exception as e:
+        return {"status": "error", "data": {"error_message": str(e)}}
+    return await run_blocking(backend.name, execute_queries, start_date, end_date, ad_name, media_sources,
+                              campaign_names)
+
+
+plot_incrementality_bar_chart_async = _async_tool(plot_incrementality_bar_chart, "charts")
+plot_pairwise_overlap_heatmap_async = _async_tool(plot_pairwise_overlap_heatmap, "charts")
+create_pairwise_overlap_metrix_async = _async_tool(create_pairwise_overlap_metrix, "charts")
+create_report_visuals_async = _async_tool(create_report_visuals, "charts")
+slack_post_message_async = _async_tool(slack_post_message, "slack")
+send_to_slack_visual_async = _async_tool(send_to_slack_visual, "slack")
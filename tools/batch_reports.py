@@ -0,0 +1,177 @@
+from datetime import date
+from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from .big_qwery_tools import (
+    MAX_BYTES_BILLED, DRY_RUN_CHECK, connect_db, get_table_metadata, event_time_type, run_job,
+)
+from .query_cache import get_result_cache, make_cache_key, normalize_report_inputs, ttl_for_range
+from .report_sql import SUMMARY_COLUMNS, OVERLAP_COLUMNS, build_batch_script, build_batch_parameters
+from .result_reader import collect_tagged
+
+
+def normalize_report_spec(spec: dict, index: int) -> dict:
+    """
+    Validates a report spec, fills in defaults and normalizes it like `execute_queries` does, so the
+    cache key and the query parameters are built from the same values.
+
+    Args:
+        spec (dict): With "ad_name", "media_sources", either "date_range" ([start, end]) or
+            "start_date" / "end_date", and optionally "campaign_names" / "campaign_name" and "spec_id".
+        index (int): Position of the spec, used as its default spec_id.
+
+    Returns:
+        dict: With "spec_id", "ad_name", "start_date", "end_date", "media_sources", "campaign_names",
+            as returned by `normalize_report_inputs`.
+
+    Raises:
+        ValueError: If the spec is not a dict, or a required field is missing or malformed.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Report spec {index} must be a dict: {spec!r}")
+    try:
+        start_date, end_date = spec.get("date_range") or (spec.get("start_date"), spec.get("end_date"))
+        if not spec.get("ad_name") or not spec.get("media_sources") or not start_date or not end_date:
+            raise ValueError("missing field")
+        if isinstance(spec["media_sources"], str):
+            raise ValueError("media_sources must be a list")
+        campaign_names = spec.get("campaign_names") or spec.get("campaign_name") or []
+        if isinstance(campaign_names, str):
+            campaign_names = [campaign_names]
+        start_date, end_date, ad_name, media_sources, campaign_names = normalize_report_inputs(
+            start_date, end_date, spec["ad_name"], spec["media_sources"], campaign_names)
+        date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Report spec {index} needs ad_name, media_sources and a date range "
+                         f"(YYYY-MM-DD): {spec!r} ({e})") from e
+    return {
+        "spec_id": str(spec.get("spec_id", index)),
+        "ad_name": ad_name,
+        "start_date": start_date,
+        "end_date": end_date,
+        "media_sources": media_sources,
+        "campaign_names": campaign_names,
+    }
+
+
+def group_report_specs(specs: List[dict]) -> List[List[dict]]:
+    """
+    Groups specs whose date windows overlap, so each group can share one scan.
+
+    Args:
+        specs (List[dict]): Normalized specs.
+
+    Returns:
+        List[List[dict]]: Groups of specs; windows in different groups do not overlap.
+    """
+    groups = []
+    group_end = None
+    for spec in sorted(specs, key=lambda s: (s["start_date"], s["end_date"])):
+        if groups and spec["start_date"] <= group_end:
+            groups[-1].append(spec)
+            group_end = max(group_end, spec["end_date"])
+        else:
+            groups.append([spec])
+            group_end = spec["end_date"]
+    return groups
+
+
+def _split_by_spec(output: dict, spec_ids: List[str]) -> dict:
+    """
+    Splits the batch result rows back into one payload per spec.
+
+    Args:
+        output (dict): {"summary": [...], "overlap": [...]} records carrying a "spec_id".
+        spec_ids (List[str]): Every spec of the group, so empty reports are kept.
+
+    Returns:
+        dict: spec_id -> {"summary_table": [...], "pairwise_overlap": [...]}
+    """
+    data = {spec_id: {"summary_table": [], "pairwise_overlap": []} for spec_id in spec_ids}
+    for record in output["summary"]:
+        data[record.pop("spec_id")]["summary_table"].append(record)
+    for record in output["overlap"]:
+        data[record.pop("spec_id")]["pairwise_overlap"].append(record)
+    return data
+
+
+def batch_execute_queries(report_specs: List[dict]) -> List[dict]:
+    """
+    Runs many reports with one BigQuery scan per group of overlapping date windows.
+
+    Cached reports are answered from the result cache; the rest are grouped by overlapping dates and
+    each group is computed by a single script whose metrics are grouped by spec. Groups run in
+    parallel. Scan cost therefore grows with the distinct data read, not with the number of reports.
+
+    Args:
+        report_specs (List[dict]): Report specs, see `normalize_report_spec`.
+
+    Returns:
+        List[dict]: One result per spec, in input order, shaped like `execute_queries`:
+            - "status": "success", with "data": {"summary_table", "pairwise_overlap"}
+            - "status": "error", with "error_message"
+    """
+    results = [None] * len(report_specs)
+    specs = []
+    for index, raw_spec in enumerate(report_specs):
+        try:
+            specs.append((index, normalize_report_spec(raw_spec, index)))
+        except ValueError as e:
+            results[index] = {"status": "error", "data": {"error_message": str(e)}}
+
+    cache = get_result_cache()
+    pending = {}
+    for index, spec in specs:
+        key = make_cache_key(spec["start_date"], spec["end_date"], spec["ad_name"], spec["media_sources"],
+                             spec["campaign_names"], namespace="exact")
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            results[index] = {"status": "success", "data": cached, "cache_hit": True}
+        else:
+            spec["spec_id"] = f"{index}:{spec['spec_id']}"
+            pending[spec["spec_id"]] = (index, spec, key)
+
+    if pending:
+        from google.cloud import bigquery
+
+        try:
+            client, proj, ds, tbl = connect_db()
+            script = build_batch_script(f"`{proj}.{ds}.{tbl}`")
+            time_type = event_time_type(get_table_metadata())
+            groups = group_report_specs([spec for _, spec, _ in pending.values()])
+            columns = {"summary": ["spec_id"] + SUMMARY_COLUMNS, "overlap": ["spec_id"] + OVERLAP_COLUMNS}
+
+            def run_group(group):
+                parameters = build_batch_parameters(group, time_type)
+                if DRY_RUN_CHECK and MAX_BYTES_BILLED:
+                    dry_run = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False,
+                                                      query_parameters=parameters)
+                    estimate = client.query(script, job_config=dry_run).total_bytes_processed or 0
+                    if estimate > MAX_BYTES_BILLED:
+                        raise RuntimeError(f"Batch would process {estimate} bytes, above "
+                                           f"MAX_BYTES_BILLED={MAX_BYTES_BILLED}.")
+                job_config = bigquery.QueryJobConfig(query_parameters=parameters,
+                                                     maximum_bytes_billed=MAX_BYTES_BILLED or None)
+                output, _ = run_job(client, script, collect_tagged(columns), job_config)
+                return _split_by_spec(output, [spec["spec_id"] for spec in group])
+
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                futures = [(group, pool.submit(run_group, group)) for group in groups]
+                for group, future in futures:
+                    try:
+                        by_spec = future.result()
+                    except Exception as e:
+                        for spec in group:
+                            results[pending[spec["spec_id"]][0]] = {"status": "error",
+                                                                    "data": {"error_message": str(e)}}
+                        continue
+                    for spec_id, data in by_spec.items():
+                        index, spec, key = pending[spec_id]
+                        if cache is not None:
+                            cache.set(key, data, ttl_for_range(spec["end_date"]))
+                        results[index] = {"status": "success", "data": data, "cache_hit": False}
+        except Exception as e:
+            for index, _, _ in pending.values():
+                if results[index] is None:
+                    results[index] = {"status": "error", "data": {"error_message": str(e)}}
+
+    return results
@@ -1,10 +1,26 @@
-from typing import List, Dict
-from google.cloud import bigquery
+from typing import TYPE_CHECKING, List, Dict
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import logging
 import os
-import pandas as pd
-from dotenv import load_dotenv
+import time
+from .clients import get_bigquery_client
+from .table_metadata import get_cached_table_metadata
+from .query_cache import get_result_cache, make_cache_key, normalize_report_inputs, ttl_for_range
+from .daily_aggregates import daily_table_ref
+from .query_backend import QueryBackend, get_query_backend
+from .report_sql import (
+    SUMMARY_COLUMNS, OVERLAP_COLUMNS, APPROX_SUMMARY_COLUMNS, APPROX_OVERLAP_COLUMNS,
+    build_query_parameters, build_split_queries, build_single_scan_script, build_daily_report_script,
+    build_approximate_script, build_local_overlap_script,
+)
+from .settings import settings
+from .telemetry import increment, span
 
-load_dotenv()
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+logger = logging.getLogger("ai_agents.bigquery")
 
 
 def get_table_schema() -> list[dict]:
@@ -20,24 +36,49 @@ def get_table_schema() -> list[dict]:
             - "Type"
             - "Description"
     """
+    return get_table_metadata()["schema"]
+
+
+def get_table_metadata(force_refresh: bool = False) -> dict:
+    """
+    Returns the schema, partitioning, clustering and size statistics of the target BigQuery table.
 
+    Served from the metadata cache (see table_metadata.py), so report planning does not pay for a
+    metadata round trip on every call.
+
+    Args:
+        force_refresh (bool): Revalidate against BigQuery even if the cached entry is fresh.
+
+    Returns:
+        dict: As returned by `table_metadata.parse_table_metadata`.
+    """
     client, proj, ds, tbl = connect_db()
-    table_ref = f"{proj}.{ds}.{tbl}"
-    table = client.get_table(table_ref)
-
-    return [
-        {
-            "Field name": field.name,
-            "Type": field.field_type,
-            "Description": field.description or ""
-        }
-        for field in table.schema
-    ]
+    return get_cached_table_metadata(client, f"{proj}.{ds}.{tbl}", force_refresh)
+
+
+def event_time_type(metadata: dict) -> str:
+    """
+    Returns the query parameter type matching the event_time column.
+
+    Comparing a partitioning column against parameters of its own type lets BigQuery prune
+    partitions; STRING literals compared to a TIMESTAMP/DATE column may not.
+
+    Args:
+        metadata (dict): As returned by `get_table_metadata`.
+
+    Returns:
+        str: "TIMESTAMP", "DATETIME", "DATE" or "STRING".
+    """
+    for field in metadata["schema"]:
+        if field["Field name"] == "event_time":
+            if field["Type"] in ("TIMESTAMP", "DATETIME", "DATE", "STRING"):
+                return field["Type"]
+    return "TIMESTAMP"
 
 
 def connect_db() -> list:
     """
-    Initializes and returns a BigQuery client along with project, dataset, and table identifiers.
+    Returns the shared BigQuery client along with project, dataset, and table identifiers.
     Args:
         None
     Returns:
@@ -52,21 +93,288 @@ def connect_db() -> list:
     if not key_path:
         raise RuntimeError("Missing GOOGLE_APPLICATION_CREDENTIALS in .env!")
 
-    proj = os.getenv("GOOGLE_CLOUD_PROJECT")
-    ds = os.getenv("DATASET_ID")
-    tbl = os.getenv("TABLE_ID")
+    proj = settings.google_cloud_project
+    ds = settings.dataset_id
+    tbl = settings.table_id
 
     try:
-        client = bigquery.Client(proj)
+        client = get_bigquery_client()
         return [client, proj, ds, tbl]
 
     except Exception as e:
         raise Exception(f"Error initializing BigQuery client: {e}")
 
 
+QUERY_MODE = settings.query_mode
+# Upper bound on bytes a report may bill, checked by dry run and enforced by BigQuery (0 disables).
+MAX_BYTES_BILLED = settings.max_bytes_billed
+DRY_RUN_CHECK = settings.dry_run_check
+# Modes returning exact, identical results; they share cache entries.
+EXACT_MODES = ("single_scan", "split", "local_overlap")
+
+
+def cache_namespace(mode: str = None) -> str:
+    """
+    Returns the result-cache namespace of a query mode: "exact" for every exact mode.
+
+    Args:
+        mode (str, optional): The query mode; defaults to QUERY_MODE.
+
+    Returns:
+        str: The namespace passed to `make_cache_key`.
+    """
+    mode = mode or QUERY_MODE
+    return "exact" if mode in EXACT_MODES else mode
+
+
+def _tagged_reader(summary_columns: List[str] = SUMMARY_COLUMNS, overlap_columns: List[str] = OVERLAP_COLUMNS):
+    """
+    Returns a consumer splitting a `result_set`-tagged result (see report_sql.TAGGED_RESULTS_SELECT).
+
+    Args:
+        summary_columns (List[str]): Columns of the summary records.
+        overlap_columns (List[str]): Columns of the overlap records.
+
+    Returns:
+        Callable: Arrow batches -> {"summary": list[dict], "overlap": list[dict]}
+    """
+    from .result_reader import collect_tagged
+
+    return collect_tagged({"summary": summary_columns, "overlap": overlap_columns})
+
+
+def run_job(client: "bigquery.Client", sql: str, consume,
+            job_config: "bigquery.QueryJobConfig" = None) -> tuple[object, dict]:
+    """
+    Submits a single query job, waits for it and streams its result, timing each phase.
+
+    Args:
+        client (bigquery.Client): The BigQuery client to submit with.
+        sql (str): The query or script to run.
+        consume: Callable receiving the result as an iterator of Arrow record batches
+            (see result_reader.py); its return value is the job's result.
+        job_config (bigquery.QueryJobConfig, optional): Carries the bound query parameters.
+
+    Returns:
+        tuple[object, dict]: The consumed result and a timing dictionary with:
+            - "job_id"
+            - "queue_seconds": created -> started, as reported by BigQuery
+            - "execution_seconds": started -> ended, as reported by BigQuery
+            - "wait_seconds": client-side submit -> result ready
+            - "download_seconds": client-side result fetch and conversion
+            - "total_seconds"
+    """
+    with span("bigquery.job") as job_span:
+        submitted = time.perf_counter()
+        job = client.query(sql, job_config=job_config)
+        job_span.set(job_id=job.job_id)
+        rows = job.result()
+        ready = time.perf_counter()
+        result = consume(rows.to_arrow_iterable())
+        done = time.perf_counter()
+
+        def _span(begin, end):
+            return (end - begin).total_seconds() if begin and end else None
+
+        timings = {
+            "job_id": job.job_id,
+            "queue_seconds": _span(job.created, job.started),
+            "execution_seconds": _span(job.started, job.ended),
+            "wait_seconds": round(ready - submitted, 3),
+            "download_seconds": round(done - ready, 3),
+            "total_seconds": round(done - submitted, 3),
+        }
+        job_span.set(**timings, slot_ms=job.slot_millis, bytes_processed=job.total_bytes_processed,
+                     bytes_billed=job.total_bytes_billed, rows_returned=rows.total_rows)
+        increment("bigquery_bytes_processed_total", job.total_bytes_processed)
+        increment("bigquery_bytes_billed_total", job.total_bytes_billed)
+        increment("bigquery_slot_ms_total", job.slot_millis)
+        increment("query_rows_returned_total", rows.total_rows, backend="bigquery")
+    return result, timings
+
+
+def run_queries_concurrently(client: "bigquery.Client", queries: Dict[str, tuple],
+                             job_config: "bigquery.QueryJobConfig" = None) -> tuple[dict, dict]:
+    """
+    Runs several query jobs at once: submission, waiting and result download all overlap.
+
+    Args:
+        client (bigquery.Client): The BigQuery client to submit with.
+        queries (Dict[str, tuple]): Query name -> (SQL, result consumer as taken by `run_job`).
+        job_config (bigquery.QueryJobConfig, optional): Shared by every job (query parameters).
+
+    Returns:
+        tuple[dict, dict]: (name -> consumed result, name -> timing dict as returned by `run_job`)
+
+    Raises:
+        Exception: The first job failure, after all jobs have finished.
+    """
+    with ThreadPoolExecutor(max_workers=max(len(queries), 1)) as pool:
+        futures = {name: pool.submit(contextvars.copy_context().run, run_job, client, sql, consume, job_config)
+                   for name, (sql, consume) in queries.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    outputs = {name: output for name, (output, _) in results.items()}
+    timings = {name: timing for name, (_, timing) in results.items()}
+    return outputs, timings
+
+
+def estimate_bytes_processed(client: "bigquery.Client", queries: Dict[str, tuple],
+                             query_parameters: list) -> dict:
+    """
+    Dry-runs the report queries to get the bytes BigQuery would process, without running them.
+
+    Args:
+        client (bigquery.Client): The BigQuery client.
+        queries (Dict[str, tuple]): Query name -> (SQL, consumer), as taken by `run_queries_concurrently`.
+        query_parameters (list): The bound query parameters.
+
+    Returns:
+        dict: Query name -> estimated bytes processed, plus "total".
+    """
+    from google.cloud import bigquery
+
+    estimates = {}
+    for name, (sql, _) in queries.items():
+        config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False, query_parameters=query_parameters)
+        estimates[name] = client.query(sql, job_config=config).total_bytes_processed or 0
+    estimates["total"] = sum(estimates.values())
+    return estimates
+
+
+def _report_queries(table_ref: str, time_type: str = "TIMESTAMP") -> Dict[str, tuple]:
+    """
+    Returns the jobs of the current QUERY_MODE as name -> (SQL, result consumer).
+
+    Args:
+        table_ref (str): Backtick-quoted reference of the raw event table.
+        time_type (str): BigQuery type of the event_time column.
+
+    Returns:
+        Dict[str, tuple]: As taken by `run_queries_concurrently`.
+    """
+    from .result_reader import collect_records, collect_tagged
+
+    approx_reader = _tagged_reader(APPROX_SUMMARY_COLUMNS, APPROX_OVERLAP_COLUMNS)
+    if QUERY_MODE == "daily_aggregates":
+        return {"daily_aggregates": (build_daily_report_script(daily_table_ref(), table_ref, time_type), approx_reader)}
+    if QUERY_MODE == "approximate":
+        return {"approximate": (build_approximate_script(table_ref), approx_reader)}
+    if QUERY_MODE == "local_overlap":
+        return {"local_overlap": (build_local_overlap_script(table_ref),
+                                  collect_tagged({"summary": SUMMARY_COLUMNS, "ids": None}))}
+    if QUERY_MODE == "split":
+        summary_query, overlap_query = build_split_queries(table_ref)
+        return {
+            "summary": (summary_query, collect_records(SUMMARY_COLUMNS)),
+            "overlap": (overlap_query, collect_records(OVERLAP_COLUMNS)),
+        }
+    return {"single_scan": (build_single_scan_script(table_ref), _tagged_reader())}
+
+
+def _run_report(start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                campaign_names: List[str]) -> tuple[dict, dict, dict]:
+    """
+    Runs the report in BigQuery according to QUERY_MODE:
+        - "single_scan": one script over a temp table of the deduped slice
+        - "split": separate summary and overlap queries, run concurrently
+        - "daily_aggregates": merge per-day HLL sketches (see daily_aggregates.py); approximate
+        - "approximate": HLL sketches of the raw events, no self-join; approximate
+        - "local_overlap": single scan returning per-source user IDs; the pairwise overlap is
+          computed locally with bitmaps (see overlap_engine.py) instead of a SQL self-join
+    Approximate modes add "total_users_error" / "unique_users_error" to summary records and
+    "overlap_percent_error" to overlap records (95% bounds, same units as the metric).
+
+    Before running, the jobs are dry-run and rejected if they would process more than
+    MAX_BYTES_BILLED; the same limit is also set on the jobs themselves. The report predicates
+    prune partitions only when the table is partitioned on event_time; for any other partition
+    column a warning is logged and returned, as its relation to event_time is unknown.
+
+    Args:
+        start_date (str): Start date for filtering (YYYY-MM-DD).
+        end_date (str): End date for filtering (YYYY-MM-DD).
+        ad_name (str): Ad name to filter the dataset.
+        media_sources (List[str]): List of media sources to include.
+        campaign_names (List[str]): List of campaign names to filter by.
+
+    Returns:
+        tuple[dict, dict, dict]: ({"summary_table": [...], "pairwise_overlap": [...]}, job_timings,
+            cost_estimate with the partition field, whether it is pruned ("partition_pruned", plus a
+            "warning" when it is not), clustered filters and dry-run byte estimates)
+    """
+    from google.cloud import bigquery
+
+    client, proj, ds, tbl = connect_db()
+    table_ref = f"`{proj}.{ds}.{tbl}`"
+    metadata = get_table_metadata()
+    time_type = event_time_type(metadata)
+    query_parameters = build_query_parameters(start_date, end_date, ad_name, media_sources, campaign_names,
+                                              event_time_type=time_type)
+    queries = _report_queries(table_ref, time_type)
+
+    partition_field = metadata["partition_field"]
+    cost_estimate = {
+        "partition_field": partition_field,
+        "partition_pruned": partition_field == "event_time",
+        "clustered_filters": [f for f in metadata["clustering_fields"]
+                              if f in ("ad_name", "media_source", "campaign_name")],
+    }
+    if partition_field not in (None, "event_time"):
+        cost_estimate["warning"] = (f"{proj}.{ds}.{tbl} is partitioned on {partition_field}, not event_time; "
+                                    f"the report date range cannot prune its partitions, so every partition is scanned.")
+        logger.warning(cost_estimate["warning"])
+    if DRY_RUN_CHECK:
+        cost_estimate["estimated_bytes_processed"] = estimate_bytes_processed(client, queries, query_parameters)
+        total = cost_estimate["estimated_bytes_processed"]["total"]
+        if MAX_BYTES_BILLED and total > MAX_BYTES_BILLED:
+            raise RuntimeError(f"Report would process {total} bytes, above MAX_BYTES_BILLED={MAX_BYTES_BILLED}. "
+                               f"Narrow the date range or filters.")
+
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters,
+                                         maximum_bytes_billed=MAX_BYTES_BILLED or None)
+    outputs, job_timings = run_queries_concurrently(client, queries, job_config)
+
+    if QUERY_MODE == "local_overlap":
+        from .overlap_engine import compute_pairwise_overlap
+        from .result_reader import group_ids_by_source
+
+        output = outputs["local_overlap"]
+        tables = {
+            "summary": output["summary"],
+            "overlap": compute_pairwise_overlap(group_ids_by_source(output["ids"])),
+        }
+    elif QUERY_MODE == "split":
+        tables = outputs
+    else:
+        tables = next(iter(outputs.values()))
+
+    data = {"summary_table": tables["summary"], "pairwise_overlap": tables["overlap"]}
+    return data, job_timings, cost_estimate
+
+
+class BigQueryBackend(QueryBackend):
+    """Runs reports in BigQuery according to QUERY_MODE (see `_run_report`)."""
+
+    name = "bigquery"
+
+    def cache_namespace(self) -> str:
+        return cache_namespace()
+
+    def run_report(self, start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                   campaign_names: List[str]) -> tuple[dict, dict, dict]:
+        return _run_report(start_date, end_date, ad_name, media_sources, campaign_names)
+
+
 def execute_queries(start_date: str, end_date: str, ad_name: str, media_sources: List[str], campaign_names: List[str]):
     """
-    Runs two BigQuery queries to compute media performance metrics and pairwise user overlap.
+    Computes media performance metrics and pairwise user overlap.
+
+    The report runs on the backend selected by QUERY_BACKEND (see query_backend.py): BigQuery, or
+    DuckDB over a local Parquet extract of recent events (see local_engine.py). In BigQuery's
+    "single_scan" mode (default, see QUERY_MODE) the event table is scanned once by a script that
+    materializes the deduped slice; in "split" mode two independent queries are sent.
+    Inputs are normalized first (see `normalize_report_inputs`), and successful results are cached
+    (see tools/query_cache.py) under a key of the same normalized values the report is computed from.
 
     Args:
         start_date (str): Start date for filtering (YYYY-MM-DD).
@@ -80,181 +388,47 @@ def execute_queries(start_date: str, end_date: str, ad_name: str, media_sources:
             - "status": "success", with:
                 • "summary_table": List of media-level metrics
                 • "pairwise_overlap": List of overlap percentages between media sources
+              and "job_timings": per-job queue / execution / download timings ({} on a cache hit),
+              "cost_estimate": dry-run bytes estimate and pruning info ({} on a cache hit),
+              "backend": name of the engine that served the report,
+              and "cache_hit": whether the result was served from the cache
             - "status": "error", with "error_message"
     """
-    media_sources_sql = ', '.join(f"'{s}'" for s in media_sources)
-    campaign_names_sql = ', '.join(f"'{c}'" for c in campaign_names)
-
+    with span("execute_queries", start_date=start_date, end_date=end_date,
+              media_sources=len(media_sources or [])) as report_span:
+        try:
+            start_date, end_date, ad_name, media_sources, campaign_names = normalize_report_inputs(
+                start_date, end_date, ad_name, media_sources, campaign_names)
+            backend = get_query_backend(start_date, end_date)
+            report_span.set(backend=backend.name)
+            cache = get_result_cache()
+            cache_key = make_cache_key(start_date, end_date, ad_name, media_sources, campaign_names,
+                                       namespace=backend.cache_namespace())
+            if cache is not None:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    report_span.set(cache_hit=True)
+                    increment("report_cache_hits_total", backend=backend.name)
+                    return {"status": "success", "data": cached, "job_timings": {}, "cost_estimate": {},
+                            "backend": backend.name, "cache_hit": True}
 
-    try:
-        client, proj, ds, tbl = connect_db()
-        table_ref = f"`{proj}.{ds}.{tbl}`"
-        base_cte = f"""
-            WITH base AS (
-              SELECT
-                advertising_id_value,
-                media_source,
-                engagement_type
-              FROM
-                {table_ref}
-              WHERE
-                event_time BETWEEN '{start_date}' AND '{end_date}'
-                AND ad_name = '{ad_name}'
-                AND media_source IN UNNEST([ {media_sources_sql} ])
-                AND campaign_name IN UNNEST([ {campaign_names_sql} ])
-            ),
-            
-            deduped AS (
-              SELECT DISTINCT
-                advertising_id_value,
-                media_source,
-                engagement_type
-              FROM
-                base
-            )
-            """
-        if not campaign_names:
-            base_cte = base_cte.replace('AND campaign_name IN UNNEST([  ])', '')
-
-        # Query 1: Summary Table
-        summary_query = base_cte + """
-        
-        , user_counts AS (
-          SELECT
-            media_source,
-            COUNT(DISTINCT advertising_id_value) AS total_users
-          FROM
-            deduped
-          GROUP BY
-            media_source
-        ),
-        
-        unique_users AS (
-          SELECT
-            advertising_id_value
-          FROM
-            deduped
-          GROUP BY
-            advertising_id_value
-          HAVING
-            COUNT(DISTINCT media_source) = 1
-        ),
-        
-        unique_counts AS (
-          SELECT
-            d.media_source,
-            COUNT(DISTINCT d.advertising_id_value) AS unique_users
-          FROM
-            deduped d
-          JOIN
-            unique_users u
-          ON
-            d.advertising_id_value = u.advertising_id_value
-          GROUP BY
-            d.media_source
-        ),
-        
-        engagement AS (
-          SELECT
-            media_source,
-            COUNTIF(engagement_type = 'click') AS clicks,
-            COUNTIF(engagement_type = 'view') AS impressions
-          FROM
-            deduped
-          GROUP BY
-            media_source
-        ),
-        
-        source_stats AS (
-          SELECT
-            u.media_source,
-            CAST(u.total_users AS FLOAT64) AS total_users,
-            CAST(IFNULL(uc.unique_users, 0) AS FLOAT64) AS unique_users,
-            ROUND(SAFE_DIVIDE(u.total_users - IFNULL(uc.unique_users, 0), u.total_users) * 100, 2) AS overlap_rate,
-            ROUND(SAFE_DIVIDE(IFNULL(e.clicks, 0), NULLIF(e.impressions, 0)) * 100, 2) AS engagement_rate,
-            ROUND(SAFE_DIVIDE(IFNULL(uc.unique_users, 0), u.total_users), 4) AS incremental_score
-          FROM
-            user_counts u
-          LEFT JOIN
-            unique_counts uc ON u.media_source = uc.media_source
-          LEFT JOIN
-            engagement e ON u.media_source = e.media_source
-        )
-        
-        SELECT
-          media_source,
-          total_users,
-          unique_users,
-          overlap_rate,
-          engagement_rate,
-          incremental_score
-        FROM
-          source_stats
-        ORDER BY
-          media_source;
-        """
-        print("*****************************************\n", summary_query)
-         # Query 2: Pairwise Overlap Matrix
-        overlap_query = base_cte + """
-        
-        , pairwise_overlap AS (
-          SELECT
-            a.media_source AS source_1,
-            b.media_source AS source_2,
-            COUNT(DISTINCT a.advertising_id_value) AS shared_users
-          FROM
-            deduped a
-          JOIN
-            deduped b
-          ON
-            a.advertising_id_value = b.advertising_id_value
-            AND a.media_source != b.media_source
-          GROUP BY
-            source_1, source_2
-        ),
-        
-        user_counts AS (
-          SELECT
-            media_source,
-            COUNT(DISTINCT advertising_id_value) AS total_users
-          FROM
-            deduped
-          GROUP BY
-            media_source
-        )
-        
-        SELECT
-          p.source_1,
-          p.source_2,
-          ROUND(SAFE_DIVIDE(p.shared_users, NULLIF(u.total_users, 0)) * 100, 2) AS overlap_percent
-        FROM
-          pairwise_overlap p
-        JOIN
-          user_counts u
-        ON
-          p.source_1 = u.media_source
-        ORDER BY
-          source_1, source_2;
-        """
-        print("*****************************************\n", overlap_query)
-
-        query_job_1 = client.query(summary_query)
-        query_job_2 = client.query(overlap_query)
-
-        summary_table = query_job_1.to_dataframe()
-        summary_table = summary_table.where(pd.notnull(summary_table), None)
-        pairwise_overlap = query_job_2.to_dataframe()
-        pairwise_overlap = pairwise_overlap.where(pd.notnull(pairwise_overlap), None)
+            data, job_timings, cost_estimate = backend.run_report(start_date, end_date, ad_name, media_sources,
+                                                                  campaign_names)
+            if cache is not None:
+                cache.set(cache_key, data, ttl_for_range(end_date))
 
-        return {
-            "status": "success",
-            "data": {
-                "summary_table": summary_table.to_dict(orient="records"),
-                "pairwise_overlap": pairwise_overlap.to_dict(orient="records")
+            report_span.set(cache_hit=False)
+            return {
+                "status": "success",
+                "data": data,
+                "job_timings": job_timings,
+                "cost_estimate": cost_estimate,
+                "backend": backend.name,
+                "cache_hit": False
+            }
+        except Exception as e:
+            report_span.fail(e)
+            return {
+                "status": "error",
+                "data":{"error_message":str(e)}
             }
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "data":{"error_message":str(e)}
-        }
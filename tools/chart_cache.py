@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+from .settings import settings
+
+CHART_CACHE_ENABLED = settings.chart_cache_enabled
+CHART_CACHE_DIR = settings.chart_cache_dir
+CHART_CACHE_FOLDER = settings.chart_cache_folder
+CHART_CACHE_TTL = settings.chart_cache_ttl
+CHART_CACHE_MAX_BYTES = settings.chart_cache_max_bytes
+# GCS objects outlive local entries by this much, so a path served from the disk cache is never already deleted.
+CHART_CACHE_GRACE = settings.chart_cache_grace
+CHART_CACHE_EVICT_INTERVAL = settings.chart_cache_evict_interval
+
+_lock = threading.Lock()
+_last_remote_eviction = 0.0
+
+
+def chart_cache_key(chart: str, records: list[dict], style: dict) -> str:
+    """
+    Builds the content address of a chart.
+
+    Args:
+        chart (str): Chart type, e.g. "overlap_heatmap".
+        records (list[dict]): The chart's input records; their order is kept (it is the bar order).
+        style (dict): The chart's style parameters.
+
+    Returns:
+        str: A hex sha256 digest.
+    """
+    payload = json.dumps({"chart": chart, "records": records, "style": style}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chart_object_name(chart: str, key: str) -> str:
+    """Returns the GCS object name of a cached chart."""
+    return f"{CHART_CACHE_FOLDER}/{chart}_{key}.jpg"
+
+
+def _local_path(key: str, archived: bool = True) -> str:
+    return os.path.join(CHART_CACHE_DIR, f"{key}.jpg" if archived else f"{key}.unarchived.jpg")
+
+
+def get_local_chart(key: str, archived: bool = True) -> Optional[str]:
+    """
+    Looks up a chart in the local disk cache.
+
+    Args:
+        key (str): The chart's cache key.
+        archived (bool): Only accept entries that were (or are being) uploaded to GCS; when False,
+            entries stored with archival skipped are accepted too.
+
+    Returns:
+        str | None: The local image file, or None if missing or older than CHART_CACHE_TTL.
+    """
+    for path in [_local_path(key)] + ([] if archived else [_local_path(key, archived=False)]):
+        try:
+            if time.time() - os.path.getmtime(path) < CHART_CACHE_TTL:
+                return path
+        except OSError:
+            continue
+    return None
+
+
+def is_local_chart(path: str) -> bool:
+    """Whether `path` is an existing file inside CHART_CACHE_DIR (symlinks and ".." resolved)."""
+    root = os.path.realpath(CHART_CACHE_DIR)
+    resolved = os.path.realpath(path)
+    return os.path.commonpath([root, resolved]) == root and resolved != root and os.path.isfile(resolved)
+
+
+def store_local_chart(key: str, image: bytes, archived: bool = True) -> str:
+    """
+    Writes a chart to the local disk cache, then evicts expired and least recently written entries.
+
+    The entry's mtime is its upload time, which is what its TTL is measured from.
+
+    Args:
+        key (str): The chart's cache key.
+        image (bytes): The JPEG image.
+        archived (bool): Whether the image is uploaded to GCS under its content address.
+
+    Returns:
+        str: The local image file.
+    """
+    os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+    path = _local_path(key, archived)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+    evict_local_charts()
+    return path
+
+
+def drop_local_chart(key: str) -> None:
+    """Removes a chart from the local disk cache, e.g. after its upload failed."""
+    for path in (_local_path(key), _local_path(key, archived=False)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def evict_local_charts() -> None:
+    """
+    Deletes expired entries from the local disk cache, then the oldest ones until it fits
+    CHART_CACHE_MAX_BYTES.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    now = time.time()
+    with _lock:
+        try:
+            names = [n for n in os.listdir(CHART_CACHE_DIR) if n.endswith(".jpg")]
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            path = os.path.join(CHART_CACHE_DIR, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if now - mtime < CHART_CACHE_TTL and total <= CHART_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+def _claim_remote_eviction(now: float, force: bool = False) -> bool:
+    """Records an eviction run at `now` unless one ran within CHART_CACHE_EVICT_INTERVAL."""
+    global _last_remote_eviction
+    with _lock:
+        if not force and now - _last_remote_eviction < CHART_CACHE_EVICT_INTERVAL:
+            return False
+        _last_remote_eviction = now
+        return True
+
+
+def schedule_remote_eviction(bucket) -> bool:
+    """
+    Runs `evict_remote_charts` in a background thread if it is due.
+
+    The interval is checked before the thread is started, so callers may invoke this on every publish.
+
+    Args:
+        bucket (storage.Bucket): The bucket holding CHART_CACHE_FOLDER.
+
+    Returns:
+        bool: Whether an eviction was started.
+    """
+    if not _claim_remote_eviction(time.time()):
+        return False
+    threading.Thread(target=evict_remote_charts, args=(bucket, True), daemon=True).start()
+    return True
+
+
+def evict_remote_charts(bucket, force: bool = False) -> int:
+    """
+    Deletes cached charts from GCS once they are older than CHART_CACHE_TTL + CHART_CACHE_GRACE.
+
+    Runs at most once per CHART_CACHE_EVICT_INTERVAL unless forced.
+
+    Args:
+        bucket (storage.Bucket): The bucket holding CHART_CACHE_FOLDER.
+        force (bool): Run even if the last eviction was recent.
+
+    Returns:
+        int: Number of deleted objects.
+    """
+    now = time.time()
+    if not _claim_remote_eviction(now, force):
+        return 0
+
+    deleted = 0
+    for blob in bucket.list_blobs(prefix=f"{CHART_CACHE_FOLDER}/"):
+        if blob.time_created and now - blob.time_created.timestamp() > CHART_CACHE_TTL + CHART_CACHE_GRACE:
+            blob.delete()
+            deleted += 1
+    return deleted
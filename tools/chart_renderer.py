@@ -0,0 +1,224 @@
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import TYPE_CHECKING
+from .settings import settings
+from .telemetry import increment, span, start_span
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Worker processes rendering charts in parallel; 0 renders in the calling process, one chart at a time.
+CHART_RENDER_PROCESSES = settings.chart_render_processes
+
+# Style parameters of each chart; part of the chart cache key, so changing one re-renders that chart.
+CHART_STYLES = {
+    "incrementality_bar_chart": {"figsize": (10, 6), "palette": "colorblind", "dpi": None},
+    "overlap_heatmap": {"figsize": (8, 6), "cmap": "Reds", "fmt": ".3f", "dpi": None},
+    "pairwise_overlap_metrix": {"figsize": (8, 8), "cmap": "#e8f4fa", "style": "white",
+                                "font_scale": 1.2, "dpi": 300},
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _to_jpeg(fig: "Figure", dpi=None) -> bytes:
+    """Saves a figure as JPEG bytes with the Agg canvas."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    image_stream = BytesIO()
+    fig.savefig(image_stream, format='jpeg', dpi=dpi)
+    return image_stream.getvalue()
+
+
+def render_incrementality_bar_chart(data: list[dict]) -> bytes:
+    """
+    Renders the incrementality score bar chart.
+
+    Args:
+        data (list[dict]): Records with "media_source" and "incrementality_score"
+            (or "incremental_score").
+
+    Returns:
+        bytes: The JPEG image.
+    """
+    import matplotlib
+    import pandas as pd
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    df = pd.DataFrame(data)
+    if "incrementality_score" not in df and "incremental_score" in df:
+        df = df.rename(columns={"incremental_score": "incrementality_score"})
+
+    style = CHART_STYLES["incrementality_bar_chart"]
+    with matplotlib.rc_context():
+        fig = Figure(figsize=style["figsize"])
+        ax = fig.subplots()
+        sns.barplot(data=df, x="media_source", y="incrementality_score",
+                    hue="media_source", legend=False, palette=style["palette"], ax=ax)
+
+        for i, score in enumerate(df["incrementality_score"]):
+            ax.text(i, score + 0.01, f'{score:.2%}', ha='center', va='bottom')
+
+        ax.set_ylim(0, 1.05)
+        ax.set_title("Incrementality Score per Media Source")
+        ax.set_xlabel("Media Source")
+        ax.set_ylabel("Incrementality Score")
+        fig.tight_layout()
+        return _to_jpeg(fig, dpi=style["dpi"])
+
+
+def render_pairwise_overlap_heatmap(data_dict: list[dict]) -> bytes:
+    """
+    Renders the pairwise overlap heatmap.
+
+    Args:
+        data_dict (list[dict]): Records with "source_1", "source_2" and "overlap_percent".
+
+    Returns:
+        bytes: The JPEG image.
+    """
+    import matplotlib
+    import pandas as pd
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    df_pairs = pd.DataFrame(data_dict)
+    all_sources = sorted(set(df_pairs["source_1"]) | set(df_pairs["source_2"]))
+    pivot = df_pairs.pivot(index="source_1", columns="source_2", values="overlap_percent")
+    pivot = pivot.reindex(index=all_sources, columns=all_sources).fillna(0)
+
+    style = CHART_STYLES["overlap_heatmap"]
+    with matplotlib.rc_context():
+        fig = Figure(figsize=style["figsize"])
+        ax = fig.subplots()
+        sns.heatmap(pivot, annot=True, fmt=style["fmt"], cmap=style["cmap"],
+                    linewidths=0.5, linecolor="gray", cbar_kws={'label': 'Overlap %'},
+                    vmin=0, vmax=pivot.to_numpy().max(), ax=ax)
+        ax.set_title("Pairwise Media Source Overlap Heatmap")
+        ax.set_xlabel("Target Media Source (j)")
+        ax.set_ylabel("Source Media Source (i)")
+        ax.tick_params(axis="x", rotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment("right")
+        ax.tick_params(axis="y", rotation=0)
+        fig.tight_layout()
+        return _to_jpeg(fig, dpi=style["dpi"])
+
+
+def render_pairwise_overlap_metrix(data: list[dict]) -> bytes:
+    """
+    Renders the pairwise overlap matrix.
+
+    The seaborn style is applied through context managers, so it does not leak into other charts.
+
+    Args:
+        data (list[dict]): Records with "source_1", "source_2" and "overlap_percent".
+
+    Returns:
+        bytes: The JPEG image.
+    """
+    import matplotlib
+    import pandas as pd
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    sources = sorted(set(row["source_1"] for row in data) | set(row["source_2"] for row in data))
+    df = pd.DataFrame(0.0, index=sources, columns=sources)
+    for row in data:
+        df.at[row["source_1"], row["source_2"]] = row["overlap_percent"]
+
+    df_display = df.copy()
+    for col in df_display.columns:
+        df_display[col] = df_display[col].map(lambda x: "—" if x == 0 else f"{x:.2f}%")
+
+    style = CHART_STYLES["pairwise_overlap_metrix"]
+    context = sns.plotting_context("notebook", font_scale=style["font_scale"])
+    with matplotlib.rc_context(), sns.axes_style(style["style"]), context:
+        fig = Figure(figsize=style["figsize"])
+        ax = fig.subplots()
+        sns.heatmap(df, annot=df_display, fmt="", cmap=[style["cmap"]],
+                    linewidths=0.5, linecolor='gray', cbar=False, square=True, ax=ax)
+        ax.set_title("Pairwise Overlap Metrix", fontsize=16, weight='bold', pad=20)
+        fig.tight_layout(rect=(0, 0, 1, 0.92))
+        return _to_jpeg(fig, dpi=style["dpi"])
+
+
+def _init_worker() -> None:
+    """Selects the Agg backend in a fresh worker and preimports the plotting stack."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+    # Imported only to warm the worker; the first render then pays no import cost.
+    import matplotlib.backends.backend_agg
+    import matplotlib.figure
+    import pandas
+    import seaborn
+
+
+def get_render_pool():
+    """
+    Returns the process-wide chart rendering pool, starting it on first use.
+
+    Workers are spawned (not forked, so no client threads or sockets are inherited) and import
+    matplotlib / seaborn once at startup, so renders pay no import cost; the calling process never
+    imports them.
+
+    Args:
+        None
+
+    Returns:
+        ProcessPoolExecutor | None: None when CHART_RENDER_PROCESSES is 0.
+    """
+    global _pool
+    if CHART_RENDER_PROCESSES <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CHART_RENDER_PROCESSES,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker)
+        return _pool
+
+
+def _end_render_span(render_span, future) -> None:
+    """Closes the span of a chart rendered in the worker pool."""
+    error = future.exception()
+    if error is None:
+        render_span.set(bytes=len(future.result()))
+    render_span.end(error=error)
+
+
+def render_charts(jobs: dict) -> dict:
+    """
+    Renders several charts in parallel worker processes.
+
+    Args:
+        jobs (dict): Chart name -> (render function from this module, input records).
+
+    Returns:
+        dict: Chart name -> JPEG bytes, in the order of `jobs`.
+    """
+    pool = get_render_pool()
+    if pool is None:
+        images = {}
+        for name, (render, data) in jobs.items():
+            with span("chart.render", chart=name, records=len(data)) as render_span:
+                images[name] = render(data)
+                render_span.set(bytes=len(images[name]))
+            increment("chart_bytes_total", len(images[name]), chart=name)
+        return images
+
+    futures = {}
+    for name, (render, data) in jobs.items():
+        render_span = start_span("chart.render", chart=name, records=len(data))
+        futures[name] = pool.submit(render, data)
+        futures[name].add_done_callback(lambda future, s=render_span: _end_render_span(s, future))
+    images = {name: future.result() for name, future in futures.items()}
+    for name, image in images.items():
+        increment("chart_bytes_total", len(image), chart=name)
+    return images
@@ -0,0 +1,137 @@
+import os
+import threading
+from typing import TYPE_CHECKING
+from .settings import settings
+
+if TYPE_CHECKING:
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import bigquery, storage
+
+CLIENT_POOL_SIZE = settings.client_pool_size
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def _credentials_fingerprint() -> tuple:
+    """
+    Identifies the credentials currently configured in the environment.
+
+    Args:
+        None
+
+    Returns:
+        tuple: (key file path, key file mtime); changes when the key file is replaced or re-pointed.
+    """
+    key_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    try:
+        mtime = os.path.getmtime(key_path) if key_path else None
+    except OSError:
+        mtime = None
+    return key_path, mtime
+
+
+def _pooled_session(pool_size: int) -> "AuthorizedSession":
+    """
+    Builds an authorized HTTP session whose connection pool holds `pool_size` connections.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host.
+
+    Returns:
+        AuthorizedSession: A requests session that refreshes its own access tokens.
+    """
+    import google.auth
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _get_client(kind: str, factory):
+    """
+    Returns the shared client of the given kind, creating it on first use.
+
+    The client is rebuilt (and the old one closed) when the configured credentials change.
+
+    Args:
+        kind (str): Registry key, e.g. "bigquery" or "storage".
+        factory: Callable taking an AuthorizedSession and returning the client.
+
+    Returns:
+        The shared client instance.
+    """
+    fingerprint = _credentials_fingerprint()
+    with _lock:
+        entry = _clients.get(kind)
+        if entry and entry[1] == fingerprint:
+            return entry[0]
+        if entry:
+            _close(entry[0])
+        client = factory(_pooled_session(CLIENT_POOL_SIZE))
+        _clients[kind] = (client, fingerprint)
+        return client
+
+
+def _close(client) -> None:
+    """Closes a client, ignoring errors from an already-broken transport."""
+    try:
+        client.close()
+    except Exception:
+        pass
+
+
+def get_bigquery_client() -> "bigquery.Client":
+    """
+    Returns the process-wide BigQuery client.
+
+    Args:
+        None
+
+    Returns:
+        bigquery.Client: A thread-safe client sharing one HTTP connection pool.
+    """
+    from google.cloud import bigquery
+
+    proj = settings.google_cloud_project
+    return _get_client("bigquery", lambda session: bigquery.Client(proj, _http=session))
+
+
+def get_storage_client() -> "storage.Client":
+    """
+    Returns the process-wide Cloud Storage client.
+
+    Args:
+        None
+
+    Returns:
+        storage.Client: A client sharing one HTTP connection pool.
+    """
+    from google.cloud import storage
+
+    proj = settings.google_cloud_project
+    return _get_client("storage", lambda session: storage.Client(proj, _http=session))
+
+
+def reset_clients() -> None:
+    """
+    Closes and drops every shared client; the next getter call rebuilds it.
+
+    Call this after rotating credentials that are not picked up automatically
+    (e.g. a refreshed workload identity rather than a replaced key file).
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    with _lock:
+        for client, _ in _clients.values():
+            _close(client)
+        _clients.clear()
@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+from typing import Optional
+from .clients import get_bigquery_client
+from .report_sql import BIGQUERY_DAY_EXPRESSIONS, build_sketch_select
+from .settings import settings
+
+DAILY_BACKFILL_DAYS = settings.daily_backfill_days
+
+
+def daily_table_ref() -> str:
+    """
+    Returns the backtick-quoted reference of the daily aggregate table.
+
+    The table is DAILY_TABLE_ID in the same dataset as the event table (default: "<TABLE_ID>_daily").
+
+    Args:
+        None
+
+    Returns:
+        str: e.g. `project.dataset.engagement_daily`
+    """
+    return f"`{settings.google_cloud_project}.{settings.dataset_id}.{settings.daily_table_id}`"
+
+
+def refresh_daily_aggregates(through_date: Optional[str] = None) -> dict:
+    """
+    Sketches every not-yet-aggregated day of raw events into the daily aggregate table.
+
+    One row is stored per (event_date, ad_name, campaign_name, media_source) holding HLL sketches of
+    all users, clicking users and viewing users plus raw click / view counts. Only days after the
+    table's current watermark are processed (at most DAILY_BACKFILL_DAYS back on first run), so the
+    cost of a refresh is proportional to the number of new days. Reprocessed days are replaced, so
+    the job is safe to rerun.
+
+    Args:
+        through_date (str, optional): Last day to aggregate (YYYY-MM-DD). Defaults to yesterday, the
+            latest day that can no longer change.
+
+    Returns:
+        dict: Contains either:
+            - "status": "success", with "start_date" / "end_date" of the processed days
+            - "status": "up_to_date" when there is nothing new
+            - "status": "error", with "error_message"
+    """
+    from google.cloud import bigquery
+    from .big_qwery_tools import event_time_type, get_table_metadata
+
+    try:
+        client = get_bigquery_client()
+        event_day = BIGQUERY_DAY_EXPRESSIONS[event_time_type(get_table_metadata())]
+        table_ref = f"`{settings.google_cloud_project}.{settings.dataset_id}.{settings.table_id}`"
+        daily_ref = daily_table_ref()
+
+        client.query(f"""
+            CREATE TABLE IF NOT EXISTS {daily_ref} (
+              event_date DATE,
+              ad_name STRING,
+              campaign_name STRING,
+              media_source STRING,
+              users_sketch BYTES,
+              click_sketch BYTES,
+              view_sketch BYTES,
+              clicks INT64,
+              views INT64
+            )
+            PARTITION BY event_date
+            CLUSTER BY ad_name, media_source, campaign_name
+        """).result()
+
+        rows = list(client.query(f"SELECT MAX(event_date) AS watermark FROM {daily_ref}").result())
+        watermark = rows[0]["watermark"] if rows else None
+
+        end = date.fromisoformat(through_date) if through_date else date.today() - timedelta(days=1)
+        start = end - timedelta(days=DAILY_BACKFILL_DAYS - 1)
+        if watermark is not None:
+            start = max(start, watermark + timedelta(days=1))
+        if start > end:
+            return {"status": "up_to_date", "watermark": str(watermark)}
+
+        sketch_select = build_sketch_select(
+            table_ref,
+            f"{event_day} BETWEEN @start_day AND @end_day",
+            [f"{event_day} AS event_date", "ad_name", "campaign_name", "media_source"],
+        )
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("start_day", "DATE", start),
+            bigquery.ScalarQueryParameter("end_day", "DATE", end),
+        ])
+        client.query(f"""
+            BEGIN TRANSACTION;
+            DELETE FROM {daily_ref} WHERE event_date BETWEEN @start_day AND @end_day;
+            INSERT INTO {daily_ref} (event_date, ad_name, campaign_name, media_source,
+                                     users_sketch, click_sketch, view_sketch, clicks, views)
+            {sketch_select};
+            COMMIT TRANSACTION;
+        """, job_config=job_config).result()
+
+        return {"status": "success", "start_date": str(start), "end_date": str(end)}
+    except Exception as e:
+        return {
+            "status": "error",
+            "data": {"error_message": str(e)}
+        }
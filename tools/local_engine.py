@@ -0,0 +1,330 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, List, Optional
+from .query_backend import QueryBackend
+from .report_sql import (
+    SUMMARY_COLUMNS, OVERLAP_COLUMNS, USER_COUNTS_CTE, EXACT_COUNTS_CTES, SOURCE_STATS_CTE,
+    PAIRWISE_OVERLAP_CTE, TAGGED_RESULTS_SELECT, BIGQUERY_DAY_EXPRESSIONS,
+)
+from .settings import settings
+from .telemetry import increment, span
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+LOCAL_EXTRACT_DIR = settings.local_extract_dir
+# Days of raw events kept in the local extract.
+LOCAL_EXTRACT_DAYS = settings.local_extract_days
+LOCAL_ENGINE_THREADS = settings.local_engine_threads
+
+EXTRACT_COLUMNS = ["event_time", "advertising_id_value", "media_source", "engagement_type", "ad_name", "campaign_name"]
+MANIFEST_NAME = "_extract.json"
+# DuckDB type of the event_time column per BigQuery type, so range bounds compare like in BigQuery.
+DUCKDB_TIME_TYPES = {"TIMESTAMP": "TIMESTAMPTZ", "DATETIME": "TIMESTAMP", "DATE": "DATE", "STRING": "VARCHAR"}
+
+# BigQuery functions and types used by the report_sql templates that DuckDB lacks under the same name.
+COMPATIBILITY_SQL = [
+    "CREATE TYPE FLOAT64 AS DOUBLE",
+    "CREATE MACRO SAFE_DIVIDE(a, b) AS CASE WHEN b = 0 THEN NULL ELSE a / b END",
+]
+
+LOCAL_FILTERS = """
+                event_time BETWEEN CAST($start_date AS {time_type}) AND CAST($end_date AS {time_type})
+                AND ad_name = $ad_name
+                AND list_contains(CAST($media_sources AS VARCHAR[]), media_source)
+                AND (len(CAST($campaign_names AS VARCHAR[])) = 0
+                     OR list_contains(CAST($campaign_names AS VARCHAR[]), campaign_name))"""
+
+_manifest_lock = threading.Lock()
+
+
+def _manifest_path() -> str:
+    """Returns the path of the extract manifest."""
+    return os.path.join(LOCAL_EXTRACT_DIR, MANIFEST_NAME)
+
+
+def _day_path(day: str) -> str:
+    """Returns the Parquet file holding the events of one day (Hive-style partition directory)."""
+    return os.path.join(LOCAL_EXTRACT_DIR, f"event_day={day}", "part-0.parquet")
+
+
+def read_manifest() -> dict:
+    """
+    Returns the manifest of the local extract.
+
+    Args:
+        None
+
+    Returns:
+        dict: {"table", "event_time_type", "days": sorted list of extracted days (YYYY-MM-DD),
+            "complete_through": last day that can no longer change, "synced_at"}; {} if there is no extract.
+    """
+    try:
+        with open(_manifest_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest: dict) -> None:
+    """Writes the manifest atomically."""
+    os.makedirs(LOCAL_EXTRACT_DIR, exist_ok=True)
+    tmp = f"{_manifest_path()}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, _manifest_path())
+
+
+def _days(start_day: date, end_day: date) -> List[str]:
+    """Returns every day of the range as YYYY-MM-DD."""
+    return [str(start_day + timedelta(days=i)) for i in range((end_day - start_day).days + 1)]
+
+
+def _table_name() -> str:
+    """Returns the unquoted name of the event table the extract mirrors."""
+    return f"{settings.google_cloud_project}.{settings.dataset_id}.{settings.table_id}"
+
+
+def _connect(time_type: str):
+    """Opens an in-memory DuckDB connection prepared for the report_sql templates."""
+    import duckdb
+
+    con = duckdb.connect()
+    con.execute(f"SET threads = {max(int(LOCAL_ENGINE_THREADS), 1)}")
+    if time_type == "TIMESTAMPTZ":
+        con.execute("SET TimeZone = 'UTC'")
+    for statement in COMPATIBILITY_SQL:
+        con.execute(statement)
+    return con
+
+
+def run_local_report(files: List[str], start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                     campaign_names: List[str], event_time_type: str = "TIMESTAMP") -> dict:
+    """
+    Computes the exact report over Parquet event files with DuckDB.
+
+    The deduped slice is materialized into a temp table and the summary metrics and pairwise
+    overlap are derived from it with the same CTEs as the BigQuery single-scan script, so both
+    engines return identical records.
+
+    Args:
+        files (List[str]): Parquet files with the EXTRACT_COLUMNS.
+        start_date (str): Start date for filtering (YYYY-MM-DD).
+        end_date (str): End date for filtering (YYYY-MM-DD).
+        ad_name (str): Ad name to filter the dataset.
+        media_sources (List[str]): List of media sources to include.
+        campaign_names (List[str]): List of campaign names to filter by (empty = no campaign filter).
+        event_time_type (str): BigQuery type of the event_time column.
+
+    Returns:
+        dict: {"summary": list[dict], "overlap": list[dict]}
+    """
+    from .result_reader import collect_tagged
+
+    if not files:
+        return {"summary": [], "overlap": []}
+
+    time_type = DUCKDB_TIME_TYPES.get(event_time_type, "TIMESTAMPTZ")
+    con = _connect(time_type)
+    try:
+        con.read_parquet(files).create_view("events")
+        con.execute(f"""
+            CREATE TEMP TABLE deduped AS
+              SELECT DISTINCT
+                advertising_id_value,
+                media_source,
+                engagement_type
+              FROM
+                events
+              WHERE{LOCAL_FILTERS.format(time_type=time_type)}
+        """, {
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "ad_name": ad_name,
+            "media_sources": list(media_sources),
+            "campaign_names": list(campaign_names or []),
+        })
+        reader = con.execute(f"""
+        WITH{USER_COUNTS_CTE},{EXACT_COUNTS_CTES},{SOURCE_STATS_CTE},{PAIRWISE_OVERLAP_CTE}
+        {TAGGED_RESULTS_SELECT}""").fetch_record_batch()
+        return collect_tagged({"summary": SUMMARY_COLUMNS, "overlap": OVERLAP_COLUMNS})(reader)
+    finally:
+        con.close()
+
+
+class LocalBackend(QueryBackend):
+    """Runs reports with DuckDB over the local Parquet extract kept by `sync_local_extracts`."""
+
+    name = "local"
+
+    def cache_namespace(self) -> str:
+        return "local"
+
+    def covers(self, start_date: str, end_date: str) -> bool:
+        manifest = read_manifest()
+        if manifest.get("table") != _table_name() or not manifest.get("complete_through"):
+            return False
+        start_day, end_day = str(start_date)[:10], str(end_date)[:10]
+        if end_day > manifest["complete_through"]:
+            return False
+        extracted = set(manifest.get("days", []))
+        return all(day in extracted for day in _days(date.fromisoformat(start_day), date.fromisoformat(end_day)))
+
+    def run_report(self, start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                   campaign_names: List[str]) -> tuple[dict, dict, dict]:
+        manifest = read_manifest()
+        if not manifest:
+            raise RuntimeError(f"No local extract in {LOCAL_EXTRACT_DIR}; run sync_local_extracts first.")
+        if not self.covers(start_date, end_date):
+            raise RuntimeError(f"The local extract does not cover {str(start_date)[:10]}..{str(end_date)[:10]} "
+                               f"(complete through {manifest.get('complete_through')}); run sync_local_extracts "
+                               f"or set QUERY_BACKEND=auto to use BigQuery for such ranges.")
+
+        start_day, end_day = str(start_date)[:10], str(end_date)[:10]
+        days = [day for day in manifest.get("days", []) if start_day <= day <= end_day]
+        files = [path for path in map(_day_path, days) if os.path.exists(path)]
+
+        with span("local.query", extract_days=len(files)) as query_span:
+            started = time.perf_counter()
+            tables = run_local_report(files, start_date, end_date, ad_name, media_sources, campaign_names,
+                                      manifest.get("event_time_type", "TIMESTAMP"))
+            elapsed = round(time.perf_counter() - started, 3)
+            rows = len(tables["summary"]) + len(tables["overlap"])
+            query_span.set(rows_returned=rows)
+        increment("query_rows_returned_total", rows, backend="local")
+
+        data = {"summary_table": tables["summary"], "pairwise_overlap": tables["overlap"]}
+        job_timings = {"local": {
+            "job_id": None,
+            "queue_seconds": 0.0,
+            "execution_seconds": elapsed,
+            "wait_seconds": elapsed,
+            "download_seconds": 0.0,
+            "total_seconds": elapsed,
+        }}
+        cost_estimate = {
+            "engine": "duckdb",
+            "extract_days": len(files),
+            "extract_bytes": sum(os.path.getsize(path) for path in files),
+            "complete_through": manifest.get("complete_through"),
+        }
+        return data, job_timings, cost_estimate
+
+
+def store_extract_day(day: str, table: "pa.Table", event_time_type: str = "TIMESTAMP",
+                      complete: bool = True) -> str:
+    """
+    Writes the events of one day into the local extract and records it in the manifest.
+
+    The file is replaced atomically, so reports can run while the extract is being written. If the
+    manifest describes another table or event_time type, the extract is restarted from this day.
+
+    Args:
+        day (str): The day (YYYY-MM-DD).
+        table (pa.Table): That day's events, with the EXTRACT_COLUMNS.
+        event_time_type (str): BigQuery type of the event_time column.
+        complete (bool): Whether the day can no longer change; advances "complete_through".
+
+    Returns:
+        str: Path of the written Parquet file.
+    """
+    import pyarrow.parquet as pq
+
+    path = _day_path(day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table.select(EXTRACT_COLUMNS), tmp)
+    os.replace(tmp, path)
+
+    with _manifest_lock:
+        manifest = read_manifest()
+        if manifest.get("table") != _table_name() or manifest.get("event_time_type") != event_time_type:
+            manifest = {"table": _table_name(), "event_time_type": event_time_type, "days": [],
+                        "complete_through": None}
+        manifest["days"] = sorted(set(manifest["days"]) | {day})
+        if complete and (manifest["complete_through"] or "") < day:
+            manifest["complete_through"] = day
+        manifest["synced_at"] = datetime.now(timezone.utc).isoformat()
+        _write_manifest(manifest)
+    return path
+
+
+def prune_extract(first_day: str) -> int:
+    """
+    Removes the extracted days before `first_day`.
+
+    Args:
+        first_day (str): Oldest day to keep (YYYY-MM-DD).
+
+    Returns:
+        int: Number of days kept.
+    """
+    with _manifest_lock:
+        manifest = read_manifest()
+        if not manifest:
+            return 0
+        for day in manifest["days"]:
+            if day < first_day:
+                shutil.rmtree(os.path.dirname(_day_path(day)), ignore_errors=True)
+        manifest["days"] = [day for day in manifest["days"] if day >= first_day]
+        _write_manifest(manifest)
+        return len(manifest["days"])
+
+
+def sync_local_extracts(through_date: Optional[str] = None) -> dict:
+    """
+    Copies recent raw events from BigQuery into the local Parquet extract used by the local engine.
+
+    Each day is stored as one Parquet file under LOCAL_EXTRACT_DIR/event_day=YYYY-MM-DD/ holding only
+    the report columns. Days up to the last complete one are pulled once; later days (today, which
+    may still change) are pulled again on every run. Days older than LOCAL_EXTRACT_DAYS are removed,
+    and the extract is rebuilt if the event table or the type of its event_time column changed.
+    Files are replaced atomically, so reports can run during a sync and the job is safe to rerun.
+
+    Args:
+        through_date (str, optional): Last day to extract (YYYY-MM-DD). Defaults to today.
+
+    Returns:
+        dict: Contains either:
+            - "status": "success", with "start_date" / "end_date" of the pulled days and "days" kept
+            - "status": "error", with "error_message"
+    """
+    from google.cloud import bigquery
+    from .big_qwery_tools import MAX_BYTES_BILLED, connect_db, event_time_type, get_table_metadata
+
+    try:
+        client, proj, ds, tbl = connect_db()
+        time_type = event_time_type(get_table_metadata())
+
+        manifest = read_manifest()
+        end = date.fromisoformat(through_date) if through_date else date.today()
+        first = end - timedelta(days=LOCAL_EXTRACT_DAYS - 1)
+        start = first
+        if (manifest.get("table") == _table_name() and manifest.get("event_time_type") == time_type
+                and manifest.get("complete_through")):
+            start = max(start, date.fromisoformat(manifest["complete_through"]) + timedelta(days=1))
+        complete_through = str(min(end, date.today() - timedelta(days=1)))
+
+        sql = f"""
+            SELECT {", ".join(EXTRACT_COLUMNS)}
+            FROM `{proj}.{ds}.{tbl}`
+            WHERE {BIGQUERY_DAY_EXPRESSIONS[time_type]} = @day"""
+        for day in _days(start, end):
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[bigquery.ScalarQueryParameter("day", "DATE", day)],
+                maximum_bytes_billed=MAX_BYTES_BILLED or None,
+            )
+            table = client.query(sql, job_config=job_config).result().to_arrow()
+            store_extract_day(day, table, time_type, complete=day <= complete_through)
+
+        kept = prune_extract(str(first))
+        return {"status": "success", "start_date": str(start), "end_date": str(end), "days": kept}
+    except Exception as e:
+        return {
+            "status": "error",
+            "data": {"error_message": str(e)}
+        }
@@ -0,0 +1,99 @@
+import math
+from typing import Dict, Iterable, List
+import numpy as np
+
+# Number of set bits in every byte value, used to popcount packed bitmaps.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def encode_user_sets(user_ids_by_source: Dict[str, Iterable]) -> tuple[List[str], np.ndarray]:
+    """
+    Maps user IDs to dense integers and builds one packed membership bitmap per media source.
+
+    Args:
+        user_ids_by_source (Dict[str, Iterable]): media_source -> user IDs (duplicates allowed).
+
+    Returns:
+        tuple[List[str], np.ndarray]: (sources sorted A–Z, uint8 array of shape
+            (len(sources), ceil(n_users / 8)) where bit k of row i is set if user k is in source i)
+    """
+    sources = sorted(user_ids_by_source)
+    arrays = [np.asarray(user_ids_by_source[s] if isinstance(user_ids_by_source[s], np.ndarray)
+                         else list(user_ids_by_source[s])) for s in sources]
+    sizes = [len(a) for a in arrays]
+    if not sources or sum(sizes) == 0:
+        return sources, np.zeros((len(sources), 0), dtype=np.uint8)
+
+    _, dense_ids = np.unique(np.concatenate(arrays), return_inverse=True)
+    n_users = int(dense_ids.max()) + 1
+
+    bitmaps = np.zeros((len(sources), (n_users + 7) // 8), dtype=np.uint8)
+    membership = np.zeros(n_users, dtype=bool)
+    offset = 0
+    for i, size in enumerate(sizes):
+        membership[:] = False
+        membership[dense_ids[offset:offset + size]] = True
+        bitmaps[i] = np.packbits(membership)
+        offset += size
+    return sources, bitmaps
+
+
+def intersection_counts(bitmaps: np.ndarray) -> np.ndarray:
+    """
+    Counts the shared users of every pair of bitmaps.
+
+    Each row is ANDed against all following rows in one vectorized step, so the cost grows with
+    the number of pairs times the bitmap size, independent of how many events produced the sets.
+
+    Args:
+        bitmaps (np.ndarray): Packed bitmaps as returned by `encode_user_sets`.
+
+    Returns:
+        np.ndarray: Symmetric int64 matrix; [i, j] is |source_i ∩ source_j|, [i, i] is |source_i|.
+    """
+    n_sources = bitmaps.shape[0]
+    counts = np.zeros((n_sources, n_sources), dtype=np.int64)
+    for i in range(n_sources):
+        shared = _POPCOUNT[np.bitwise_and(bitmaps[i], bitmaps[i:])].sum(axis=1, dtype=np.int64)
+        counts[i, i:] = shared
+        counts[i:, i] = shared
+    return counts
+
+
+def round_half_away(value: float, digits: int = 2) -> float:
+    """Rounds a non-negative value like SQL ROUND in BigQuery and DuckDB: halves go away from zero."""
+    scale = 10 ** digits
+    scaled = value * scale
+    whole = math.floor(scaled)
+    return (whole + (1 if scaled - whole >= 0.5 else 0)) / scale
+
+
+def compute_pairwise_overlap(user_ids_by_source: Dict[str, Iterable]) -> list[dict]:
+    """
+    Computes the pairwise overlap records locally from per-source user ID sets.
+
+    Produces the same records as the SQL self-join: one per ordered pair of different sources
+    that share at least one user, with the share of source_1's users also seen in source_2.
+
+    Args:
+        user_ids_by_source (Dict[str, Iterable]): media_source -> user IDs.
+
+    Returns:
+        list[dict]: Records with "source_1", "source_2", "overlap_percent" (rounded to 2 decimals),
+            ordered by source_1, source_2. Ties round like SQL ROUND, away from zero.
+    """
+    sources, bitmaps = encode_user_sets(user_ids_by_source)
+    counts = intersection_counts(bitmaps)
+
+    records = []
+    for i, source_1 in enumerate(sources):
+        total = counts[i, i]
+        for j, source_2 in enumerate(sources):
+            if i == j or counts[i, j] == 0:
+                continue
+            records.append({
+                "source_1": source_1,
+                "source_2": source_2,
+                "overlap_percent": round_half_away(float(counts[i, j]) / float(total) * 100),
+            })
+    return records
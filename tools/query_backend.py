@@ -0,0 +1,88 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from .settings import settings
+
+QUERY_BACKEND = settings.query_backend
+
+
+class QueryBackend(ABC):
+    """Interface of the engines `execute_queries` runs reports on."""
+
+    name = None
+
+    @abstractmethod
+    def cache_namespace(self) -> str:
+        """Result-cache namespace; backends that can disagree must not share entries."""
+
+    def covers(self, start_date: str, end_date: str) -> bool:
+        """Whether the backend holds every day of the range."""
+        return True
+
+    @abstractmethod
+    def run_report(self, start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                   campaign_names: List[str]) -> tuple[dict, dict, dict]:
+        """
+        Computes a report.
+
+        Returns:
+            tuple[dict, dict, dict]: ({"summary_table": [...], "pairwise_overlap": [...]},
+                job_timings, cost_estimate)
+        """
+
+
+_backends = {}
+_override = None
+_lock = threading.Lock()
+
+
+def _backend(name: str) -> QueryBackend:
+    """Returns the shared instance of a built-in backend, creating it on first use."""
+    with _lock:
+        if name not in _backends:
+            if name == "local":
+                from .local_engine import LocalBackend
+                _backends[name] = LocalBackend()
+            else:
+                from .big_qwery_tools import BigQueryBackend
+                _backends[name] = BigQueryBackend()
+        return _backends[name]
+
+
+def get_query_backend(start_date: Optional[str] = None, end_date: Optional[str] = None) -> QueryBackend:
+    """
+    Returns the backend a report should run on, selected by QUERY_BACKEND.
+
+    Args:
+        start_date (str, optional): Start of the report range, used by "auto".
+        end_date (str, optional): End of the report range, used by "auto".
+
+    Returns:
+        QueryBackend: The backend set with `set_query_backend`, otherwise:
+            - "bigquery" (default): BigQuery
+            - "local": the DuckDB engine over local Parquet extracts (see local_engine.py)
+            - "auto": the local engine when its extracts cover the range, BigQuery otherwise
+    """
+    if _override is not None:
+        return _override
+    if QUERY_BACKEND == "auto":
+        local = _backend("local")
+        if start_date and end_date and local.covers(start_date, end_date):
+            return local
+        return _backend("bigquery")
+    return _backend(QUERY_BACKEND)
+
+
+def set_query_backend(backend: Optional[QueryBackend]) -> None:
+    """
+    Replaces the backend selection (e.g. with a fake in benchmarks).
+
+    Args:
+        backend (QueryBackend | None): The backend to use for every report; None restores QUERY_BACKEND.
+
+    Returns:
+        None
+    """
+    global _override
+    with _lock:
+        _override = backend
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import List, Optional
+from .settings import settings
+
+RESULT_CACHE_BACKEND = settings.result_cache_backend
+RESULT_CACHE_PATH = settings.result_cache_path
+RESULT_CACHE_MAX_ENTRIES = settings.result_cache_max_entries
+RESULT_CACHE_TTL = settings.result_cache_ttl
+RESULT_CACHE_PAST_TTL = settings.result_cache_past_ttl
+
+
+def normalize_report_inputs(start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                            campaign_names: List[str]) -> tuple:
+    """
+    Canonicalizes report inputs, so equivalent requests share a cache entry and query the same slice.
+
+    Args:
+        start_date (str): Start date (YYYY-MM-DD); anything after the day is dropped.
+        end_date (str): End date (YYYY-MM-DD); anything after the day is dropped.
+        ad_name (str): Ad name; surrounding whitespace is dropped.
+        media_sources (List[str]): Media sources; stripped, de-duplicated and sorted.
+        campaign_names (List[str]): Campaign names; stripped, de-duplicated and sorted.
+
+    Returns:
+        tuple: (start_date, end_date, ad_name, media_sources, campaign_names)
+    """
+    return (
+        str(start_date)[:10],
+        str(end_date)[:10],
+        ad_name.strip(),
+        sorted({s.strip() for s in media_sources or []}),
+        sorted({c.strip() for c in campaign_names or []}),
+    )
+
+
+def make_cache_key(start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                   campaign_names: List[str], namespace: str = "report") -> str:
+    """
+    Builds an order-insensitive cache key for a report request.
+
+    Args:
+        start_date (str): Start date (YYYY-MM-DD).
+        end_date (str): End date (YYYY-MM-DD).
+        ad_name (str): Ad name.
+        media_sources (List[str]): Media sources; order and duplicates are ignored.
+        campaign_names (List[str]): Campaign names; order and duplicates are ignored.
+        namespace (str): Separates keys of different result kinds / query modes.
+
+    Returns:
+        str: A hex sha256 digest.
+    """
+    start_date, end_date, ad_name, media_sources, campaign_names = normalize_report_inputs(
+        start_date, end_date, ad_name, media_sources, campaign_names)
+    payload = json.dumps({
+        "ns": namespace,
+        "start": start_date,
+        "end": end_date,
+        "ad": ad_name,
+        "sources": media_sources,
+        "campaigns": campaign_names,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def ttl_for_range(end_date: str, today: Optional[date] = None) -> int:
+    """
+    Chooses a TTL for a report: closed past ranges never change, so they live longer.
+
+    Args:
+        end_date (str): End date of the report (YYYY-MM-DD).
+        today (date, optional): Override for the current date.
+
+    Returns:
+        int: TTL in seconds.
+    """
+    today = today or date.today()
+    try:
+        end = date.fromisoformat(str(end_date)[:10])
+    except ValueError:
+        return RESULT_CACHE_TTL
+    return RESULT_CACHE_PAST_TTL if end < today else RESULT_CACHE_TTL
+
+
+class CacheBackend(ABC):
+    """Interface for result-cache stores. Values are JSON-serialisable objects."""
+
+    @abstractmethod
+    def get(self, key: str):
+        """Returns the live value stored under `key`, or None."""
+
+    @abstractmethod
+    def set(self, key: str, value, ttl: int) -> None:
+        """Stores `value` under `key` for `ttl` seconds."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drops every entry."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """On-disk LRU cache with per-entry expiry; survives process restarts."""
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: int) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[CacheBackend]:
+    """
+    Returns the process-wide result cache selected by RESULT_CACHE_BACKEND.
+
+    Args:
+        None
+
+    Returns:
+        CacheBackend | None: "memory" (default), "sqlite", or None when set to "none".
+    """
+    global _cache
+    if RESULT_CACHE_BACKEND == "none":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            if RESULT_CACHE_BACKEND == "sqlite":
+                _cache = SQLiteCacheBackend()
+            else:
+                _cache = MemoryCacheBackend()
+        return _cache
+
+
+def set_result_cache(backend: Optional[CacheBackend]) -> None:
+    """
+    Replaces the process-wide result cache (e.g. with a custom backend).
+
+    Args:
+        backend (CacheBackend | None): The new cache; None resets to the configured default.
+
+    Returns:
+        None
+    """
+    global _cache
+    with _cache_lock:
+        _cache = backend
@@ -0,0 +1,123 @@
+REPORT_INTRO = (
+    "📊 Media Performance Summary Report\n"
+    "We’ve analyzed the latest data across your selected media sources.\n"
+    "Here's how each source performed based on reach, engagement, and incremental:"
+)
+
+
+def _number(record: dict, key: str) -> float:
+    """Returns a metric as float, treating missing / undefined values as 0.0."""
+    value = record.get(key)
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _format_filters(input_requirements: dict) -> str:
+    """
+    Renders the "Applied Filters" section from the report inputs.
+
+    Args:
+        input_requirements (dict): ad_name, date_range, media_sources and optional campaign_name.
+
+    Returns:
+        str: The section text.
+    """
+    date_range = input_requirements.get("date_range") or []
+    date_text = " → ".join(str(d) for d in date_range) if date_range else "Last 7 days"
+    campaigns = input_requirements.get("campaign_name") or input_requirements.get("campaign_names") or []
+    sources = input_requirements.get("media_sources") or []
+    return "\n".join([
+        "🔎 Applied Filters:",
+        f"• App: {input_requirements.get('ad_name', '')}",
+        f"• Date Range: {date_text}",
+        f"• Media Sources: {', '.join(sources) if sources else 'All'}",
+        f"• Campaigns: {', '.join(campaigns) if campaigns else 'All'}",
+    ])
+
+
+def _format_source_block(record: dict) -> str:
+    """
+    Renders one media source block.
+
+    Args:
+        record (dict): A summary_table record.
+
+    Returns:
+        str: The block text.
+    """
+    return "\n".join([
+        f"📌 Media Source: {record.get('media_source', '')}",
+        f"• Total Users: {int(_number(record, 'total_users'))}",
+        f"• Unique Users: {int(_number(record, 'unique_users'))}",
+        f"• Overlap Rate: {_number(record, 'overlap_rate'):.2f}%",
+        f"• Engagement Rate: {_number(record, 'engagement_rate'):.2f}%",
+        f"• Incremental Score: {_number(record, 'incremental_score'):.2f}",
+    ])
+
+
+def summarize_rankings(summary_table: list[dict]) -> dict:
+    """
+    Ranks the media sources deterministically; ties are broken alphabetically.
+
+    Args:
+        summary_table (list[dict]): summary_table records.
+
+    Returns:
+        dict: With "highest_unique_users", "highest_engagement" (media source names or None),
+            "most_worthwhile" (top 2 by incremental score) and "least_worthwhile" (bottom 2).
+    """
+    if not summary_table:
+        return {"highest_unique_users": None, "highest_engagement": None,
+                "most_worthwhile": [], "least_worthwhile": []}
+
+    records = sorted(summary_table, key=lambda r: str(r.get("media_source", "")))
+
+    def top(key):
+        return max(records, key=lambda r: _number(r, key))["media_source"]
+
+    by_score = sorted(records, key=lambda r: -_number(r, "incremental_score"))
+    by_score_asc = sorted(records, key=lambda r: _number(r, "incremental_score"))
+    return {
+        "highest_unique_users": top("unique_users"),
+        "highest_engagement": top("engagement_rate"),
+        "most_worthwhile": [r["media_source"] for r in by_score[:2]],
+        "least_worthwhile": [r["media_source"] for r in by_score_asc[:2]],
+    }
+
+
+def render_summary_report(summary_table: list[dict], input_requirements: dict) -> str:
+    """
+    Formats the media performance summary as the final Slack-ready string, without an LLM call.
+
+    Produces the same layout the format agent is instructed to write: fixed intro, applied filters,
+    one block per media source sorted A–Z with values rounded to 2 decimals, and a summary of the
+    best and worst sources.
+
+    Args:
+        summary_table (list[dict]): Records with media_source, total_users, unique_users,
+            overlap_rate, engagement_rate and incremental_score.
+        input_requirements (dict): ad_name, date_range, media_sources and optional campaign_name.
+
+    Returns:
+        str: The formatted report (`result_data`).
+    """
+    records = sorted(summary_table or [], key=lambda r: str(r.get("media_source", "")))
+    rankings = summarize_rankings(records)
+
+    def names(sources):
+        return ", ".join(sources) if sources else "N/A"
+
+    summary = "\n".join([
+        "🏁 Summary:",
+        f"• Highest Unique Users: {rankings['highest_unique_users'] or 'N/A'}",
+        f"• Highest Engaged Users: {rankings['highest_engagement'] or 'N/A'}",
+        f"• Two most worthwhile media sources: {names(rankings['most_worthwhile'])}",
+        f"• Two least worthwhile media sources: {names(rankings['least_worthwhile'])}",
+    ])
+
+    sections = [REPORT_INTRO, _format_filters(input_requirements or {})]
+    sections += [_format_source_block(record) for record in records]
+    sections.append(summary)
+    return "\n\n".join(sections)
@@ -0,0 +1,796 @@
+import math
+from functools import lru_cache
+from typing import List
+
+HLL_PRECISION = 15
+# Relative standard error of an HLL++ estimate at HLL_PRECISION, and the z-score of the reported bounds (95%).
+HLL_RELATIVE_ERROR = 1.04 / math.sqrt(2 ** HLL_PRECISION)
+ERROR_Z = 1.96
+
+SUMMARY_COLUMNS = ["media_source", "total_users", "unique_users", "overlap_rate", "engagement_rate", "incremental_score"]
+OVERLAP_COLUMNS = ["source_1", "source_2", "overlap_percent"]
+APPROX_SUMMARY_COLUMNS = SUMMARY_COLUMNS + ["total_users_error", "unique_users_error"]
+APPROX_OVERLAP_COLUMNS = OVERLAP_COLUMNS + ["overlap_percent_error"]
+
+USER_COUNTS_CTE = """
+        user_counts AS (
+          SELECT
+            media_source,
+            COUNT(DISTINCT advertising_id_value) AS total_users
+          FROM
+            deduped
+          GROUP BY
+            media_source
+        )"""
+
+EXACT_COUNTS_CTES = """
+        unique_users AS (
+          SELECT
+            advertising_id_value
+          FROM
+            deduped
+          GROUP BY
+            advertising_id_value
+          HAVING
+            COUNT(DISTINCT media_source) = 1
+        ),
+        
+        unique_counts AS (
+          SELECT
+            d.media_source,
+            COUNT(DISTINCT d.advertising_id_value) AS unique_users
+          FROM
+            deduped d
+          JOIN
+            unique_users u
+          ON
+            d.advertising_id_value = u.advertising_id_value
+          GROUP BY
+            d.media_source
+        ),
+        
+        engagement AS (
+          SELECT
+            media_source,
+            COUNTIF(engagement_type = 'click') AS clicks,
+            COUNTIF(engagement_type = 'view') AS impressions
+          FROM
+            deduped
+          GROUP BY
+            media_source
+        )"""
+
+SOURCE_STATS_CTE = """
+        source_stats AS (
+          SELECT
+            u.media_source,
+            CAST(u.total_users AS FLOAT64) AS total_users,
+            CAST(IFNULL(uc.unique_users, 0) AS FLOAT64) AS unique_users,
+            ROUND(SAFE_DIVIDE(u.total_users - IFNULL(uc.unique_users, 0), u.total_users) * 100, 2) AS overlap_rate,
+            ROUND(SAFE_DIVIDE(IFNULL(e.clicks, 0), NULLIF(e.impressions, 0)) * 100, 2) AS engagement_rate,
+            ROUND(SAFE_DIVIDE(IFNULL(uc.unique_users, 0), u.total_users), 4) AS incremental_score
+          FROM
+            user_counts u
+          LEFT JOIN
+            unique_counts uc ON u.media_source = uc.media_source
+          LEFT JOIN
+            engagement e ON u.media_source = e.media_source
+        )"""
+
+PAIRWISE_OVERLAP_CTE = """
+        pairwise_overlap AS (
+          SELECT
+            a.media_source AS source_1,
+            b.media_source AS source_2,
+            COUNT(DISTINCT a.advertising_id_value) AS shared_users
+          FROM
+            deduped a
+          JOIN
+            deduped b
+          ON
+            a.advertising_id_value = b.advertising_id_value
+            AND a.media_source != b.media_source
+          GROUP BY
+            source_1, source_2
+        )"""
+
+SUMMARY_SELECT = """
+        SELECT
+          media_source,
+          total_users,
+          unique_users,
+          overlap_rate,
+          engagement_rate,
+          incremental_score
+        FROM
+          source_stats"""
+
+OVERLAP_SELECT = """
+        SELECT
+          p.source_1,
+          p.source_2,
+          ROUND(SAFE_DIVIDE(p.shared_users, NULLIF(u.total_users, 0)) * 100, 2) AS overlap_percent
+        FROM
+          pairwise_overlap p
+        JOIN
+          user_counts u
+        ON
+          p.source_1 = u.media_source"""
+
+
+# Returns the summary and overlap result sets as one table, tagged by `result_set`.
+# Expects `source_stats`, `pairwise_overlap` (source_1, source_2, shared_users) and `user_counts`.
+TAGGED_RESULTS_SELECT = """
+        SELECT
+          'summary' AS result_set,
+          media_source,
+          total_users,
+          unique_users,
+          overlap_rate,
+          engagement_rate,
+          incremental_score,
+          CAST(NULL AS STRING) AS source_1,
+          CAST(NULL AS STRING) AS source_2,
+          CAST(NULL AS FLOAT64) AS overlap_percent
+        FROM
+          source_stats
+
+        UNION ALL
+        
+        SELECT
+          'overlap' AS result_set,
+          CAST(NULL AS STRING),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          p.source_1,
+          p.source_2,
+          ROUND(SAFE_DIVIDE(p.shared_users, NULLIF(u.total_users, 0)) * 100, 2)
+        FROM
+          pairwise_overlap p
+        JOIN
+          user_counts u
+        ON
+          p.source_1 = u.media_source
+
+        ORDER BY
+          result_set DESC, media_source, source_1, source_2;"""
+
+
+# Derives user_counts / unique_counts / engagement / pairwise_overlap from mergeable HLL sketches.
+# Expects `sketches` (media_source, users_sketch, click_sketch, view_sketch), any number of rows
+# per source. Unique users and pairwise intersections come from inclusion–exclusion on unions;
+# their error bounds add up the errors of every estimate involved.
+SKETCH_METRICS_CTES = f"""
+        src AS (
+          SELECT
+            media_source,
+            HLL_COUNT.MERGE_PARTIAL(users_sketch) AS users,
+            HLL_COUNT.MERGE_PARTIAL(click_sketch) AS clickers,
+            HLL_COUNT.MERGE_PARTIAL(view_sketch) AS viewers
+          FROM
+            sketches
+          GROUP BY
+            media_source
+        ),
+
+        user_counts AS (
+          SELECT
+            media_source,
+            HLL_COUNT.EXTRACT(users) AS total_users
+          FROM
+            src
+        ),
+
+        all_users AS (
+          SELECT
+            HLL_COUNT.MERGE(users) AS n
+          FROM
+            src
+        ),
+
+        other_users AS (
+          SELECT
+            s.media_source,
+            HLL_COUNT.MERGE(o.users) AS n
+          FROM
+            src s
+          JOIN
+            src o
+          ON
+            s.media_source != o.media_source
+          GROUP BY
+            s.media_source
+        ),
+
+        unique_counts AS (
+          SELECT
+            u.media_source,
+            LEAST(u.total_users, GREATEST(a.n - IFNULL(o.n, 0), 0)) AS unique_users,
+            ROUND({ERROR_Z} * {HLL_RELATIVE_ERROR} * (a.n + IFNULL(o.n, 0))) AS unique_users_error
+          FROM
+            user_counts u
+          CROSS JOIN
+            all_users a
+          LEFT JOIN
+            other_users o ON u.media_source = o.media_source
+        ),
+
+        engagement AS (
+          SELECT
+            media_source,
+            IFNULL(HLL_COUNT.EXTRACT(clickers), 0) AS clicks,
+            IFNULL(HLL_COUNT.EXTRACT(viewers), 0) AS impressions
+          FROM
+            src
+        ),
+
+        pair_unions AS (
+          SELECT
+            a.media_source AS source_1,
+            b.media_source AS source_2,
+            HLL_COUNT.MERGE(x.users) AS union_users
+          FROM
+            src a
+          JOIN
+            src b ON a.media_source != b.media_source
+          JOIN
+            src x ON x.media_source IN (a.media_source, b.media_source)
+          GROUP BY
+            source_1, source_2
+        ),
+
+        pairwise_overlap AS (
+          SELECT
+            p.source_1,
+            p.source_2,
+            LEAST(ua.total_users, ub.total_users,
+                  GREATEST(ua.total_users + ub.total_users - p.union_users, 0)) AS shared_users,
+            ROUND({ERROR_Z} * {HLL_RELATIVE_ERROR} * (ua.total_users + ub.total_users + p.union_users)) AS shared_users_error
+          FROM
+            pair_unions p
+          JOIN
+            user_counts ua ON p.source_1 = ua.media_source
+          JOIN
+            user_counts ub ON p.source_2 = ub.media_source
+        )"""
+
+
+# TAGGED_RESULTS_SELECT plus 95% error bounds; expects the CTEs of SKETCH_METRICS_CTES and `source_stats`.
+APPROX_TAGGED_RESULTS_SELECT = f"""
+        SELECT
+          'summary' AS result_set,
+          s.media_source,
+          s.total_users,
+          s.unique_users,
+          s.overlap_rate,
+          s.engagement_rate,
+          s.incremental_score,
+          ROUND({ERROR_Z} * {HLL_RELATIVE_ERROR} * u.total_users) AS total_users_error,
+          CAST(IFNULL(uc.unique_users_error, 0) AS FLOAT64) AS unique_users_error,
+          CAST(NULL AS STRING) AS source_1,
+          CAST(NULL AS STRING) AS source_2,
+          CAST(NULL AS FLOAT64) AS overlap_percent,
+          CAST(NULL AS FLOAT64) AS overlap_percent_error
+        FROM
+          source_stats s
+        JOIN
+          user_counts u ON s.media_source = u.media_source
+        LEFT JOIN
+          unique_counts uc ON s.media_source = uc.media_source
+
+        UNION ALL
+
+        SELECT
+          'overlap' AS result_set,
+          CAST(NULL AS STRING),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          p.source_1,
+          p.source_2,
+          ROUND(SAFE_DIVIDE(p.shared_users, NULLIF(u.total_users, 0)) * 100, 2),
+          ROUND(SAFE_DIVIDE(p.shared_users_error, NULLIF(u.total_users, 0)) * 100, 2)
+        FROM
+          pairwise_overlap p
+        JOIN
+          user_counts u
+        ON
+          p.source_1 = u.media_source
+
+        ORDER BY
+          result_set DESC, media_source, source_1, source_2;"""
+
+
+# Summary rows plus one 'ids' row per distinct (media_source, user), for the local overlap engine.
+# Expects `source_stats` and `deduped`.
+SUMMARY_AND_IDS_SELECT = """
+        SELECT
+          'summary' AS result_set,
+          media_source,
+          total_users,
+          unique_users,
+          overlap_rate,
+          engagement_rate,
+          incremental_score,
+          CAST(NULL AS STRING) AS advertising_id_value
+        FROM
+          source_stats
+
+        UNION ALL
+
+        SELECT DISTINCT
+          'ids' AS result_set,
+          media_source,
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(advertising_id_value AS STRING)
+        FROM
+          deduped
+        WHERE
+          advertising_id_value IS NOT NULL;"""
+
+
+# Report predicates. Values are bound as query parameters (see `build_query_parameters`), so the
+# query text never changes between calls; an empty @campaign_names array disables that filter.
+EVENT_TIME_FILTER = "event_time BETWEEN @start_date AND @end_date"
+# BigQuery expression of the calendar day of an event, per event_time type.
+BIGQUERY_DAY_EXPRESSIONS = {
+    "TIMESTAMP": "DATE(event_time)",
+    "DATETIME": "DATE(event_time)",
+    "DATE": "event_time",
+    "STRING": "SAFE.PARSE_DATE('%Y-%m-%d', SUBSTR(event_time, 1, 10))",
+}
+FILTERS = """
+                AND ad_name = @ad_name
+                AND media_source IN UNNEST(@media_sources)
+                AND (ARRAY_LENGTH(@campaign_names) = 0 OR campaign_name IN UNNEST(@campaign_names))"""
+
+
+def build_query_parameters(start_date: str, end_date: str, ad_name: str, media_sources: List[str],
+                           campaign_names: List[str], event_time_type: str = "TIMESTAMP") -> list:
+    """
+    Binds the report inputs as BigQuery query parameters for the templates in this module.
+
+    Args:
+        start_date (str): Start date for filtering (YYYY-MM-DD).
+        end_date (str): End date for filtering (YYYY-MM-DD).
+        ad_name (str): Ad name to filter the dataset.
+        media_sources (List[str]): List of media sources to include.
+        campaign_names (List[str]): List of campaign names to filter by (empty = no campaign filter).
+        event_time_type (str): BigQuery type of the event_time column, used for @start_date / @end_date.
+
+    Returns:
+        list: ScalarQueryParameter / ArrayQueryParameter objects for @start_date, @end_date,
+            @start_day, @end_day (DATE), @ad_name, @media_sources and @campaign_names.
+    """
+    from google.cloud import bigquery
+
+    return [
+        bigquery.ScalarQueryParameter("start_date", event_time_type, str(start_date)),
+        bigquery.ScalarQueryParameter("end_date", event_time_type, str(end_date)),
+        bigquery.ScalarQueryParameter("start_day", "DATE", str(start_date)[:10]),
+        bigquery.ScalarQueryParameter("end_day", "DATE", str(end_date)[:10]),
+        bigquery.ScalarQueryParameter("ad_name", "STRING", ad_name),
+        bigquery.ArrayQueryParameter("media_sources", "STRING", list(media_sources)),
+        bigquery.ArrayQueryParameter("campaign_names", "STRING", list(campaign_names or [])),
+    ]
+
+
+@lru_cache(maxsize=None)
+def build_deduped_select(table_ref: str) -> str:
+    """
+    Builds the SELECT that produces the deduped (advertising_id, media_source, engagement_type) slice.
+
+    Args:
+        table_ref (str): Fully qualified, backtick-quoted table reference.
+
+    Returns:
+        str: A SELECT DISTINCT statement over the filtered event rows.
+    """
+    return f"""
+              SELECT DISTINCT
+                advertising_id_value,
+                media_source,
+                engagement_type
+              FROM
+                {table_ref}
+              WHERE
+                {EVENT_TIME_FILTER}{FILTERS}"""
+
+
+@lru_cache(maxsize=None)
+def build_split_queries(table_ref: str) -> tuple[str, str]:
+    """
+    Builds the legacy pair of queries (summary, overlap), each re-deriving the deduped slice.
+
+    Args:
+        table_ref (str): Fully qualified, backtick-quoted table reference.
+
+    Returns:
+        tuple[str, str]: (summary_query, overlap_query)
+    """
+    base_cte = f"""
+            WITH deduped AS ({build_deduped_select(table_ref)}
+            )"""
+
+    summary_query = (base_cte + ",\n" + USER_COUNTS_CTE + "," + EXACT_COUNTS_CTES + "," + SOURCE_STATS_CTE
+                     + SUMMARY_SELECT + "\n        ORDER BY\n          media_source;\n")
+    overlap_query = (base_cte + ",\n" + PAIRWISE_OVERLAP_CTE + "," + USER_COUNTS_CTE
+                     + OVERLAP_SELECT + "\n        ORDER BY\n          source_1, source_2;\n")
+    return summary_query, overlap_query
+
+
+@lru_cache(maxsize=None)
+def build_single_scan_script(table_ref: str) -> str:
+    """
+    Builds a multi-statement script that scans the event table once.
+
+    The deduped slice is materialized into a temp table, and both the summary metrics and the
+    pairwise overlap are derived from it in one final SELECT. The two result sets are tagged by
+    a `result_set` column ('summary' / 'overlap') and split apart client-side.
+
+    Args:
+        table_ref (str): Fully qualified, backtick-quoted table reference.
+
+    Returns:
+        str: The BigQuery script.
+    """
+    return f"""
+        CREATE TEMP TABLE deduped AS{build_deduped_select(table_ref)};
+
+        WITH
+{USER_COUNTS_CTE},
+{EXACT_COUNTS_CTES},
+{SOURCE_STATS_CTE},
+{PAIRWISE_OVERLAP_CTE}
+
+{TAGGED_RESULTS_SELECT}
+        """
+
+
+@lru_cache(maxsize=None)
+def build_local_overlap_script(table_ref: str) -> str:
+    """
+    Builds a single-scan script returning the summary metrics and the per-source user IDs.
+
+    The pairwise overlap is then computed client-side by tools/overlap_engine.py instead of by the
+    `deduped` self-join.
+
+    Args:
+        table_ref (str): Fully qualified, backtick-quoted table reference.
+
+    Returns:
+        str: The BigQuery script, returning rows shaped by SUMMARY_AND_IDS_SELECT.
+    """
+    return f"""
+        CREATE TEMP TABLE deduped AS{build_deduped_select(table_ref)};
+
+        WITH
+{USER_COUNTS_CTE},
+{EXACT_COUNTS_CTES},
+{SOURCE_STATS_CTE}
+
+{SUMMARY_AND_IDS_SELECT}
+        """
+
+
+def build_sketch_select(table_ref: str, where: str, group_columns: List[str], with_counts: bool = True) -> str:
+    """
+    Builds a SELECT that turns raw events into HLL sketches (users, clickers, viewers) per group.
+
+    Args:
+        table_ref (str): Fully qualified, backtick-quoted event table reference.
+        where (str): Full WHERE predicate over the event table.
+        group_columns (List[str]): Grouping expressions (may carry an alias); selected first.
+        with_counts (bool): Also select raw click / view event counts.
+
+    Returns:
+        str: The SELECT statement.
+    """
+    counts = ""
+    if with_counts:
+        counts = """,
+                COUNTIF(engagement_type = 'click') AS clicks,
+                COUNTIF(engagement_type = 'view') AS views"""
+    group_sql = ", ".join(group_columns)
+    ordinals = ", ".join(str(i + 1) for i in range(len(group_columns)))
+    return f"""
+              SELECT
+                {group_sql},
+                HLL_COUNT.INIT(advertising_id_value, {HLL_PRECISION}) AS users_sketch,
+                HLL_COUNT.INIT(IF(engagement_type = 'click', advertising_id_value, NULL), {HLL_PRECISION}) AS click_sketch,
+                HLL_COUNT.INIT(IF(engagement_type = 'view', advertising_id_value, NULL), {HLL_PRECISION}) AS view_sketch{counts}
+              FROM
+                {table_ref}
+              WHERE
+                {where}
+              GROUP BY
+                {ordinals}"""
+
+
+@lru_cache(maxsize=None)
+def build_daily_report_script(daily_ref: str, table_ref: str, event_time_type: str = "TIMESTAMP") -> str:
+    """
+    Builds a script that computes the report by merging per-day sketches.
+
+    Whole days before @end_day and up to the daily table's watermark are read from the
+    pre-aggregated table. The remaining days (typically just today, plus the end bound itself) are
+    sketched from raw events on the fly with EVENT_TIME_FILTER, so the covered range matches the
+    other query modes for every event_time type.
+
+    Args:
+        daily_ref (str): Backtick-quoted reference of the daily aggregate table.
+        table_ref (str): Backtick-quoted reference of the raw event table.
+        event_time_type (str): BigQuery type of the event_time column.
+
+    Returns:
+        str: The BigQuery script, returning rows shaped by APPROX_TAGGED_RESULTS_SELECT.
+    """
+    raw_tail = build_sketch_select(
+        table_ref,
+        f"{EVENT_TIME_FILTER}\n                AND {BIGQUERY_DAY_EXPRESSIONS[event_time_type]} >= "
+        f"LEAST(@end_day, DATE_ADD(watermark, INTERVAL 1 DAY)){FILTERS}",
+        ["media_source"], with_counts=False,
+    )
+    return f"""
+        DECLARE watermark DATE DEFAULT (SELECT IFNULL(MAX(event_date), DATE '1970-01-01') FROM {daily_ref});
+
+        WITH
+        sketches AS (
+              SELECT
+                media_source,
+                users_sketch,
+                click_sketch,
+                view_sketch
+              FROM
+                {daily_ref}
+              WHERE
+                event_date >= @start_day
+                AND event_date < LEAST(@end_day, DATE_ADD(watermark, INTERVAL 1 DAY)){FILTERS}
+
+              UNION ALL
+{raw_tail}
+        ),
+{SKETCH_METRICS_CTES},
+{SOURCE_STATS_CTE}
+
+{APPROX_TAGGED_RESULTS_SELECT}
+        """
+
+
+@lru_cache(maxsize=None)
+def build_approximate_script(table_ref: str) -> str:
+    """
+    Builds a query that estimates the report from HLL sketches of the raw events.
+
+    Replaces the COUNT(DISTINCT ...) aggregations and the `deduped` self-join with one sketch per
+    media source; unique users and pairwise intersections are derived by inclusion–exclusion.
+
+    Args:
+        table_ref (str): Backtick-quoted reference of the raw event table.
+
+    Returns:
+        str: The query, returning rows shaped by APPROX_TAGGED_RESULTS_SELECT.
+    """
+    sketch_select = build_sketch_select(table_ref, f"{EVENT_TIME_FILTER}{FILTERS}", ["media_source"],
+                                        with_counts=False)
+    return f"""
+        WITH
+        sketches AS ({sketch_select}
+        ),
+{SKETCH_METRICS_CTES},
+{SOURCE_STATS_CTE}
+
+{APPROX_TAGGED_RESULTS_SELECT}
+        """
+
+
+@lru_cache(maxsize=None)
+def build_batch_script(table_ref: str) -> str:
+    """
+    Builds a single-scan script computing many reports at once, one per entry of @specs.
+
+    @specs is an ARRAY<STRUCT<spec_id, ad_name, start_date, end_date, media_sources, campaign_names>>;
+    @start_date / @end_date / @ad_names / @media_sources cover the union of all specs so the scan is
+    pruned once for the whole batch. Every metric is grouped by spec_id.
+
+    Args:
+        table_ref (str): Backtick-quoted reference of the raw event table.
+
+    Returns:
+        str: The BigQuery script, returning TAGGED_RESULTS_SELECT rows with a leading spec_id.
+    """
+    return f"""
+        CREATE TEMP TABLE deduped AS
+              SELECT DISTINCT
+                s.spec_id,
+                e.advertising_id_value,
+                e.media_source,
+                e.engagement_type
+              FROM
+                {table_ref} e
+              JOIN
+                UNNEST(@specs) s
+              ON
+                e.ad_name = s.ad_name
+              WHERE
+                e.event_time BETWEEN @start_date AND @end_date
+                AND e.ad_name IN UNNEST(@ad_names)
+                AND e.media_source IN UNNEST(@media_sources)
+                AND e.event_time BETWEEN s.start_date AND s.end_date
+                AND e.media_source IN UNNEST(s.media_sources)
+                AND (ARRAY_LENGTH(s.campaign_names) = 0 OR e.campaign_name IN UNNEST(s.campaign_names));
+
+        WITH
+        user_counts AS (
+          SELECT
+            spec_id,
+            media_source,
+            COUNT(DISTINCT advertising_id_value) AS total_users
+          FROM
+            deduped
+          GROUP BY
+            spec_id, media_source
+        ),
+
+        unique_users AS (
+          SELECT
+            spec_id,
+            advertising_id_value
+          FROM
+            deduped
+          GROUP BY
+            spec_id, advertising_id_value
+          HAVING
+            COUNT(DISTINCT media_source) = 1
+        ),
+
+        unique_counts AS (
+          SELECT
+            d.spec_id,
+            d.media_source,
+            COUNT(DISTINCT d.advertising_id_value) AS unique_users
+          FROM
+            deduped d
+          JOIN
+            unique_users u
+          ON
+            d.spec_id = u.spec_id
+            AND d.advertising_id_value = u.advertising_id_value
+          GROUP BY
+            d.spec_id, d.media_source
+        ),
+
+        engagement AS (
+          SELECT
+            spec_id,
+            media_source,
+            COUNTIF(engagement_type = 'click') AS clicks,
+            COUNTIF(engagement_type = 'view') AS impressions
+          FROM
+            deduped
+          GROUP BY
+            spec_id, media_source
+        ),
+
+        source_stats AS (
+          SELECT
+            u.spec_id,
+            u.media_source,
+            CAST(u.total_users AS FLOAT64) AS total_users,
+            CAST(IFNULL(uc.unique_users, 0) AS FLOAT64) AS unique_users,
+            ROUND(SAFE_DIVIDE(u.total_users - IFNULL(uc.unique_users, 0), u.total_users) * 100, 2) AS overlap_rate,
+            ROUND(SAFE_DIVIDE(IFNULL(e.clicks, 0), NULLIF(e.impressions, 0)) * 100, 2) AS engagement_rate,
+            ROUND(SAFE_DIVIDE(IFNULL(uc.unique_users, 0), u.total_users), 4) AS incremental_score
+          FROM
+            user_counts u
+          LEFT JOIN
+            unique_counts uc ON u.spec_id = uc.spec_id AND u.media_source = uc.media_source
+          LEFT JOIN
+            engagement e ON u.spec_id = e.spec_id AND u.media_source = e.media_source
+        ),
+
+        pairwise_overlap AS (
+          SELECT
+            a.spec_id,
+            a.media_source AS source_1,
+            b.media_source AS source_2,
+            COUNT(DISTINCT a.advertising_id_value) AS shared_users
+          FROM
+            deduped a
+          JOIN
+            deduped b
+          ON
+            a.spec_id = b.spec_id
+            AND a.advertising_id_value = b.advertising_id_value
+            AND a.media_source != b.media_source
+          GROUP BY
+            a.spec_id, source_1, source_2
+        )
+
+        SELECT
+          'summary' AS result_set,
+          spec_id,
+          media_source,
+          total_users,
+          unique_users,
+          overlap_rate,
+          engagement_rate,
+          incremental_score,
+          CAST(NULL AS STRING) AS source_1,
+          CAST(NULL AS STRING) AS source_2,
+          CAST(NULL AS FLOAT64) AS overlap_percent
+        FROM
+          source_stats
+
+        UNION ALL
+
+        SELECT
+          'overlap' AS result_set,
+          p.spec_id,
+          CAST(NULL AS STRING),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          CAST(NULL AS FLOAT64),
+          p.source_1,
+          p.source_2,
+          ROUND(SAFE_DIVIDE(p.shared_users, NULLIF(u.total_users, 0)) * 100, 2)
+        FROM
+          pairwise_overlap p
+        JOIN
+          user_counts u
+        ON
+          p.spec_id = u.spec_id
+          AND p.source_1 = u.media_source
+
+        ORDER BY
+          spec_id, result_set DESC, media_source, source_1, source_2;
+        """
+
+
+def build_batch_parameters(specs: List[dict], event_time_type: str = "TIMESTAMP") -> list:
+    """
+    Binds a group of report specs as query parameters for `build_batch_script`.
+
+    Args:
+        specs (List[dict]): Normalized specs with "spec_id", "ad_name", "start_date", "end_date",
+            "media_sources" and "campaign_names".
+        event_time_type (str): BigQuery type of the event_time column.
+
+    Returns:
+        list: @specs, @start_date, @end_date, @ad_names and @media_sources parameters.
+    """
+    from google.cloud import bigquery
+
+    spec_params = [
+        bigquery.StructQueryParameter(
+            None,
+            bigquery.ScalarQueryParameter("spec_id", "STRING", spec["spec_id"]),
+            bigquery.ScalarQueryParameter("ad_name", "STRING", spec["ad_name"]),
+            bigquery.ScalarQueryParameter("start_date", event_time_type, spec["start_date"]),
+            bigquery.ScalarQueryParameter("end_date", event_time_type, spec["end_date"]),
+            bigquery.ArrayQueryParameter("media_sources", "STRING", list(spec["media_sources"])),
+            bigquery.ArrayQueryParameter("campaign_names", "STRING", list(spec["campaign_names"])),
+        )
+        for spec in specs
+    ]
+    return [
+        bigquery.ArrayQueryParameter("specs", "STRUCT", spec_params),
+        bigquery.ScalarQueryParameter("start_date", event_time_type, min(s["start_date"] for s in specs)),
+        bigquery.ScalarQueryParameter("end_date", event_time_type, max(s["end_date"] for s in specs)),
+        bigquery.ArrayQueryParameter("ad_names", "STRING", sorted({s["ad_name"] for s in specs})),
+        bigquery.ArrayQueryParameter("media_sources", "STRING",
+                                     sorted({m for s in specs for m in s["media_sources"]})),
+    ]
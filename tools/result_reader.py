@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def iter_records(batches: Iterable[pa.RecordBatch], columns: List[str]) -> Iterator[dict]:
+    """
+    Lazily converts Arrow record batches to dictionaries, one batch at a time.
+
+    Nulls become None during conversion; no intermediate DataFrame is built.
+
+    Args:
+        batches (Iterable[pa.RecordBatch]): Query result batches.
+        columns (List[str]): Columns to keep, in output order.
+
+    Yields:
+        dict: One dictionary per row.
+    """
+    for batch in batches:
+        values = [batch.column(batch.schema.get_field_index(c)).to_pylist() for c in columns]
+        for row in zip(*values):
+            yield dict(zip(columns, row))
+
+
+def collect_records(columns: List[str]):
+    """
+    Returns a consumer that reads all batches into a list of records with the given columns.
+
+    Args:
+        columns (List[str]): Columns to keep, in output order.
+
+    Returns:
+        Callable[[Iterable[pa.RecordBatch]], list[dict]]
+    """
+    return lambda batches: list(iter_records(batches, columns))
+
+
+def collect_tagged(columns_by_tag: Dict[str, Optional[List[str]]]):
+    """
+    Returns a consumer that routes the rows of a `result_set`-tagged result by tag.
+
+    Args:
+        columns_by_tag (Dict[str, Optional[List[str]]]): result_set value -> columns of its records,
+            or None to keep that tag's rows in column form (a pa.Table).
+
+    Returns:
+        Callable[[Iterable[pa.RecordBatch]], dict]: tag -> list[dict] or pa.Table
+    """
+    def consume(batches: Iterable[pa.RecordBatch]) -> dict:
+        records = {tag: [] for tag, columns in columns_by_tag.items() if columns is not None}
+        tables = {tag: [] for tag, columns in columns_by_tag.items() if columns is None}
+        schema = None
+        for batch in batches:
+            schema = batch.schema
+            tags = batch.column(schema.get_field_index("result_set"))
+            for tag, columns in columns_by_tag.items():
+                part = batch.filter(pc.equal(tags, tag))
+                if not part.num_rows:
+                    continue
+                if columns is None:
+                    tables[tag].append(part)
+                else:
+                    records[tag].extend(iter_records([part], columns))
+
+        for tag, parts in tables.items():
+            records[tag] = pa.Table.from_batches(parts, schema=schema) if schema is not None else pa.table({})
+        return records
+
+    return consume
+
+
+def group_ids_by_source(table: pa.Table, source_column: str = "media_source",
+                        id_column: str = "advertising_id_value") -> Dict[str, np.ndarray]:
+    """
+    Splits a (source, user id) table into one user ID array per source; rows without a user id are dropped.
+
+    Args:
+        table (pa.Table): Table with the source and id columns.
+        source_column (str): Name of the source column.
+        id_column (str): Name of the user id column.
+
+    Returns:
+        Dict[str, np.ndarray]: media_source -> user IDs.
+    """
+    table = table.filter(pc.is_valid(table.column(id_column)))
+    if table.num_rows == 0:
+        return {}
+    sources = table.column(source_column).to_numpy(zero_copy_only=False)
+    ids = table.column(id_column).to_numpy(zero_copy_only=False)
+    order = np.argsort(sources, kind="stable")
+    sources, ids = sources[order], ids[order]
+    names, starts = np.unique(sources, return_index=True)
+    return {str(name): part for name, part in zip(names, np.split(ids, starts[1:]))}
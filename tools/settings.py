@@ -0,0 +1,102 @@
+import os
+from dotenv import load_dotenv
+
+
+class Settings:
+    """
+    Configuration of the agent, read from the environment (and `.env`) once per process.
+
+    Modules copy what they need into their own constants at import time; set the environment
+    before importing the package to change a value.
+    """
+
+    def __init__(self, environ=None):
+        env = os.environ if environ is None else environ
+
+        def text(name, default=None):
+            return env.get(name, default)
+
+        def integer(name, default):
+            return int(env.get(name, default))
+
+        home_cache = os.path.join(os.path.expanduser("~"), ".cache", "ai_agents")
+
+        # Google Cloud
+        self.google_cloud_project = text("GOOGLE_CLOUD_PROJECT")
+        self.dataset_id = text("DATASET_ID")
+        self.table_id = text("TABLE_ID")
+        self.daily_table_id = text("DAILY_TABLE_ID") or f"{self.table_id}_daily"
+        self.bucket_name = text("BUCKET_NAME")
+        self.client_pool_size = integer("CLIENT_POOL_SIZE", 16)
+
+        # Slack
+        self.slack_bot_token = text("SLACK_BOT_TOKEN")
+        self.slack_team_id = text("SLACK_TEAM_ID")
+        self.channel_name = text("CHANNEL_NAME")
+        self.channel_id = text("CHANNEL_ID")
+        self.slack_timeout = integer("SLACK_TIMEOUT", 15)
+        self.slack_upload_workers = integer("SLACK_UPLOAD_WORKERS", 4)
+        self.slack_upload_attempts = integer("SLACK_UPLOAD_ATTEMPTS", 3)
+        self.slack_upload_backoff = float(env.get("SLACK_UPLOAD_BACKOFF", 1.0))
+
+        # Agent pipeline
+        self.format_mode = text("FORMAT_MODE", "local")
+        self.visual_mode = text("VISUAL_MODE", "local")
+        self.slack_mode = text("SLACK_MODE", "native")
+        self.tool_mode = text("TOOL_MODE", "async")
+
+        # Queries
+        self.query_backend = text("QUERY_BACKEND", "bigquery")
+        self.query_mode = text("QUERY_MODE", "single_scan")
+        self.max_bytes_billed = integer("MAX_BYTES_BILLED", 100 * 1024 ** 3)
+        self.dry_run_check = text("DRY_RUN_CHECK", "true").lower() == "true"
+        self.schema_cache_ttl = integer("SCHEMA_CACHE_TTL", 3600)
+        self.daily_backfill_days = integer("DAILY_BACKFILL_DAYS", 30)
+
+        # Local query engine
+        self.local_extract_dir = text("LOCAL_EXTRACT_DIR", os.path.join(home_cache, "extracts"))
+        self.local_extract_days = integer("LOCAL_EXTRACT_DAYS", 30)
+        self.local_engine_threads = integer("LOCAL_ENGINE_THREADS", os.cpu_count() or 4)
+
+        # Result cache
+        self.result_cache_backend = text("RESULT_CACHE_BACKEND", "memory")
+        self.result_cache_path = text("RESULT_CACHE_PATH", os.path.join(home_cache, "results.sqlite"))
+        self.result_cache_max_entries = integer("RESULT_CACHE_MAX_ENTRIES", 256)
+        self.result_cache_ttl = integer("RESULT_CACHE_TTL", 600)
+        self.result_cache_past_ttl = integer("RESULT_CACHE_PAST_TTL", 7 * 24 * 3600)
+
+        # Charts
+        self.chart_render_processes = integer("CHART_RENDER_PROCESSES", 3)
+        self.chart_archive_mode = text("CHART_ARCHIVE_MODE", "sync")
+        self.chart_cache_enabled = text("CHART_CACHE_ENABLED", "1") == "1"
+        self.chart_cache_dir = text("CHART_CACHE_DIR", os.path.join(home_cache, "charts"))
+        self.chart_cache_folder = text("CHART_CACHE_FOLDER", "visualization/cache")
+        self.chart_cache_ttl = integer("CHART_CACHE_TTL", 30 * 24 * 3600)
+        self.chart_cache_max_bytes = integer("CHART_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+        self.chart_cache_grace = integer("CHART_CACHE_GRACE", 24 * 3600)
+        self.chart_cache_evict_interval = integer("CHART_CACHE_EVICT_INTERVAL", 3600)
+
+        # Async tools: concurrent calls per backend across all sessions
+        self.bigquery_concurrency = integer("BIGQUERY_CONCURRENCY", 8)
+        self.local_query_concurrency = integer("LOCAL_QUERY_CONCURRENCY", 2)
+        self.chart_concurrency = integer("CHART_CONCURRENCY", self.chart_render_processes)
+        self.slack_concurrency = integer("SLACK_CONCURRENCY", 4)
+
+        # Report server
+        self.report_max_concurrent = integer("REPORT_MAX_CONCURRENT", 8)
+        self.report_max_queued = integer("REPORT_MAX_QUEUED", 64)
+        self.report_tenant_concurrency = integer("REPORT_TENANT_CONCURRENCY", 2)
+        self.report_tenant_max_queued = integer("REPORT_TENANT_MAX_QUEUED", 8)
+        self.report_queue_timeout = integer("REPORT_QUEUE_TIMEOUT", 300)
+        self.report_timeout = integer("REPORT_TIMEOUT", 900)
+
+        # Telemetry
+        self.telemetry_exporter = text("TELEMETRY_EXPORTER", "none")
+        self.telemetry_span_buffer = integer("TELEMETRY_SPAN_BUFFER", 1000)
+        self.metrics_port = integer("METRICS_PORT", 0)
+        self.metrics_host = text("METRICS_HOST", "127.0.0.1")
+        self.telemetry_max_open_spans = integer("TELEMETRY_MAX_OPEN_SPANS", 1000)
+
+
+load_dotenv()
+settings = Settings()
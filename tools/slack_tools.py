@@ -1,15 +1,91 @@
 import json
-from dotenv import load_dotenv
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
-from google.cloud import storage
+from typing import TYPE_CHECKING
+from .chart_cache import is_local_chart
+from .clients import get_storage_client
+from .settings import settings
+from .telemetry import increment, span
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import os
-load_dotenv()
+import random
+import threading
+import time
 
-SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
-CHANNEL_NAME = os.getenv("CHANNEL_NAME")
-CHANNEL_ID = os.getenv("CHANNEL_ID")
+if TYPE_CHECKING:
+    from slack_sdk import WebClient
+
+SLACK_BOT_TOKEN = settings.slack_bot_token
+CHANNEL_NAME = settings.channel_name
+CHANNEL_ID = settings.channel_id
+
+# Parallel image uploads per send_to_slack_visual call.
+SLACK_UPLOAD_WORKERS = settings.slack_upload_workers
+# Attempts per image, and the base of the exponential backoff between them (seconds).
+SLACK_UPLOAD_ATTEMPTS = settings.slack_upload_attempts
+SLACK_UPLOAD_BACKOFF = settings.slack_upload_backoff
+SLACK_TIMEOUT = settings.slack_timeout
+
+_slack_client = None
+_slack_lock = threading.Lock()
+
+
+def get_slack_client() -> "WebClient":
+    """
+    Returns the process-wide Slack client, creating it on first use.
+
+    The client is thread-safe and retries connection errors and rate limits (honouring
+    Retry-After) on every call; send_to_slack_visual adds per-file retries on top.
+
+    Args:
+        None
+
+    Returns:
+        WebClient: The shared client.
+    """
+    global _slack_client
+    from slack_sdk import WebClient
+    from slack_sdk.http_retry.builtin_handlers import ConnectionErrorRetryHandler, RateLimitErrorRetryHandler
+
+    with _slack_lock:
+        if _slack_client is None:
+            _slack_client = WebClient(
+                token=SLACK_BOT_TOKEN,
+                timeout=SLACK_TIMEOUT,
+                retry_handlers=[ConnectionErrorRetryHandler(), RateLimitErrorRetryHandler(max_retry_count=2)],
+            )
+        return _slack_client
+
+
+def slack_post_message(channel_id: str, text: str) -> dict:
+    """
+    Posts a text message to a Slack channel.
+
+    In-process replacement for the Slack MCP server's tool of the same name and arguments.
+
+    Args:
+        channel_id (str): The channel to post to; CHANNEL_ID is used when empty.
+        text (str): The message text.
+
+    Returns:
+        dict: Contains either:
+            - "status": "success", with "channel" and "ts" of the posted message
+            - "status": "error", with "error_message"
+    """
+    from slack_sdk.errors import SlackApiError
+
+    with span("slack.post", method="chat.postMessage", chars=len(text or "")) as post_span:
+        try:
+            response = get_slack_client().chat_postMessage(channel=channel_id or CHANNEL_ID, text=text)
+            increment("slack_requests_total", method="chat.postMessage", status="ok")
+            return {"status": "success", "channel": response["channel"], "ts": response["ts"]}
+        except SlackApiError as e:
+            error_message = f"Slack API error: {e.response['error']}"
+        except Exception as e:
+            error_message = str(e)
+        post_span.fail(error_message)
+        increment("slack_requests_total", method="chat.postMessage", status="error")
+        return {"status": "error", "error_message": error_message}
 
 
 def send_to_slack_str(result_data: str) -> str:
@@ -25,8 +101,9 @@ def send_to_slack_str(result_data: str) -> str:
     Raises:
         Exception: If the Slack API request fails or responds with an error.
     """
+    from slack_sdk.errors import SlackApiError
 
-    client = WebClient(token=SLACK_BOT_TOKEN)
+    client = get_slack_client()
 
     try:
         parsed = json.loads(result_data)
@@ -36,67 +113,178 @@ def send_to_slack_str(result_data: str) -> str:
         message = "📊 *Partner Reach Overlap Result:*" + result_data
 
     try:
-        response = client.chat_postMessage(channel=CHANNEL_NAME, text=message)
-        if not response["ok"]:
-            raise Exception(f"Slack API error: {response['error']}")
+        with span("slack.post", method="chat.postMessage", chars=len(message)):
+            response = client.chat_postMessage(channel=CHANNEL_NAME, text=message)
+            if not response["ok"]:
+                raise Exception(f"Slack API error: {response['error']}")
+        increment("slack_requests_total", method="chat.postMessage", status="ok")
         return "✅ Message sent successfully!"
     except SlackApiError as e:
+        increment("slack_requests_total", method="chat.postMessage", status="error")
         raise Exception(f"Slack API error: {e.response['error']}") from e
+    except Exception:
+        increment("slack_requests_total", method="chat.postMessage", status="error")
+        raise
 
 
-def send_to_slack_visual(routing_image: list[dict]) -> dict:
+def _load_image(item: dict) -> tuple:
     """
-    Uploads one or more visualization images from GCS to a Slack channel.
+    Reads the bytes of a chart, from its local copy when present, otherwise from GCS.
+
+    Only files inside the chart cache (CHART_CACHE_DIR) are read locally, so a path supplied by the
+    model cannot make the tool post arbitrary local files (e.g. .env or a credentials key) to Slack.
+    The storage client is only created when the image has to be downloaded.
 
     Args:
-        routing_image (list[dict]): A list of dictionaries, each containing:
-            - "name" (str): A display name or title for the image.
-            - "gcs_path" (str): Full GCS URI of the image file (must start with "gs:.//visualisation//images//...").
+        item (dict): A routing_image entry with "image_path" and / or "gcs_path".
 
     Returns:
-        dict: Contains either:
-            - "status": "success", indicating all images were uploaded successfully
-            - "status": "error", with "error_message" (only if handled manually)
+        tuple: (BytesIO image stream, file name)
+    """
+    image_path = item.get("image_path")
+    if image_path and is_local_chart(image_path):
+        with open(os.path.realpath(image_path), "rb") as f:
+            return BytesIO(f.read()), os.path.basename(item.get("gcs_path") or image_path)
+    if not item.get("gcs_path"):
+        raise FileNotFoundError(f"Local image {image_path} is not in the chart cache and the chart was not "
+                                f"archived to GCS")
 
-    Raises:
-        ValueError: If required keys are missing or GCS path format is invalid.
-        RuntimeError: If an image upload to Slack fails.
+    # Parse GCS path
+    _, _, bucket_name, *blob_parts = item["gcs_path"].split("/")
+    blob_name = "/".join(blob_parts)
+
+    # Download image into memory
+    bucket = get_storage_client().bucket(bucket_name)
+    blob = bucket.blob(blob_name)
+    image_stream = BytesIO()
+    blob.download_to_file(image_stream)
+    image_stream.seek(0)
+    return image_stream, os.path.basename(blob_name)
+
+
+def _retry_delay(error: Exception, attempt: int):
     """
+    Decides whether a failed upload is worth retrying.
 
-    client = WebClient(token=SLACK_BOT_TOKEN, timeout=15)
-    gcs_client = storage.Client()
+    Args:
+        error (Exception): The failure.
+        attempt (int): 1-based number of the attempt that failed.
 
-    for idx, item in enumerate(routing_image):
-        if not all(k in item for k in ("name", "gcs_path")):
-            raise ValueError(f"Missing required keys in routing_image[{idx}]: {item}")
+    Returns:
+        float | None: Seconds to wait before the next attempt, or None if the error is permanent.
+            Slack rate limits wait for their Retry-After header; other transient errors back off
+            exponentially with jitter.
+    """
+    from slack_sdk.errors import SlackApiError
 
-        gcs_path = item["gcs_path"]
-        if not gcs_path.startswith("gs://"):
-            raise ValueError(f"Invalid GCS path: {gcs_path}")
+    backoff = SLACK_UPLOAD_BACKOFF * 2 ** (attempt - 1) * (1 + random.random() / 2)
+    if isinstance(error, SlackApiError):
+        status = getattr(error.response, "status_code", None)
+        if status == 429:
+            headers = getattr(error.response, "headers", None) or {}
+            retry_after = headers.get("Retry-After") or headers.get("retry-after")
+            return float(retry_after) if retry_after else backoff
+        if status is not None and status < 500:
+            return None
+    if isinstance(error, (ValueError, FileNotFoundError)):
+        return None
+    return backoff
+
+
+def _send_image(client: "WebClient", item: dict) -> dict:
+    """
+    Uploads one image to Slack, retrying transient failures, as one "slack.upload" span.
 
+    Args:
+        client (WebClient): The Slack client.
+        item (dict): A routing_image entry.
+
+    Returns:
+        dict: {"name", "status": "success" | "error", "attempts"}, plus "error_message" on error.
+    """
+    with span("slack.upload", method="files.upload_v2", chart=item["name"]) as upload_span:
+        result = _upload_image(client, item)
+        upload_span.set(attempts=result["attempts"])
+        if result["status"] == "error":
+            upload_span.fail(result["error_message"])
+    increment("slack_requests_total", method="files.upload_v2",
+              status="ok" if result["status"] == "success" else "error")
+    return result
+
+
+def _upload_image(client: "WebClient", item: dict) -> dict:
+    """The attempts of `_send_image`."""
+    image = None
+    for attempt in range(1, SLACK_UPLOAD_ATTEMPTS + 1):
         try:
-            # Parse GCS path
-            _, _, bucket_name, *blob_parts = gcs_path.split("/")
-            blob_name = "/".join(blob_parts)
-
-            # Download image into memory
-            bucket = gcs_client.bucket(bucket_name)
-            blob = bucket.blob(blob_name)
-            image_stream = BytesIO()
-            blob.download_to_file(image_stream)
+            if image is None:
+                image = _load_image(item)
+            image_stream, filename = image
             image_stream.seek(0)
 
             # Upload to Slack
             client.files_upload_v2(
                 channel=CHANNEL_ID,
                 file=image_stream,
-                filename=os.path.basename(blob_name),
-                title=os.path.basename(blob_name),
+                filename=filename,
+                title=filename,
                 initial_comment=f"🖼️ *Visualization –* {item['name']}"
             )
+            return {"name": item["name"], "status": "success", "attempts": attempt}
 
         except Exception as e:
-            raise RuntimeError(f"Slack upload failed for {gcs_path}: {e}")
+            delay = _retry_delay(e, attempt)
+            if delay is None or attempt == SLACK_UPLOAD_ATTEMPTS:
+                source = item.get("gcs_path") or item.get("image_path")
+                return {"name": item["name"], "status": "error", "attempts": attempt,
+                        "error_message": f"Slack upload failed for {source}: {e}"}
+            time.sleep(delay)
+
+
+def send_to_slack_visual(routing_image: list[dict]) -> dict:
+    """
+    Uploads one or more visualization images to a Slack channel.
+
+    Images are fetched and uploaded in parallel (up to SLACK_UPLOAD_WORKERS at a time), each with
+    its own retries, so a slow or failing image does not hold up the others. Images rendered in
+    this process are sent straight from their local copy ("image_path"), so the GCS download is
+    only needed for charts that exist in GCS alone.
+
+    Args:
+        routing_image (list[dict]): A list of dictionaries, each containing:
+            - "name" (str): A display name or title for the image.
+            - "gcs_path" (str): Full GCS URI of the image file (must start with "gs:.//visualisation//images//...").
+            - "image_path" (str, optional): Local copy of the image, as returned by create_report_visuals;
+              only used if it lies inside the chart cache. Either "gcs_path" or "image_path" is required.
+
+    Returns:
+        dict: Contains:
+            - "status": "success" if every image was uploaded, "partial" if some were, "error" if none were
+            - "files": one {"name", "status", "attempts"[, "error_message"]} per image, in input order
+            - "error_message": on "partial" / "error", the failures joined
+
+    Raises:
+        ValueError: If required keys are missing or GCS path format is invalid.
+    """
+    for idx, item in enumerate(routing_image):
+        if "name" not in item or not (item.get("gcs_path") or item.get("image_path")):
+            raise ValueError(f"Missing required keys in routing_image[{idx}]: {item}")
+
+        gcs_path = item.get("gcs_path")
+        if gcs_path and not gcs_path.startswith("gs://"):
+            raise ValueError(f"Invalid GCS path: {gcs_path}")
+
+    if not routing_image:
+        return {"status": "success", "files": []}
+
+    client = get_slack_client()
 
-    return {"status": "success"}
+    with ThreadPoolExecutor(max_workers=min(SLACK_UPLOAD_WORKERS, len(routing_image))) as pool:
+        context = contextvars.copy_context()
+        files = list(pool.map(lambda item: context.copy().run(_send_image, client, item), routing_image))
 
+    failures = [f["error_message"] for f in files if f["status"] == "error"]
+    if not failures:
+        return {"status": "success", "files": files}
+    status = "error" if len(failures) == len(files) else "partial"
+    return {"status": status, "files": files, "error_message": "; ".join(failures)}
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import TYPE_CHECKING
+from .settings import settings
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+SCHEMA_CACHE_TTL = settings.schema_cache_ttl
+
+_lock = threading.Lock()
+_entries = {}
+
+
+def parse_table_metadata(table: "bigquery.Table") -> dict:
+    """
+    Extracts the schema, partitioning, clustering and statistics of a table resource.
+
+    Args:
+        table (bigquery.Table): The table as returned by `client.get_table`.
+
+    Returns:
+        dict: With keys:
+            - "schema": list of {"Field name", "Type", "Description"}
+            - "partition_field": partitioning column, "_PARTITIONTIME" for ingestion-time
+              partitioning, or None
+            - "partition_type": e.g. "DAY", or None
+            - "clustering_fields": list of clustering columns
+            - "num_rows", "num_bytes": table statistics
+            - "etag", "modified": change markers of the table resource
+    """
+    partitioning = table.time_partitioning
+
+    return {
+        "schema": [
+            {
+                "Field name": field.name,
+                "Type": field.field_type,
+                "Description": field.description or ""
+            }
+            for field in table.schema
+        ],
+        "partition_field": (partitioning.field or "_PARTITIONTIME") if partitioning else None,
+        "partition_type": partitioning.type_ if partitioning else None,
+        "clustering_fields": list(table.clustering_fields or []),
+        "num_rows": table.num_rows,
+        "num_bytes": table.num_bytes,
+        "etag": table.etag,
+        "modified": table.modified.isoformat() if table.modified else None,
+    }
+
+
+def get_cached_table_metadata(client: "bigquery.Client", table_ref: str, force_refresh: bool = False) -> dict:
+    """
+    Returns the metadata of a table, fetching it at most once per SCHEMA_CACHE_TTL.
+
+    Within the TTL no request is made; once it expires the table resource is fetched and parsed
+    again. The BigQuery API has no cheaper conditional fetch, so a schema change is picked up after
+    at most SCHEMA_CACHE_TTL seconds, or at once with `force_refresh` / `invalidate_table_metadata`.
+
+    Args:
+        client (bigquery.Client): The BigQuery client.
+        table_ref (str): "project.dataset.table".
+        force_refresh (bool): Skip the TTL and fetch now.
+
+    Returns:
+        dict: As returned by `parse_table_metadata`; shared between callers, do not modify.
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(table_ref)
+    if entry and not force_refresh and now - entry["fetched_at"] < SCHEMA_CACHE_TTL:
+        return entry["metadata"]
+
+    metadata = parse_table_metadata(client.get_table(table_ref))
+    with _lock:
+        _entries[table_ref] = {"metadata": metadata, "fetched_at": now}
+    return metadata
+
+
+def invalidate_table_metadata(table_ref: str = None) -> None:
+    """
+    Drops cached metadata so the next lookup fetches it again.
+
+    Args:
+        table_ref (str, optional): The table to drop; all tables when omitted.
+
+    Returns:
+        None
+    """
+    with _lock:
+        if table_ref is None:
+            _entries.clear()
+        else:
+            _entries.pop(table_ref, None)
@@ -0,0 +1,479 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Optional
+from .settings import settings
+
+# Where finished spans go besides the in-process buffer: "none", "log" (one JSON line per span on the
+# "ai_agents.telemetry" logger) or "otel" (the OpenTelemetry tracer provider; see `_otel_tracer`).
+TELEMETRY_EXPORTER = settings.telemetry_exporter
+# Finished spans kept in memory for `recent_spans`.
+TELEMETRY_SPAN_BUFFER = settings.telemetry_span_buffer
+# Serve `render_prometheus` on this port (0 disables); started by `server.ReportServer`, not at import.
+METRICS_PORT = settings.metrics_port
+# Interface the metrics endpoint binds to; "0.0.0.0" exposes it beyond the host.
+METRICS_HOST = settings.metrics_host
+# Spans opened by agent callbacks and not yet closed; beyond it the oldest are ended as abandoned.
+TELEMETRY_MAX_OPEN_SPANS = settings.telemetry_max_open_spans
+
+METRIC_PREFIX = "ai_agents_"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRIC_HELP = {
+    "stage_duration_seconds": "Duration of pipeline stages (spans), by stage and status.",
+    "bigquery_bytes_processed_total": "Bytes processed by BigQuery report jobs.",
+    "bigquery_bytes_billed_total": "Bytes billed for BigQuery report jobs.",
+    "bigquery_slot_ms_total": "Slot milliseconds consumed by BigQuery report jobs.",
+    "query_rows_returned_total": "Rows returned by report queries, by backend.",
+    "report_cache_hits_total": "Reports served from the result cache, by backend.",
+    "chart_bytes_total": "Bytes of rendered charts, by chart type.",
+    "gcs_upload_bytes_total": "Bytes uploaded to GCS.",
+    "slack_requests_total": "Slack API calls, by method and status.",
+    "llm_tokens_total": "LLM tokens, by agent and kind (prompt / completion).",
+    "report_requests_total": "Report server requests, by tenant and outcome.",
+}
+
+logger = logging.getLogger("ai_agents.telemetry")
+
+_current = contextvars.ContextVar("ai_agents_span", default=None)
+_spans = deque(maxlen=TELEMETRY_SPAN_BUFFER)
+_open_spans = OrderedDict()
+_lock = threading.Lock()
+_tracer = None
+_metrics_server = None
+
+
+class Span:
+    """
+    One timed stage of the pipeline.
+
+    Attributes:
+        name (str): Stage name, e.g. "bigquery.job" or "slack.upload".
+        attributes (dict): Stage details (bytes, rows, attempts, ...).
+        status (str): "ok" or "error".
+    """
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"] = None):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self._otel = _start_otel_span(self)
+
+    def set(self, **attributes) -> "Span":
+        """Adds attributes to the span."""
+        self.attributes.update(attributes)
+        return self
+
+    def fail(self, error) -> "Span":
+        """Marks the span as failed (for stages that report errors instead of raising)."""
+        self.status = "error"
+        self.error = str(error)
+        return self
+
+    def end(self, error=None) -> None:
+        """Finishes the span and records it; later calls do nothing."""
+        if self.duration is not None:
+            return
+        if error is not None:
+            self.fail(error)
+        self.duration = time.perf_counter() - self._started
+        _finish(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start_time": self.start_time,
+            "duration_seconds": round(self.duration, 6) if self.duration is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def start_span(name: str, parent: Optional[Span] = None, **attributes) -> Span:
+    """
+    Starts a span that is ended explicitly with `Span.end`, e.g. across callbacks or futures.
+
+    Args:
+        name (str): Stage name.
+        parent (Span, optional): Defaults to the span active in the current context.
+        **attributes: Initial span attributes.
+
+    Returns:
+        Span: The started span; it is not made the current span.
+    """
+    return Span(name, attributes, parent or _current.get())
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times the enclosed block as a span nested under the current one.
+
+    An exception leaving the block marks the span as failed and is re-raised.
+
+    Args:
+        name (str): Stage name.
+        **attributes: Initial span attributes.
+
+    Yields:
+        Span: The span, to add attributes to.
+    """
+    current = start_span(name, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def current_span() -> Optional[Span]:
+    """Returns the span active in the current context, if any."""
+    return _current.get()
+
+
+def _finish(finished: Span) -> None:
+    """Records a finished span: buffer, stage histogram and exporter."""
+    with _lock:
+        _spans.append(finished)
+    observe("stage_duration_seconds", finished.duration, stage=finished.name, status=finished.status)
+
+    if finished._otel is not None:
+        from opentelemetry.trace import Status, StatusCode
+
+        finished._otel.set_attributes(_otel_attributes(finished.attributes))
+        if finished.status == "error":
+            finished._otel.set_status(Status(StatusCode.ERROR, finished.error))
+        finished._otel.end()
+    elif TELEMETRY_EXPORTER == "log":
+        logger.info(json.dumps(finished.to_dict(), default=str))
+
+
+def recent_spans(name: Optional[str] = None) -> list:
+    """
+    Returns the most recently finished spans (at most TELEMETRY_SPAN_BUFFER), oldest first.
+
+    Args:
+        name (str, optional): Only spans with this name.
+
+    Returns:
+        list[dict]: As returned by `Span.to_dict`.
+    """
+    with _lock:
+        spans = list(_spans)
+    return [s.to_dict() for s in spans if name is None or s.name == name]
+
+
+def _otel_tracer():
+    """Returns the OpenTelemetry tracer when TELEMETRY_EXPORTER="otel" and the API is installed."""
+    global _tracer
+    if TELEMETRY_EXPORTER != "otel":
+        return None
+    if _tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logger.warning("TELEMETRY_EXPORTER=otel but opentelemetry-api is not installed")
+            return None
+        _tracer = trace.get_tracer("ai_agents")
+    return _tracer
+
+
+def _start_otel_span(started: Span):
+    """Opens the OpenTelemetry twin of a span, parented like the span itself."""
+    tracer = _otel_tracer()
+    if tracer is None:
+        return None
+    from opentelemetry import trace
+
+    parent = started.parent._otel if started.parent is not None else None
+    context = trace.set_span_in_context(parent) if parent is not None else None
+    return tracer.start_span(started.name, context=context, start_time=int(started.start_time * 1e9))
+
+
+def _otel_attributes(attributes: dict) -> dict:
+    """Keeps the attributes OpenTelemetry accepts (primitives), stringifying the rest."""
+    converted = {}
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        converted[key] = value if isinstance(value, (str, bool, int, float)) else str(value)
+    return converted
+
+
+# ---- Metrics -------------------------------------------------------------------------------------
+
+_counters = {}
+_histograms = {}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """
+    Adds `value` to a counter.
+
+    Args:
+        name (str): Metric name without METRIC_PREFIX, e.g. "gcs_upload_bytes_total".
+        value (float): Amount to add; None is ignored.
+        **labels: Metric labels.
+
+    Returns:
+        None
+    """
+    if value is None:
+        return
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """
+    Records a value into a histogram with DURATION_BUCKETS.
+
+    Args:
+        name (str): Metric name without METRIC_PREFIX.
+        value (float): The observed value.
+        **labels: Metric labels.
+
+    Returns:
+        None
+    """
+    key = (name, _label_key(labels))
+    with _lock:
+        buckets, total, count = _histograms.get(key, ([0] * len(DURATION_BUCKETS), 0.0, 0))
+        buckets = [n + (value <= bound) for n, bound in zip(buckets, DURATION_BUCKETS)]
+        _histograms[key] = (buckets, total + value, count + 1)
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format (version 0.0.4).
+
+    Args:
+        None
+
+    Returns:
+        str: The exposition, e.g. for a /metrics endpoint or a node-exporter textfile.
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = dict(_histograms)
+
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        full = METRIC_PREFIX + name
+        lines.append(f"# HELP {full} {METRIC_HELP.get(name, name)}")
+        lines.append(f"# TYPE {full} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{full}{_format_labels(labels)} {value:g}")
+    for name in sorted({name for name, _ in histograms}):
+        full = METRIC_PREFIX + name
+        lines.append(f"# HELP {full} {METRIC_HELP.get(name, name)}")
+        lines.append(f"# TYPE {full} histogram")
+        for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, n in zip(DURATION_BUCKETS, buckets):
+                lines.append(f"{full}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {n}")
+            lines.append(f"{full}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+            lines.append(f"{full}_sum{_format_labels(labels)} {total:g}")
+            lines.append(f"{full}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port: int = None, host: str = None) -> int:
+    """
+    Serves `render_prometheus` at http://<host>:<port>/metrics from a background thread.
+
+    Args:
+        port (int, optional): Defaults to METRICS_PORT.
+        host (str, optional): Defaults to METRICS_HOST.
+
+    Returns:
+        int: The port served on (0 if disabled).
+    """
+    global _metrics_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return 0
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode()
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host or METRICS_HOST, port), MetricsHandler)
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True, name="metrics").start()
+        return _metrics_server.server_address[1]
+
+
+def reset_telemetry() -> None:
+    """
+    Drops every recorded span and metric (e.g. between benchmark runs).
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    with _lock:
+        _spans.clear()
+        _open_spans.clear()
+        _counters.clear()
+        _histograms.clear()
+
+
+# ---- ADK agent callbacks ---------------------------------------------------------------------------
+
+def _open_span(key: tuple, opened: Span, token=None) -> None:
+    """Keeps a callback span until its closing callback; the oldest are abandoned beyond TELEMETRY_MAX_OPEN_SPANS."""
+    abandoned = []
+    with _lock:
+        _open_spans[key] = (opened, token)
+        while len(_open_spans) > TELEMETRY_MAX_OPEN_SPANS:
+            abandoned.append(_open_spans.popitem(last=False)[1][0])
+    for stale in abandoned:
+        stale.end(error="abandoned: no closing callback")
+
+
+def _close_span(key: tuple, error=None) -> Optional[Span]:
+    """Ends a callback span, restoring the span that was current before it; returns it, if it was open."""
+    with _lock:
+        opened, token = _open_spans.pop(key, (None, None))
+    if opened is None:
+        return None
+    if token is not None:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Closed from another context; that context's current span is left alone.
+            pass
+    opened.end(error=error)
+    return opened
+
+
+def _tool_key(tool, tool_context) -> tuple:
+    return ("tool", tool_context.invocation_id, getattr(tool_context, "function_call_id", None) or tool.name)
+
+
+def before_model_callback(callback_context, llm_request):
+    """ADK before_model_callback: opens an "llm.turn" span for the agent's model call."""
+    key = ("llm", callback_context.invocation_id, callback_context.agent_name)
+    _open_span(key, start_span("llm.turn", agent=callback_context.agent_name,
+                               model=getattr(llm_request, "model", None)))
+    return None
+
+
+def after_model_callback(callback_context, llm_response):
+    """ADK after_model_callback: closes the "llm.turn" span with the token usage."""
+    key = ("llm", callback_context.invocation_id, callback_context.agent_name)
+    with _lock:
+        turn = _open_spans.get(key, (None, None))[0]
+    if turn is None:
+        return None
+    usage = getattr(llm_response, "usage_metadata", None)
+    prompt = getattr(usage, "prompt_token_count", None)
+    completion = getattr(usage, "candidates_token_count", None)
+    turn.set(prompt_tokens=prompt, completion_tokens=completion)
+    increment("llm_tokens_total", prompt, agent=callback_context.agent_name, kind="prompt")
+    increment("llm_tokens_total", completion, agent=callback_context.agent_name, kind="completion")
+    _close_span(key, error=getattr(llm_response, "error_message", None) or None)
+    return None
+
+
+def on_model_error_callback(callback_context, llm_request, error):
+    """ADK on_model_error_callback: closes the "llm.turn" span as failed; the error propagates."""
+    _close_span(("llm", callback_context.invocation_id, callback_context.agent_name), error=error)
+    return None
+
+
+def before_tool_callback(tool, args, tool_context):
+    """ADK before_tool_callback: opens a "tool.call" span, current while the tool runs."""
+    opened = start_span("tool.call", tool=tool.name, agent=tool_context.agent_name)
+    _open_span(_tool_key(tool, tool_context), opened, _current.set(opened))
+    return None
+
+
+def after_tool_callback(tool, args, tool_context, tool_response):
+    """ADK after_tool_callback: closes the "tool.call" span, failed if the tool reported an error."""
+    failed = isinstance(tool_response, dict) and tool_response.get("status") == "error"
+    _close_span(_tool_key(tool, tool_context),
+                error=json.dumps(tool_response, default=str)[:500] if failed else None)
+    return None
+
+
+def on_tool_error_callback(tool, args, tool_context, error):
+    """ADK on_tool_error_callback: closes the "tool.call" span as failed; the error propagates."""
+    _close_span(_tool_key(tool, tool_context), error=error)
+    return None
+
+
+AGENT_CALLBACKS = {
+    "before_model_callback": before_model_callback,
+    "after_model_callback": after_model_callback,
+    "on_model_error_callback": on_model_error_callback,
+    "before_tool_callback": before_tool_callback,
+    "after_tool_callback": after_tool_callback,
+    "on_tool_error_callback": on_tool_error_callback,
+}
+
+
+def agent_callbacks(agent_class) -> dict:
+    """
+    Returns the tracing callbacks as keyword arguments of an ADK agent class.
+
+    The error callbacks are left out on ADK releases whose agents do not accept them; the spans they
+    would close are then abandoned once TELEMETRY_MAX_OPEN_SPANS is exceeded.
+
+    Args:
+        agent_class: The agent class, e.g. LlmAgent.
+
+    Returns:
+        dict: Callback keyword arguments.
+    """
+    fields = getattr(agent_class, "model_fields", {})
+    return {name: callback for name, callback in AGENT_CALLBACKS.items()
+            if name in fields or not name.startswith("on_")}
@@ -1,16 +1,38 @@
+import logging
 import uuid
+import threading
+import time
+from typing import Optional
 from io import BytesIO
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import os
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 from datetime import datetime
-from google.cloud import storage
-from dotenv import load_dotenv
-
-load_dotenv()
-
-BUCKET_NAME = os.getenv("BUCKET_NAME")
+from .chart_cache import (
+    CHART_CACHE_ENABLED, CHART_CACHE_TTL, chart_cache_key, chart_object_name, get_local_chart,
+    store_local_chart, drop_local_chart, schedule_remote_eviction,
+)
+from .chart_renderer import (
+    CHART_STYLES, render_charts, render_incrementality_bar_chart, render_pairwise_overlap_heatmap,
+    render_pairwise_overlap_metrix,
+)
+from .clients import get_storage_client
+from .settings import settings
+from .telemetry import increment, span
+
+BUCKET_NAME = settings.bucket_name
+# How report charts reach GCS: "sync", "async" (in the background) or "skip"; see publish_charts.
+CHART_ARCHIVE_MODE = settings.chart_archive_mode
+
+CHART_PREFIXES = {
+    "Bar Chart": "incrementality_bar_chart",
+    "Heatmap": "overlap_heatmap",
+    "Metrix": "pairwise_overlap_metrix",
+}
+
+_archive_pool = None
+_archive_lock = threading.Lock()
+logger = logging.getLogger("ai_agents.charts")
 
 
 def upload_to_gcs(image_stream, folder="visualization/images", filename_prefix="chart"):
@@ -37,17 +59,16 @@ def upload_to_gcs(image_stream, folder="visualization/images", filename_prefix="
     if not key_path:
         raise RuntimeError("Missing GOOGLE_APPLICATION_CREDENTIALS in .env!")
 
-    client = storage.Client()
+    client = get_storage_client()
     bucket = client.bucket(BUCKET_NAME)
     filename = f"{folder}/{filename_prefix}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpg"
     blob = bucket.blob(filename)
 
-    try:
+    with span("gcs.upload", bucket=BUCKET_NAME, object=filename) as upload_span:
         blob.upload_from_file(image_stream, content_type='image/jpeg')
-        print(f"[GCS] ✅ Uploaded successfully to: gs://{BUCKET_NAME}/{filename}")
-    except Exception as e:
-        print(f"[GCS] ❌ Upload failed: {e}")
-        raise
+        size = image_stream.tell()
+        upload_span.set(bytes=size)
+    increment("gcs_upload_bytes_total", size)
     return f"gs://{BUCKET_NAME}/{filename}"
 
 
@@ -70,30 +91,8 @@ def create_pairwise_overlap_metrix(data: list[dict]) -> dict:
     Raises:
         None
     """
-    sources = sorted(set(row["source_1"] for row in data) | set(row["source_2"] for row in data))
-    df = pd.DataFrame(0.0, index=sources, columns=sources)
-    for row in data:
-        df.at[row["source_1"], row["source_2"]] = row["overlap_percent"]
-
-    df_display = df.copy()
-    for col in df_display.columns:
-        df_display[col] = df_display[col].map(lambda x: "—" if x == 0 else f"{x:.2f}%")
-
-    plt.figure(figsize=(8, 8))
-    sns.set(font_scale=1.2)
-    sns.set_style("white")
-    sns.heatmap(df, annot=df_display, fmt="", cmap=["#e8f4fa"],
-                linewidths=0.5, linecolor='gray', cbar=False, square=True)
-    plt.title("Pairwise Overlap Metrix", fontsize=16, weight='bold', pad=20)
-    plt.tight_layout(rect=(0, 0, 1, 0.92))
-
-    image_stream = BytesIO()
-    plt.savefig(image_stream, format='jpeg', dpi=300)
-    plt.close()
-    image_stream.seek(0)
-
-    gcs_path = upload_to_gcs(image_stream, filename_prefix="pairwise_overlap_metrix")
-    return {"status": "success", "full_image_path": gcs_path}
+    chart = publish_charts({"Metrix": (render_pairwise_overlap_metrix, data)}, archive_mode="sync")["Metrix"]
+    return {"status": "success", "full_image_path": chart["gcs_path"]}
 
 
 def plot_pairwise_overlap_heatmap(data_dict: list[dict]) -> dict:
@@ -115,30 +114,8 @@ def plot_pairwise_overlap_heatmap(data_dict: list[dict]) -> dict:
     Raises:
         None
     """
-
-    df_pairs = pd.DataFrame(data_dict)
-    all_sources = sorted(set(df_pairs["source_1"]) | set(df_pairs["source_2"]))
-    pivot = df_pairs.pivot(index="source_1", columns="source_2", values="overlap_percent")
-    pivot = pivot.reindex(index=all_sources, columns=all_sources).fillna(0)
-
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(pivot, annot=True, fmt=".3f", cmap="Reds",
-                linewidths=0.5, linecolor="gray", cbar_kws={'label': 'Overlap %'},
-                vmin=0, vmax=pivot.to_numpy().max())
-    plt.title("Pairwise Media Source Overlap Heatmap")
-    plt.xlabel("Target Media Source (j)")
-    plt.ylabel("Source Media Source (i)")
-    plt.xticks(rotation=45, ha="right")
-    plt.yticks(rotation=0)
-    plt.tight_layout()
-
-    image_stream = BytesIO()
-    plt.savefig(image_stream, format='jpeg')
-    plt.close()
-    image_stream.seek(0)
-
-    gcs_path = upload_to_gcs(image_stream, filename_prefix="overlap_heatmap")
-    return {"status": "success", "full_image_path": gcs_path}
+    chart = publish_charts({"Heatmap": (render_pairwise_overlap_heatmap, data_dict)}, archive_mode="sync")["Heatmap"]
+    return {"status": "success", "full_image_path": chart["gcs_path"]}
 
 
 def plot_incrementality_bar_chart(data: list[dict]) -> dict:
@@ -149,6 +126,7 @@ def plot_incrementality_bar_chart(data: list[dict]) -> dict:
         data (list[dict]): A list of dictionaries, each containing:
             - "media_source" (str): The name of the media source.
             - "incrementality_score" (float): The incrementality score (between 0 and 1) for the media source.
+              "incremental_score", as returned by execute_queries, is accepted as well.
 
     Returns:
         dict: Contains either:
@@ -159,27 +137,191 @@ def plot_incrementality_bar_chart(data: list[dict]) -> dict:
     Raises:
         None
     """
+    chart = publish_charts({"Bar Chart": (render_incrementality_bar_chart, data)}, archive_mode="sync")["Bar Chart"]
+    return {"status": "success", "full_image_path": chart["gcs_path"]}
+
+
+def _cached_chart(bucket, chart: str, key: str, archive_mode: str) -> Optional[dict]:
+    """
+    Finds an already rendered chart, checking the local disk cache before GCS.
+
+    Args:
+        bucket (storage.Bucket): The chart bucket.
+        chart (str): Chart type.
+        key (str): The chart's cache key.
+        archive_mode (str): See `publish_charts`; with "skip" unarchived local copies count as hits
+            and GCS is not consulted (`bucket` may be None).
+
+    Returns:
+        dict | None: {"gcs_path", "image_path"} (either may be None), or None on a miss.
+    """
+    gcs_path = f"gs://{BUCKET_NAME}/{chart_object_name(chart, key)}"
+    image_path = get_local_chart(key)
+    if image_path:
+        return {"gcs_path": gcs_path, "image_path": image_path}
+    if archive_mode == "skip":
+        image_path = get_local_chart(key, archived=False)
+        if image_path:
+            return {"gcs_path": None, "image_path": image_path}
+        return None
+    blob = bucket.get_blob(chart_object_name(chart, key))
+    if blob is not None and blob.time_created and time.time() - blob.time_created.timestamp() < CHART_CACHE_TTL:
+        return {"gcs_path": gcs_path, "image_path": None}
+    return None
+
+
+def _upload_chart(bucket, chart: str, key: str, image: bytes) -> str:
+    """
+    Uploads a rendered chart under its content address.
+
+    Args:
+        bucket (storage.Bucket): The chart bucket.
+        chart (str): Chart type.
+        key (str): The chart's cache key.
+        image (bytes): The JPEG image.
+
+    Returns:
+        str: GCS URI of the image.
+    """
+    name = chart_object_name(chart, key)
+    try:
+        with span("gcs.upload", bucket=BUCKET_NAME, object=name, bytes=len(image)):
+            bucket.blob(name).upload_from_string(image, content_type="image/jpeg")
+    except Exception:
+        drop_local_chart(key)
+        raise
+    increment("gcs_upload_bytes_total", len(image))
+    return f"gs://{BUCKET_NAME}/{name}"
+
+
+def _get_archive_pool() -> ThreadPoolExecutor:
+    """Returns the background pool used for CHART_ARCHIVE_MODE="async" uploads."""
+    global _archive_pool
+    with _archive_lock:
+        if _archive_pool is None:
+            _archive_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chart-archive")
+        return _archive_pool
+
+
+def _log_archive_failure(future, chart: str, key: str) -> None:
+    """Logs a failed background upload; its local copy was already dropped, so the chart is rendered again next time."""
+    error = future.exception()
+    if error is not None:
+        logger.warning("Archiving %s to gs://%s/%s failed: %s", chart, BUCKET_NAME, chart_object_name(chart, key), error)
+
+
+def _publish_chart(bucket, chart: str, key: str, image: bytes, archive_mode: str) -> dict:
+    """
+    Stores a freshly rendered chart locally and archives it to GCS according to `archive_mode`.
+
+    Returns:
+        dict: {"gcs_path", "image_path"}; gcs_path is None when archival is skipped.
+    """
+    if archive_mode == "skip":
+        return {"gcs_path": None, "image_path": store_local_chart(key, image, archived=False)}
+    image_path = store_local_chart(key, image)
+    if archive_mode == "async":
+        upload = _get_archive_pool().submit(contextvars.copy_context().run, _upload_chart, bucket, chart, key, image)
+        upload.add_done_callback(lambda future: _log_archive_failure(future, chart, key))
+        return {"gcs_path": f"gs://{BUCKET_NAME}/{chart_object_name(chart, key)}", "image_path": image_path}
+    return {"gcs_path": _upload_chart(bucket, chart, key, image), "image_path": image_path}
+
+
+def publish_charts(jobs: dict, archive_mode: str = None) -> dict:
+    """
+    Renders and publishes charts, reusing any chart already rendered with the same content.
 
-    df = pd.DataFrame(data)
+    Each chart is addressed by a hash of its records, type and style parameters. Hits in the local
+    disk cache or in GCS are returned without rendering or uploading; the misses are rendered in
+    parallel worker processes, written to the local disk cache and archived to GCS. Old cache
+    entries are evicted in the background. With CHART_CACHE_ENABLED=0 every chart is rendered and
+    uploaded under a new name ("async" uploads before returning); with "skip" it is only written
+    under a new name to CHART_CACHE_DIR, where Slack uploads read local images from.
 
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=df, x="media_source", y="incrementality_score",
-                hue="media_source", legend=False, palette="colorblind")
+    Args:
+        jobs (dict): Chart name (a CHART_PREFIXES key) -> (render function, input records).
+        archive_mode (str, optional): How rendered charts reach GCS, defaults to CHART_ARCHIVE_MODE:
+            - "sync": uploaded before returning
+            - "async": uploaded in the background; the local image is available at once
+            - "skip": not uploaded; only the local image is returned
 
-    for i, row in df.iterrows():
-        plt.text(i, row["incrementality_score"] + 0.01, f'{row["incrementality_score"]:.2%}',
-                 ha='center', va='bottom')
+    Returns:
+        dict: Chart name -> {"gcs_path", "image_path"}, in the order of `jobs`. "image_path" is a
+            local copy of the image (None if only GCS has it); "gcs_path" is None when archival
+            was skipped.
+    """
+    archive_mode = archive_mode or CHART_ARCHIVE_MODE
+    if not CHART_CACHE_ENABLED:
+        images = render_charts(jobs)
+        if archive_mode == "skip":
+            return {name: {"gcs_path": None, "image_path": store_local_chart(uuid.uuid4().hex, image, archived=False)}
+                    for name, image in images.items()}
+        with ThreadPoolExecutor(max_workers=len(images)) as pool:
+            uploads = {name: pool.submit(upload_to_gcs, BytesIO(image), filename_prefix=CHART_PREFIXES[name])
+                       for name, image in images.items()}
+            return {name: {"gcs_path": future.result(), "image_path": None} for name, future in uploads.items()}
+
+    bucket = None if archive_mode == "skip" else get_storage_client().bucket(BUCKET_NAME)
+    keys = {name: chart_cache_key(CHART_PREFIXES[name], records, CHART_STYLES[CHART_PREFIXES[name]])
+            for name, (_, records) in jobs.items()}
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        lookups = {name: pool.submit(_cached_chart, bucket, CHART_PREFIXES[name], key, archive_mode)
+                   for name, key in keys.items()}
+        charts = {name: future.result() for name, future in lookups.items()}
+
+        misses = {name: job for name, job in jobs.items() if charts[name] is None}
+        if misses:
+            images = render_charts(misses)
+            published = {name: pool.submit(contextvars.copy_context().run, _publish_chart, bucket,
+                                           CHART_PREFIXES[name], keys[name], image, archive_mode)
+                         for name, image in images.items()}
+            charts.update({name: future.result() for name, future in published.items()})
+
+    if archive_mode != "skip":
+        schedule_remote_eviction(bucket)
+    return {name: charts[name] for name in jobs}
+
+
+def _valid_records(records: list[dict], fields: tuple) -> list[dict]:
+    """Keeps the records that have a non-null value for every required field."""
+    return [r for r in records or [] if all(r.get(f) is not None for f in fields)]
+
+
+def create_report_visuals(summary_table: list[dict], pairwise_overlap: list[dict]) -> list[dict]:
+    """
+    Renders the bar chart, heatmap and matrix for a report directly, without the visual agent.
 
-    plt.ylim(0, 1.05)
-    plt.title("Incrementality Score per Media Source")
-    plt.xlabel("Media Source")
-    plt.ylabel("Incrementality Score")
-    plt.tight_layout()
+    Charts already rendered with the same content are reused; the rest are rendered in parallel
+    worker processes and archived to GCS per CHART_ARCHIVE_MODE (see `publish_charts`).
 
-    image_stream = BytesIO()
-    plt.savefig(image_stream, format='jpeg')
-    plt.close()
-    image_stream.seek(0)
+    Args:
+        summary_table (list[dict]): summary_table records from execute_queries
+            (media_source, incremental_score, ...).
+        pairwise_overlap (list[dict]): pairwise_overlap records from execute_queries
+            (source_1, source_2, overlap_percent).
 
-    gcs_path = upload_to_gcs(image_stream, filename_prefix="incrementality_bar_chart")
-    return {"status": "success", "full_image_path": gcs_path}
+    Returns:
+        list[dict]: One entry per generated chart, each with:
+            - "name": Type of chart ("Bar Chart", "Heatmap", "Metrix")
+            - "gcs_path": GCS URI of the image (None with CHART_ARCHIVE_MODE="skip")
+            - "image_path": Local copy of the image, which send_to_slack_visual uploads directly
+        Charts without valid input records are skipped.
+    """
+    bars = [
+        {"media_source": r["media_source"], "incrementality_score": r["incremental_score"]}
+        for r in _valid_records(summary_table, ("media_source", "incremental_score"))
+    ]
+    pairs = _valid_records(pairwise_overlap, ("source_1", "source_2", "overlap_percent"))
+
+    jobs = {}
+    if bars:
+        jobs["Bar Chart"] = (render_incrementality_bar_chart, bars)
+    if pairs:
+        jobs["Heatmap"] = (render_pairwise_overlap_heatmap, pairs)
+        jobs["Metrix"] = (render_pairwise_overlap_metrix, pairs)
+    if not jobs:
+        return []
+
+    charts = publish_charts(jobs)
+    return [{"name": name, **chart} for name, chart in charts.items()]